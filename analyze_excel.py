@@ -2,56 +2,90 @@
 
 import pandas as pd
 import sys
+from collections import Counter
+
+from import_readers import iter_record_batches
+
+# Columns with more distinct values than this are not treated as categorical
+MAX_CATEGORICAL_VALUES = 20
 
 def analyze_excel_file(filename):
     try:
-        # Try reading with openpyxl engine first
-        try:
-            df = pd.read_excel(filename, engine='openpyxl')
-        except:
-            # Fall back to xlrd engine for older Excel files
-            df = pd.read_excel(filename, engine='xlrd')
+        # Stream the file in batches so memory stays flat for large exports
+        csv_filename = filename.replace('.xls', '.csv').replace('.xlsx', '.csv')
+        
+        head = None
+        total_rows = 0
+        non_null = Counter()
+        dtypes = {}
+        value_counts = {}
+        
+        for batch in iter_record_batches(filename):
+            first_batch = head is None
+            if first_batch:
+                head = batch.head()
+                value_counts = {col: Counter() for col in batch.columns}
+            
+            total_rows += len(batch)
+            non_null.update(batch.notna().sum().to_dict())
+            for col in batch.columns:
+                dtypes.setdefault(col, set()).add(str(batch[col].dtype))
+                
+                # Stop tracking values once a column is clearly not categorical
+                counts = value_counts.get(col)
+                if counts is not None:
+                    counts.update(batch[col].dropna())
+                    if len(counts) > MAX_CATEGORICAL_VALUES:
+                        value_counts[col] = None
+            
+            # Save as CSV for easier import, one batch at a time
+            batch.to_csv(csv_filename, mode='w' if first_batch else 'a', header=first_batch, index=False)
+        
+        if head is None:
+            raise ValueError("File contains no data rows")
+        
+        columns = list(head.columns)
         
         print("=== EXCEL FILE ANALYSIS ===")
         print(f"File: {filename}")
-        print(f"Shape: {df.shape} (rows x columns)")
-        print(f"Columns: {len(df.columns)}")
+        print(f"Shape: {(total_rows, len(columns))} (rows x columns)")
+        print(f"Columns: {len(columns)}")
         print()
         
         print("=== COLUMN NAMES ===")
-        for i, col in enumerate(df.columns, 1):
+        for i, col in enumerate(columns, 1):
             print(f"{i:2d}. {col}")
         print()
         
         print("=== COLUMN INFO & DATA TYPES ===")
-        print(df.info())
+        print(f"RangeIndex: {total_rows} entries, 0 to {total_rows - 1}")
+        print(f"{'#':>3}  {'Column':<30} {'Non-Null Count':<16} Dtype")
+        for i, col in enumerate(columns):
+            print(f"{i:>3}  {col:<30} {non_null[col]:<16} {'/'.join(sorted(dtypes[col]))}")
         print()
         
         print("=== FIRST 5 ROWS ===")
         pd.set_option('display.max_columns', None)
         pd.set_option('display.width', None)
         pd.set_option('display.max_colwidth', 50)
-        print(df.head())
+        print(head)
         print()
         
         print("=== SAMPLE DATA FOR KEY COLUMNS ===")
         # Show unique values for potential categorical columns
-        for col in df.columns:
-            unique_count = df[col].nunique()
-            if unique_count <= 20 and unique_count > 1:  # Likely categorical
-                print(f"\n{col} (unique values: {unique_count}):")
-                print(df[col].value_counts().head(10))
+        for col in columns:
+            counts = value_counts[col]
+            if counts is not None and 1 < len(counts) <= MAX_CATEGORICAL_VALUES:  # Likely categorical
+                print(f"\n{col} (unique values: {len(counts)}):")
+                print(pd.Series(dict(counts.most_common(10)), name='count'))
         
         print("\n=== MISSING DATA SUMMARY ===")
-        missing = df.isnull().sum()
+        missing = pd.Series({col: total_rows - non_null[col] for col in columns})
         if missing.sum() > 0:
             print(missing[missing > 0])
         else:
             print("No missing data found.")
         
-        # Save as CSV for easier import
-        csv_filename = filename.replace('.xls', '.csv').replace('.xlsx', '.csv')
-        df.to_csv(csv_filename, index=False)
         print(f"\n=== CSV CONVERSION ===")
         print(f"Converted to: {csv_filename}")
         
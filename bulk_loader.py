@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""
+Shared bulk-load engine for the Kwikr worker import scripts.
+
+Transformed rows are pivoted into column batches first, then every table is
+written with executemany() in fixed-size batches inside a single transaction.
+Child tables (profiles, services, service areas, compliance) get their
+user_id from the ids assigned to the parent users rows, and are written in
+that order; once a row of a record fails, the record's remaining tables
+are skipped, as the per-row import did.
+
+bulk_load_mode() is an opt-in wrapper for large loads into a local sqlite
+file: WAL with synchronous=NORMAL while loading, the tables' non-unique
+indexes dropped up front and rebuilt once at the end, then ANALYZE. The
+dropped index definitions are stored in the database in the same
+transaction as the drop, so a failed or killed load gets them back.
+"""
+
+import sqlite3
+import time
+from contextlib import contextmanager
+
+DEFAULT_BATCH_SIZE = 500
+
+# Columns written for each table, in insert order. The users id and the
+# child user_id columns are filled in by the loader.
+WORKER_TABLE_COLUMNS = {
+    'users': (
+        'email', 'password_hash', 'password_salt', 'role', 'first_name', 'last_name',
+        'province', 'city', 'is_verified', 'is_active', 'created_at'
+    ),
+    'user_profiles': (
+        'bio', 'company_name', 'company_description', 'website_url',
+        'address_line1', 'postal_code', 'profile_image_url'
+    ),
+    'worker_services': (
+        'service_category', 'service_name', 'description',
+        'hourly_rate', 'is_available', 'service_area', 'years_experience'
+    ),
+    'worker_service_areas': ('area_name', 'is_active'),
+    'worker_compliance_summary': (
+        'province', 'primary_trade', 'overall_compliance_status',
+        'compliance_percentage', 'total_requirements', 'compliant_requirements',
+        'pending_requirements', 'expired_requirements'
+    ),
+    # Only written for deferred credential provisioning
+    'worker_account_invites': ('token', 'expires_at'),
+}
+
+PARENT_TABLE = 'users'
+
+# Definitions of the indexes a bulk load dropped, until they are rebuilt
+DEFERRED_INDEX_TABLE = 'bulk_load_deferred_indexes'
+
+
+def build_column_batches(records, table_columns=WORKER_TABLE_COLUMNS):
+    """
+    Pivot per-row records into column lists per table.
+
+    Each record maps a table name to a dict of column values (or None to skip
+    that table for the row). The returned batches remember which record owns
+    each row so child rows can be linked to their user id after insert.
+    """
+    batches = {}
+    for table, columns in table_columns.items():
+        batches[table] = {
+            'columns': tuple(columns),
+            'owners': [],
+            'values': {column: [] for column in columns},
+        }
+
+    for position, record in enumerate(records):
+        for table, columns in table_columns.items():
+            row = record.get(table)
+            if row is None:
+                continue
+            batch = batches[table]
+            batch['owners'].append(position)
+            for column in columns:
+                batch['values'][column].append(row.get(column))
+
+    return batches
+
+
+def find_existing_emails(conn, emails):
+    """
+    Return the subset of emails that already exist in users.
+
+    The incoming emails are staged in a temp table and matched against users
+    (via idx_users_email) in a single query instead of one SELECT per row.
+    """
+    cursor = conn.cursor()
+    cursor.execute("CREATE TEMP TABLE IF NOT EXISTS incoming_emails (email TEXT PRIMARY KEY)")
+    cursor.execute("DELETE FROM incoming_emails")
+    cursor.executemany(
+        "INSERT OR IGNORE INTO incoming_emails (email) VALUES (?)",
+        ((email,) for email in emails)
+    )
+    cursor.execute(f"""
+        SELECT i.email FROM incoming_emails i
+        WHERE EXISTS (SELECT 1 FROM {PARENT_TABLE} u WHERE u.email = i.email)
+    """)
+    existing = {email for (email,) in cursor.fetchall()}
+    cursor.execute("DROP TABLE incoming_emails")
+    conn.commit()
+    return existing
+
+
+def reserve_user_ids(cursor, count):
+    """Reserve a contiguous block of user ids above anything already issued."""
+    cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {PARENT_TABLE}")
+    highest = cursor.fetchone()[0]
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_sequence'")
+    if cursor.fetchone():
+        cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (PARENT_TABLE,))
+        seq = cursor.fetchone()
+        if seq and seq[0] > highest:
+            highest = seq[0]
+    return list(range(highest + 1, highest + 1 + count))
+
+
+def _insert_sql(table, columns):
+    placeholders = ', '.join('?' for _ in columns)
+    return f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+
+
+def _write_batches(cursor, sql, rows, batch_size, on_row_error):
+    """
+    Write rows with executemany() in batches of batch_size.
+
+    A failing batch is rolled back to its savepoint and replayed row by row so
+    one bad row only costs itself. Returns the ids assigned to each row, using
+    the last_insert_rowid() range of each successful batch, or None for rows
+    that failed.
+    """
+    row_ids = []
+    for start in range(0, len(rows), batch_size):
+        chunk = rows[start:start + batch_size]
+        cursor.execute("SAVEPOINT bulk_batch")
+        try:
+            cursor.executemany(sql, chunk)
+            cursor.execute("SELECT last_insert_rowid()")
+            last_id = cursor.fetchone()[0]
+            row_ids.extend(range(last_id - len(chunk) + 1, last_id + 1))
+            cursor.execute("RELEASE bulk_batch")
+        except sqlite3.DatabaseError:
+            cursor.execute("ROLLBACK TO bulk_batch")
+            cursor.execute("RELEASE bulk_batch")
+            for offset, row in enumerate(chunk):
+                try:
+                    cursor.execute(sql, row)
+                    row_ids.append(cursor.lastrowid)
+                except sqlite3.DatabaseError as e:
+                    row_ids.append(None)
+                    on_row_error(start + offset, e)
+    return row_ids
+
+
+def bulk_load(conn, batches, batch_size=DEFAULT_BATCH_SIZE, id_strategy='preassigned'):
+    """
+    Write column batches to the database in one transaction.
+
+    id_strategy selects how user ids are mapped onto child rows:
+      - 'preassigned': reserve an id block up front and insert users with explicit ids
+      - 'lastrowid': let SQLite assign ids and derive them from each batch's rowid range
+
+    Returns (user_ids, errors, timings) where user_ids is aligned with the
+    records passed to build_column_batches (None for rows that failed),
+    errors is a list of (record_position, table, exception) and timings maps
+    each table to (rows_written, seconds).
+    """
+    if id_strategy not in ('preassigned', 'lastrowid'):
+        raise ValueError(f"Unknown id_strategy: {id_strategy}")
+
+    cursor = conn.cursor()
+    errors = []
+    timings = {}
+    user_ids = []
+
+    parent = batches[PARENT_TABLE]
+    parent_columns = parent['columns']
+    parent_rows = list(zip(*(parent['values'][c] for c in parent_columns)))
+
+    conn.commit()
+    cursor.execute("BEGIN")
+    try:
+        started = time.perf_counter()
+
+        if id_strategy == 'preassigned':
+            reserved = reserve_user_ids(cursor, len(parent_rows))
+            parent_columns = ('id',) + parent_columns
+            parent_rows = [(user_id,) + row for user_id, row in zip(reserved, parent_rows)]
+
+        def parent_error(index, e):
+            errors.append((parent['owners'][index], PARENT_TABLE, e))
+
+        row_ids = _write_batches(cursor, _insert_sql(PARENT_TABLE, parent_columns),
+                                 parent_rows, batch_size, parent_error)
+        if id_strategy == 'preassigned':
+            row_ids = [reserved[i] if row_id is not None else None for i, row_id in enumerate(row_ids)]
+
+        owner_ids = dict(zip(parent['owners'], row_ids))
+        user_ids = [owner_ids.get(position) for position in range(max(parent['owners'], default=-1) + 1)]
+        timings[PARENT_TABLE] = (sum(1 for i in row_ids if i is not None), time.perf_counter() - started)
+
+        # Records with a failed child row get none of their later child tables
+        failed_owners = set()
+        for table, batch in batches.items():
+            if table == PARENT_TABLE or not batch['owners']:
+                continue
+            started = time.perf_counter()
+            columns = ('user_id',) + batch['columns']
+            owners = []
+            rows = []
+            for index, owner in enumerate(batch['owners']):
+                user_id = owner_ids.get(owner)
+                if user_id is None or owner in failed_owners:
+                    continue
+                owners.append(owner)
+                rows.append((user_id,) + tuple(batch['values'][c][index] for c in batch['columns']))
+
+            def child_error(index, e, table=table, owners=owners):
+                errors.append((owners[index], table, e))
+                failed_owners.add(owners[index])
+
+            written = _write_batches(cursor, _insert_sql(table, columns), rows, batch_size, child_error)
+            timings[table] = (sum(1 for i in written if i is not None), time.perf_counter() - started)
+
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    return user_ids, errors, timings
+
+
+def print_throughput(timings):
+    """Print rows/s for each table written by bulk_load()."""
+    print("\n=== BULK LOAD THROUGHPUT ===")
+    for table, (rows, seconds) in timings.items():
+        rate = rows / seconds if seconds > 0 else float('inf')
+        print(f"{table}: {rows} rows in {seconds:.3f}s ({rate:,.0f} rows/s)")
+
+
+def secondary_indexes(conn, tables):
+    """(name, sql) of the non-unique CREATE INDEX indexes on tables; unique ones keep enforcing constraints"""
+    indexes = []
+    for table in tables:
+        for _, name, unique, origin, _ in conn.execute(f"PRAGMA index_list({table})").fetchall():
+            if not unique and origin == 'c':
+                sql = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'index' AND name = ?",
+                                   (name,)).fetchone()[0]
+                indexes.append((name, sql))
+    return indexes
+
+
+def restore_deferred_indexes(conn):
+    """Rebuild the indexes a bulk load dropped; returns how many were rebuilt"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (DEFERRED_INDEX_TABLE,))
+    if not cursor.fetchone():
+        return 0
+
+    conn.commit()
+    cursor.execute("BEGIN")
+    try:
+        cursor.execute(f"SELECT name, sql FROM {DEFERRED_INDEX_TABLE}")
+        indexes = cursor.fetchall()
+        for name, sql in indexes:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (name,))
+            if not cursor.fetchone():
+                cursor.execute(sql)
+        cursor.execute(f"DROP TABLE {DEFERRED_INDEX_TABLE}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return len(indexes)
+
+
+def _drop_secondary_indexes(conn, tables):
+    indexes = secondary_indexes(conn, tables)
+    cursor = conn.cursor()
+    conn.commit()
+    cursor.execute("BEGIN")
+    try:
+        cursor.execute(f"CREATE TABLE {DEFERRED_INDEX_TABLE} (name TEXT PRIMARY KEY, sql TEXT NOT NULL)")
+        cursor.executemany(f"INSERT INTO {DEFERRED_INDEX_TABLE} (name, sql) VALUES (?, ?)", indexes)
+        for name, _ in indexes:
+            cursor.execute(f"DROP INDEX {name}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return indexes
+
+
+@contextmanager
+def bulk_load_mode(conn, tables=WORKER_TABLE_COLUMNS, enabled=True):
+    """
+    Tune a local sqlite connection for the bulk loads inside the block.
+
+    The previous journal_mode and synchronous settings and every dropped
+    index come back when the block exits, whether or not it raised; ANALYZE
+    only runs after a successful load. With enabled=False this does nothing.
+    """
+    if not enabled:
+        yield conn
+        return
+
+    conn.commit()
+    leftover = restore_deferred_indexes(conn)
+    if leftover:
+        print(f"🔧 Rebuilt {leftover} indexes left dropped by an interrupted bulk load")
+
+    journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+    synchronous = conn.execute("PRAGMA synchronous").fetchone()[0]
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    indexes = _drop_secondary_indexes(conn, tables)
+    print(f"⚡ Bulk-load mode: WAL, synchronous=NORMAL, {len(indexes)} indexes deferred")
+
+    succeeded = False
+    try:
+        yield conn
+        succeeded = True
+    finally:
+        started = time.perf_counter()
+        if succeeded:
+            conn.commit()
+        else:
+            conn.rollback()
+        restore_deferred_indexes(conn)
+        if succeeded:
+            conn.execute("ANALYZE")
+        conn.execute(f"PRAGMA synchronous = {synchronous}")
+        conn.execute(f"PRAGMA journal_mode = {journal_mode}")
+        action = "rebuilt and analyzed" if succeeded else "rebuilt after a failed load"
+        print(f"🔧 {len(indexes)} indexes {action} in {time.perf_counter() - started:.3f}s")
+
+
+def add_bulk_mode_arguments(parser):
+    """Add the --bulk-mode flag for scripts that load a local sqlite file"""
+    parser.add_argument('--bulk-mode', action='store_true',
+                        help='load with WAL, relaxed synchronous and deferred index builds, then ANALYZE')
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Owner-name extraction from business names, shared by the worker import scripts.
+
+Each script's ordered list of name patterns is compiled once into a single
+anchored alternation; Python tries alternatives left to right, so the first
+pattern that matches wins exactly as with the old re.match loop. Results are
+memoized in a bounded LRU cache keyed by the stripped company name, because
+partner exports repeat the same business names (franchises, re-listings).
+"""
+
+import functools
+import re
+
+import pandas as pd
+
+DEFAULT_CACHE_SIZE = 4096
+
+
+class CompanyNameExtractor:
+    """Extract (first, last) names from company names with ordered patterns and a fallback."""
+
+    def __init__(self, patterns, fallback, missing, cache_size=DEFAULT_CACHE_SIZE):
+        alternatives = []
+        self._groups = {}
+        group = 1
+        for position, pattern in enumerate(patterns):
+            inner = re.compile(pattern).groups
+            # Wrapping each alternative in a named group makes match.lastgroup
+            # name the pattern that matched; its own groups follow the wrapper
+            name = f"p{position}"
+            alternatives.append(f"(?P<{name}>{pattern})")
+            self._groups[name] = tuple(range(group + 1, group + 1 + inner))
+            group += 1 + inner
+        self.pattern = re.compile('|'.join(alternatives))
+        self._fallback = fallback
+        self._missing = missing
+        self._cached = functools.lru_cache(maxsize=cache_size)(self._extract)
+
+    def _extract(self, company):
+        match = self.pattern.match(company)
+        if match:
+            groups = self._groups[match.lastgroup]
+            first = match.group(groups[0])
+            last = match.group(groups[1]) if len(groups) > 1 and match.group(groups[1]) else "Business"
+            return first, last
+        return self._fallback(company)
+
+    def extract(self, company_name):
+        """(first, last) for one company name"""
+        if pd.isna(company_name):
+            return self._missing
+        return self._cached(str(company_name).strip())
+
+    def extract_batch(self, company_names):
+        """(first, last) for every company name in a column, in order"""
+        return [self.extract(company_name) for company_name in company_names]
+
+    def hit_rate(self):
+        """Fraction of cached lookups served from the cache so far"""
+        info = self._cached.cache_info()
+        lookups = info.hits + info.misses
+        return info.hits / lookups if lookups else 0.0
+
+    def cache_counts(self):
+        """(hits, misses, cached names) of this process's cache so far"""
+        info = self._cached.cache_info()
+        return info.hits, info.misses, info.currsize
+
+    def print_cache_stats(self, counts=None):
+        """Print cache_counts(), or counts summed from the caches of several processes"""
+        hits, misses, cached = counts or self.cache_counts()
+        lookups = hits + misses
+        rate = hits / lookups if lookups else 0.0
+        print(f"🧠 Name cache: {hits} hits / {lookups} lookups ({rate:.1%}), {cached} cached names")
@@ -18,16 +18,19 @@ def count_workers():
     for row in cursor.fetchall():
         print(f"{row[0]}: {row[1]} workers")
     
+    # Category breakdown comes from the worker_directory_stats rollup (migration 0022) instead of scanning every service
     print("\n=== SERVICE CATEGORIES ===")
     cursor.execute("""
-        SELECT ws.service_category, COUNT(*) as count
-        FROM worker_services ws
-        GROUP BY ws.service_category
+        SELECT service_category, SUM(worker_count) as count, SUM(service_count) as services,
+               SUM(rate_total) / NULLIF(SUM(rated_count), 0) as avg_hourly_rate
+        FROM worker_directory_stats
+        GROUP BY service_category
         ORDER BY count DESC
     """)
     
     for row in cursor.fetchall():
-        print(f"{row[0]}: {row[1]} workers")
+        rate = f" (avg ${row[3]:.2f}/hr)" if row[3] is not None else ""
+        print(f"{row[0]}: {row[1]} workers, {row[2]} services{rate}")
     
     print("\n=== ONTARIO PLUMBERS SAMPLE ===")
     cursor.execute("""
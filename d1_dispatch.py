@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""
+Bounded-concurrency dispatch of chunked SQL to D1.
+
+Chunks are grouped into named stages, normally one per table. A stage only
+starts once the stages it depends on have finished, so users are written
+before the profiles and services that reference them, while independent
+stages and the chunks inside a stage run side by side.
+
+Against production (WranglerD1Executor) up to `concurrency` wrangler
+processes are kept in flight with asyncio.create_subprocess_exec. Failures
+that look like a timeout or rate limiting are retried with exponential
+backoff and full jitter; any other failure is reported straight away. There
+are no fixed sleeps between chunks.
+
+The local executor writes through a single sqlite connection, so its stages
+run one after another in dependency order, each in one transaction.
+
+A multi-row statement (sql_chunks.RowStatement) that fails for any other
+reason is bisected: its halves are retried, recursively, until every row
+that still fails is on its own. Those rows are rejected -- written with the
+database error to a JSON-lines reject file -- and every other row of the
+chunk is still loaded, so one bad row no longer costs the whole chunk.
+
+Given an import_journal.ImportJournal, a re-run after a failure skips what
+an earlier run committed and picks up where it stopped. Multi-row INSERTs
+are journaled by the keys of the rows that landed and the rows rejected,
+not by chunk label: the chunker may have shrunk its budget during the
+interrupted run, so the resumed run packs rows into different chunks.
+Only the rows not yet settled are sent again, and rows rejected before the
+interruption are still reported as rejected. Plain SQL chunks are
+journaled by label.
+"""
+
+import asyncio
+import json
+import os
+import random
+import re
+import subprocess
+
+from d1_executor import PROJECT_DIR
+from sql_chunks import RowStatement, is_too_long
+
+DEFAULT_CONCURRENCY = 4
+MAX_ATTEMPTS = 5
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 30.0
+DEFAULT_REJECT_FILE = os.path.join(PROJECT_DIR, 'import_rejects.jsonl')
+
+# Stages that must finish before a stage may start (foreign keys point at users)
+TABLE_DEPENDENCIES = {
+    'user_profiles': ('users',),
+    'worker_services': ('users',),
+}
+
+# Only these failures are worth retrying; constraint errors etc. fail the same way every time
+RETRYABLE_ERROR = re.compile(r'rate.?limit|too many requests|\b429\b|timed? ?out|timeout', re.IGNORECASE)
+
+
+def is_retryable(result):
+    """Whether a failed execution looks like a timeout or rate limit"""
+    return result.returncode != 0 and bool(RETRYABLE_ERROR.search(result.stderr or ''))
+
+
+def backoff_delay(attempt, base=BACKOFF_BASE, cap=BACKOFF_CAP):
+    """Full-jitter exponential backoff before retry number attempt (0-based)"""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def stage_order(names, dependencies=TABLE_DEPENDENCIES):
+    """Order stage names so dependencies come first, otherwise keeping the given order"""
+    ordered = []
+    visiting = set()
+
+    def visit(name):
+        if name in ordered:
+            return
+        if name in visiting:
+            raise ValueError(f"Circular stage dependency at {name}")
+        visiting.add(name)
+        for dependency in dependencies.get(name, ()):
+            if dependency in names:
+                visit(dependency)
+        visiting.discard(name)
+        ordered.append(name)
+
+    for name in names:
+        visit(name)
+    return ordered
+
+
+def _failed(results):
+    # A stage with chunks but no successful chunk blocks the stages that depend on it
+    return results is None or (results and not any(result.returncode == 0 for result in results))
+
+
+def rejected_rows(result):
+    """(key, values_sql, error) for each row rejected from the chunk behind result"""
+    return getattr(result, 'rejected', [])
+
+
+def _reject(statement, result):
+    # A single row that fails on its own is rejected instead of failing the chunk
+    result.rejected = [(key, values, result.stderr.strip()) for key, values in statement.rows]
+    return result
+
+
+def _combine(results):
+    # One result for a statement that was executed as several parts
+    rejected = [row for result in results for row in rejected_rows(result)]
+    failed = [result for result in results if result.returncode != 0 and not rejected_rows(result)]
+    loaded = [result for result in results if result.returncode == 0]
+    if failed or not loaded:
+        first = (failed or results)[0]
+        combined = subprocess.CompletedProcess(first.args, first.returncode, '', first.stderr)
+    else:
+        combined = subprocess.CompletedProcess(loaded[0].args, 0, ''.join(result.stdout for result in loaded), '')
+    combined.rejected = rejected
+    return combined
+
+
+def _split_failed(statement, result, bisect=True):
+    """Halves to retry when a multi-row statement failed for size or (when bisecting) its rows, else None"""
+    if result.returncode == 0 or is_retryable(result) or len(getattr(statement, 'rows', ())) < 2:
+        return None
+    if is_too_long(result):
+        if statement.chunker is not None:
+            statement.chunker.shrink(len(statement.sql.encode('utf-8')))
+    elif not bisect:
+        return None
+    return statement.split()
+
+
+def _isolated(statement, result, bisect):
+    # A single-row statement that failed for a reason other than a timeout or rate limit
+    return (bisect and result.returncode != 0 and not is_retryable(result)
+            and len(getattr(statement, 'rows', ())) == 1)
+
+
+def _execute(executor, statement, bisect=True):
+    result = executor.execute(str(statement))
+    if _isolated(statement, result, bisect):
+        return _reject(statement, result)
+    parts = _split_failed(statement, result, bisect)
+    if parts is None:
+        return result
+    return _combine([_execute(executor, part, bisect) for part in parts])
+
+
+def _already_committed(rejected):
+    # Stand-in result for a chunk the journal says an earlier run committed, with the rows it rejected then
+    result = subprocess.CompletedProcess([], 0, '', '')
+    result.resumed = True
+    result.rejected = rejected
+    return result
+
+
+def _resume(journal, name, label, statement):
+    """
+    The part of a chunk still to run (None if an earlier run committed all
+    of it), and the (key, values, error) rows an earlier run rejected from it.
+    """
+    if not isinstance(statement, RowStatement):
+        return (None if journal.is_committed(name, label) else statement), []
+    landed, errors = journal.landed(name), journal.rejected(name)
+    rejected = [(key, values, errors[key]) for key, values in statement.rows if key in errors]
+    pending = [(key, values) for key, values in statement.rows if key not in landed and key not in errors]
+    if not pending:
+        return None, rejected
+    if len(pending) < len(statement.rows):
+        statement = RowStatement(statement.header, pending, statement.separator, statement.terminator,
+                                 statement.chunker)
+    return statement, rejected
+
+
+def _run_chunk(executor, journal, name, label, statement, bisect):
+    # (result, statement that ran) for one chunk, minus what the journal says is already committed
+    if not journal:
+        return _execute(executor, statement, bisect), statement
+    pending, rejected = _resume(journal, name, label, statement)
+    if pending is None:
+        return _already_committed(rejected), None
+    result = _execute(executor, pending, bisect)
+    if rejected:
+        result.rejected = rejected + rejected_rows(result)
+    return result, pending
+
+
+def _checkpoint(label, statement, result):
+    """(chunk labels, landed row keys, (row key, error) of rejected rows) to journal for a committed chunk"""
+    if not isinstance(statement, RowStatement):
+        return [label], [], []
+    rejected = [(key, error) for key, _, error in rejected_rows(result)]
+    failed = {key for key, _ in rejected}
+    return [], [key for key, _ in statement.rows if key not in failed], rejected
+
+
+def _run_sequential(executor, stages, dependencies, on_result, bisect, journal):
+    chunks_by_name = dict(stages)
+    results = {}
+    for name in stage_order(list(chunks_by_name), dependencies):
+        if any(_failed(results.get(dependency, [])) for dependency in dependencies.get(name, ())):
+            results[name] = None
+            continue
+        results[name] = []
+        committed, landed, rejected = [], [], []
+        with executor.stage(name):
+            for label, statement in chunks_by_name[name]:
+                result, ran = _run_chunk(executor, journal, name, label, statement, bisect)
+                if ran is not None and result.returncode == 0:
+                    chunks, keys, errors = _checkpoint(label, ran, result)
+                    committed += chunks
+                    landed += keys
+                    rejected += errors
+                results[name].append(result)
+                if on_result:
+                    on_result(name, label, result)
+        # Only journaled once the stage transaction has committed
+        if journal:
+            journal.commit(name, committed, landed, rejected)
+    return results
+
+
+async def _execute_with_retry(executor, semaphore, statement, max_attempts, bisect):
+    for attempt in range(max_attempts):
+        async with semaphore:
+            try:
+                result = await executor.execute_async(str(statement))
+            except subprocess.TimeoutExpired as e:
+                result = subprocess.CompletedProcess(e.cmd, 1, '', f"Timed out after {e.timeout}s")
+        if attempt + 1 == max_attempts or not is_retryable(result):
+            break
+        # Back off outside the semaphore so other chunks keep the slots busy
+        await asyncio.sleep(backoff_delay(attempt))
+
+    if _isolated(statement, result, bisect):
+        return _reject(statement, result)
+    parts = _split_failed(statement, result, bisect)
+    if parts is None:
+        return result
+    return _combine(await asyncio.gather(
+        *(_execute_with_retry(executor, semaphore, part, max_attempts, bisect) for part in parts)
+    ))
+
+
+async def _run_concurrent(executor, stages, concurrency, dependencies, on_result, max_attempts, bisect, journal):
+    semaphore = asyncio.Semaphore(concurrency)
+    finished = {name: asyncio.Event() for name, _ in stages}
+    results = {}
+
+    async def run_chunk(name, label, statement):
+        pending, rejected = _resume(journal, name, label, statement) if journal else (statement, [])
+        if pending is None:
+            result = _already_committed(rejected)
+        else:
+            result = await _execute_with_retry(executor, semaphore, pending, max_attempts, bisect)
+            if rejected:
+                result.rejected = rejected + rejected_rows(result)
+            # Each wrangler call commits on its own
+            if journal and result.returncode == 0:
+                journal.commit(name, *_checkpoint(label, pending, result))
+        if on_result:
+            on_result(name, label, result)
+        return result
+
+    async def run_stage(name, chunks):
+        try:
+            for dependency in dependencies.get(name, ()):
+                if dependency in finished:
+                    await finished[dependency].wait()
+                    if _failed(results.get(dependency)):
+                        results[name] = None
+                        return
+            # Workers pull chunks one at a time, so each is only packed when a slot is about to
+            # run it, and packs with the budget as any earlier too-long failure left it
+            pulled = enumerate(chunks)
+            stage_results = {}
+
+            async def worker():
+                for index, (label, statement) in pulled:
+                    stage_results[index] = await run_chunk(name, label, statement)
+
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+            results[name] = [stage_results[index] for index in sorted(stage_results)]
+        finally:
+            finished[name].set()
+
+    await asyncio.gather(*(run_stage(name, chunks) for name, chunks in stages))
+    return results
+
+
+def run_stages(executor, stages, concurrency=DEFAULT_CONCURRENCY, dependencies=TABLE_DEPENDENCIES,
+               on_result=None, max_attempts=MAX_ATTEMPTS, bisect=True, reject_file=None, journal=None):
+    """
+    Execute stages of SQL chunks in dependency order.
+
+    stages is a list of (name, chunks) where chunks is an iterable of
+    (label, statement), statement being SQL text or a sql_chunks.RowStatement
+    (split and retried in halves if D1 rejects it as too long, or bisected
+    down to the failing rows when bisect is set);
+    on_result(name, label, result) is called as each chunk finishes.
+    Rows rejected by bisection are listed by rejected_rows(result) and, if
+    reject_file is given, written to it. With a journal, committed chunks
+    are skipped and recorded, and a run without failures clears it.
+    Returns {name: [CompletedProcess, ...]} in chunk order, with None for
+    stages skipped because a dependency had no successful chunk.
+    """
+    if reject_file:
+        with RejectFile(reject_file) as rejects:
+            def record(name, label, result):
+                rejects.write(name, label, result)
+                if on_result:
+                    on_result(name, label, result)
+            results = run_stages(executor, stages, concurrency, dependencies, record, max_attempts, bisect,
+                                 journal=journal)
+            rejects.print_summary()
+        return results
+
+    if hasattr(executor, 'execute_async'):
+        results = asyncio.run(_run_concurrent(executor, stages, concurrency, dependencies, on_result, max_attempts,
+                                              bisect, journal))
+    else:
+        results = _run_sequential(executor, stages, dependencies, on_result, bisect, journal)
+
+    if journal and all_succeeded(results):
+        journal.finish()
+    return results
+
+
+def all_succeeded(results):
+    """Whether every stage ran and every chunk of it was committed (rejected rows aside)"""
+    return all(stage_results is not None and all(result.returncode == 0 for result in stage_results)
+               for stage_results in results.values())
+
+
+class RejectFile:
+    """JSON-lines file of rejected rows, one object per row with the database error."""
+
+    def __init__(self, path=DEFAULT_REJECT_FILE):
+        self.path = path
+        self.count = 0
+        self._file = None
+
+    def write(self, stage, label, result):
+        for key, values, error in rejected_rows(result):
+            # Only created once there is something to reject, replacing the last run's file
+            if self._file is None:
+                self._file = open(self.path, 'w', encoding='utf-8')
+            self._file.write(json.dumps({
+                'stage': stage, 'chunk': label, 'record': key, 'error': error, 'values': values,
+            }) + '\n')
+            self.count += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def print_summary(self):
+        if self.count:
+            print(f"🚫 {self.count} rejected rows written to {self.path}")
+
+
+def print_chunk_result(name, label, result):
+    """on_result callback printing one line per chunk"""
+    rejected = rejected_rows(result)
+    if getattr(result, 'resumed', False):
+        print(f"⏩ {label} already committed, skipped")
+    elif result.returncode == 0 and rejected:
+        print(f"⚠️ {label} imported, {len(rejected)} rows rejected: {rejected[0][2][:200]}")
+    elif result.returncode == 0:
+        print(f"✅ {label} imported successfully")
+    else:
+        print(f"❌ {label} failed: {result.stderr[:200]}...")
+
+
+def print_stage_summary(results, titles=None):
+    """Print successful/total chunks per stage"""
+    titles = titles or {}
+    for name, stage_results in results.items():
+        title = titles.get(name, name)
+        if stage_results is None:
+            print(f"⏭️ {title}: skipped, a stage it depends on failed")
+        else:
+            successful = sum(1 for result in stage_results if result.returncode == 0)
+            rejected = sum(len(rejected_rows(result)) for result in stage_results)
+            note = f", {rejected} rows rejected" if rejected else ""
+            print(f"📊 {title}: {successful}/{len(stage_results)} chunks successful{note}")
+
+
+def add_dispatch_arguments(parser):
+    """Add the --concurrency flag shared by the D1 import scripts"""
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                        help='wrangler executions kept in flight for --remote runs')
+
+
+def add_reject_arguments(parser):
+    """Add the --reject-file flag for scripts whose chunks can be bisected into rows"""
+    parser.add_argument('--reject-file', default=DEFAULT_REJECT_FILE,
+                        help='JSON-lines file for rows the database rejected, with the error')
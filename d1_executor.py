@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Run SQL against the kwikr-directory-production D1 database.
+
+LocalD1Executor applies statements in-process to the miniflare sqlite file
+that `wrangler d1 execute --local` writes to (the file check_db.py inspects),
+so a chunked import is one connection and one transaction per stage instead
+of a Node process launch per chunk. WranglerD1Executor shells out to
+`wrangler d1 execute --remote` and is only used for production (--remote).
+
+Both executors return subprocess.CompletedProcess objects, so the importers
+check returncode/stdout/stderr exactly as they did with subprocess.run.
+"""
+
+import asyncio
+import glob
+import json
+import os
+import sqlite3
+import subprocess
+import tempfile
+import time
+from contextlib import contextmanager
+
+from sql_stream import iter_sql_statements, read_sql_statements
+
+PROJECT_DIR = '/home/user/webapp'
+DATABASE_NAME = 'kwikr-directory-production'
+LOCAL_D1_DIR = os.path.join('.wrangler', 'state', 'v3', 'd1', 'miniflare-D1DatabaseObject')
+LOCAL_D1_FILE = 'a31fcc237b8df81a82a97d8eeaf66c7474deb533ac08d408898123bbd56ffee7.sqlite'
+
+
+def find_local_database(project_dir=PROJECT_DIR):
+    """Path of the miniflare sqlite file backing the local D1 database"""
+    path = os.path.join(project_dir, LOCAL_D1_DIR, LOCAL_D1_FILE)
+    if os.path.exists(path):
+        return path
+
+    # The file name is derived from the database id; fall back to the only candidate
+    candidates = [candidate for candidate in glob.glob(os.path.join(project_dir, LOCAL_D1_DIR, '*.sqlite'))
+                  if os.path.basename(candidate) != 'metadata.sqlite']
+    if len(candidates) == 1:
+        return candidates[0]
+
+    raise FileNotFoundError(
+        f"Local D1 database not found under {os.path.join(project_dir, LOCAL_D1_DIR)}; "
+        f"run `npm run db:migrate:local` first"
+    )
+
+
+def iter_statements(sql):
+    """Split a SQL script into complete statements (semicolons inside strings and comments are kept)"""
+    return iter_sql_statements(sql.splitlines(keepends=True))
+
+
+class LocalD1Executor:
+    """Execute SQL directly against the local miniflare D1 sqlite file."""
+
+    def __init__(self, db_path=None, project_dir=PROJECT_DIR, foreign_keys=False):
+        self.db_path = db_path or find_local_database(project_dir)
+        self.conn = sqlite3.connect(self.db_path, isolation_level=None)
+        # Off by default: invoice_attachments references users(user_id), which
+        # makes every write to users fail with "foreign key mismatch" when enforced
+        if foreign_keys:
+            self.conn.execute("PRAGMA foreign_keys = ON")
+        self._savepoints = 0
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @contextmanager
+    def stage(self, name):
+        """Run everything inside the block as one transaction, rolled back if the block raises"""
+        self.conn.execute("BEGIN")
+        try:
+            yield self
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    def execute(self, sql):
+        """
+        Execute a SQL script atomically, like one `wrangler d1 execute --local` call.
+
+        A failing statement rolls back the whole script (and only that
+        script) and is reported through returncode/stderr.
+        """
+        return self._execute_statements(iter_statements(sql))
+
+    def _execute_statements(self, statements):
+        args = ['sqlite3', self.db_path]
+        self._savepoints += 1
+        savepoint = f"d1_execute_{self._savepoints}"
+        cursor = self.conn.cursor()
+        cursor.execute(f"SAVEPOINT {savepoint}")
+        results = []
+        try:
+            for statement in statements:
+                started = time.perf_counter()
+                changes = self.conn.total_changes
+                cursor.execute(statement)
+                rows = []
+                if cursor.description:
+                    columns = [column[0] for column in cursor.description]
+                    rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+                results.append({
+                    'results': rows,
+                    'success': True,
+                    'meta': {
+                        'changes': self.conn.total_changes - changes,
+                        'duration': round((time.perf_counter() - started) * 1000, 3),
+                    },
+                })
+        except sqlite3.Error as e:
+            cursor.execute(f"ROLLBACK TO {savepoint}")
+            cursor.execute(f"RELEASE {savepoint}")
+            return subprocess.CompletedProcess(args, 1, '', f"D1_ERROR: {e}")
+        finally:
+            self._savepoints -= 1
+        cursor.execute(f"RELEASE {savepoint}")
+        return subprocess.CompletedProcess(args, 0, json.dumps(results, indent=2), '')
+
+    def execute_file(self, sql_file):
+        """Execute a .sql file (the --file form), streaming it one statement at a time"""
+        return self._execute_statements(read_sql_statements(sql_file))
+
+    def execute_command(self, sql):
+        """Execute an inline command (the --command form)"""
+        return self.execute(sql)
+
+    def query(self, sql):
+        """Rows of the last statement in sql as dicts; raises RuntimeError if it fails"""
+        result = self.execute(sql)
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr)
+        return json.loads(result.stdout)[-1]['results']
+
+
+class WranglerD1Executor:
+    """Execute SQL with `npx wrangler d1 execute --remote` (production only)."""
+
+    def __init__(self, project_dir=PROJECT_DIR, timeout=120):
+        self.project_dir = project_dir
+        self.timeout = timeout
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @contextmanager
+    def stage(self, name):
+        # Every wrangler call commits on its own; there is no cross-call transaction
+        yield self
+
+    def _command(self, target, *options):
+        return ["npx", "wrangler", "d1", "execute", DATABASE_NAME, "--remote", target, *options]
+
+    def _run(self, target, *options):
+        return subprocess.run(self._command(target, *options), cwd=self.project_dir,
+                              capture_output=True, text=True, timeout=self.timeout)
+
+    @staticmethod
+    def _write_temp_file(sql):
+        fd, temp_file = tempfile.mkstemp(suffix='.sql')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(sql)
+        return temp_file
+
+    def execute(self, sql):
+        """Execute a SQL script through a temporary --file"""
+        temp_file = self._write_temp_file(sql)
+        try:
+            return self._run(f"--file={temp_file}")
+        finally:
+            os.remove(temp_file)
+
+    async def execute_async(self, sql):
+        """execute() without blocking the event loop, so several wrangler processes can run at once"""
+        temp_file = self._write_temp_file(sql)
+        args = self._command(f"--file={temp_file}")
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *args, cwd=self.project_dir,
+                stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+            )
+            try:
+                stdout, stderr = await asyncio.wait_for(process.communicate(), self.timeout)
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+                raise subprocess.TimeoutExpired(args, self.timeout)
+            return subprocess.CompletedProcess(args, process.returncode,
+                                               stdout.decode('utf-8', 'replace'), stderr.decode('utf-8', 'replace'))
+        finally:
+            os.remove(temp_file)
+
+    def execute_file(self, sql_file):
+        return self._run(f"--file={sql_file}")
+
+    def execute_command(self, sql):
+        return self._run(f"--command={sql}")
+
+    def query(self, sql):
+        """Rows of the last statement in sql as dicts (wrangler --json); raises RuntimeError if it fails"""
+        result = self._run(f"--command={sql}", "--json")
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr)
+        return json.loads(result.stdout)[-1]['results']
+
+
+def add_target_arguments(parser):
+    """Add the --remote flag shared by the D1 import scripts"""
+    parser.add_argument('--remote', action='store_true',
+                        help='run against the production D1 database through wrangler instead of the local sqlite file')
+
+
+def open_executor(remote=False, project_dir=PROJECT_DIR):
+    """In-process executor for the local database, or wrangler for --remote"""
+    if remote:
+        return WranglerD1Executor(project_dir)
+    return LocalD1Executor(project_dir=project_dir)
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Merkle-style diff of two sqlite databases, e.g. the local D1 file and an
+exported production snapshot.
+
+Comparing two databases row by row reads and compares every row of every
+table even when only a handful differ. Here every table with an integer
+primary key is treated as a hash tree over its key range: a node covers an
+aligned range of keys and its hash is the row count plus two sums of
+per-row hashes, computed inside sqlite by one GROUP BY over that range.
+The top level is computed for the whole table, and only the children of
+nodes that differ are computed, level by level, until the ranges are small
+enough to fetch and compare their rows. Identical tables cost one indexed
+scan on each side; a few changed rows add a few narrow range scans.
+
+Tables without an integer primary key are compared as a single node and
+their rows matched by primary key (or by whole row if they have none).
+
+    python3 db_diff.py [A.sqlite B.sqlite] [--table users ...] [--leaf-rows 64] [--max-rows 50]
+
+Without paths it compares the two databases check_db.py inspects.
+"""
+
+import argparse
+import hashlib
+import os
+import sqlite3
+import time
+
+from check_db import DATABASES
+
+# Children per tree node, and key range at which rows are fetched and compared
+FANOUT = 16
+DEFAULT_LEAF_ROWS = 64
+
+# Differing rows printed per table
+DEFAULT_MAX_ROWS = 50
+
+
+def _row_hash(*values):
+    # 63 bits, so the value stays a positive sqlite integer
+    digest = hashlib.blake2b(repr(values).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') >> 1
+
+
+def connect(path):
+    """Read-only connection with the row_hash() SQL function registered"""
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    conn.create_function('row_hash', -1, _row_hash, deterministic=True)
+    return conn
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def table_names(conn):
+    return {name for (name,) in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")}
+
+
+def table_columns(conn, table):
+    """[(column name, declared type, primary key position)] of table"""
+    return [(name, column_type, pk) for _, name, column_type, _, _, pk in
+            conn.execute(f"PRAGMA table_info({_quote(table)})")]
+
+
+class TableShape:
+    """The columns two versions of a table share, and the key their rows are matched by."""
+
+    def __init__(self, table, columns_a, columns_b):
+        self.table = table
+        names_b = {name for name, _, _ in columns_b}
+        self.columns = [name for name, _, _ in columns_a if name in names_b]
+        self.only_a = [name for name, _, _ in columns_a if name not in names_b]
+        self.only_b = sorted(names_b - {name for name, _, _ in columns_a})
+
+        primary_key = [name for name, _, pk in sorted(columns_a, key=lambda column: column[2]) if pk]
+        self.key_columns = [name for name in primary_key if name in names_b] or list(self.columns)
+        integer_keys = [name for name, column_type, pk in columns_a if pk and column_type.upper() == 'INTEGER']
+        # A single INTEGER PRIMARY KEY is the rowid, so range scans on it use the table's b-tree
+        self.integer_key = integer_keys[0] if len(primary_key) == 1 and integer_keys else None
+
+    def hash_sql(self):
+        return f"row_hash({', '.join(_quote(column) for column in self.columns)})"
+
+
+class TableDiff:
+    """Rows of a table only in A, only in B, or present in both with different values."""
+
+    def __init__(self, table):
+        self.table = table
+        self.only_a = []
+        self.only_b = []
+        self.changed = []
+        self.nodes = 0
+
+    def __bool__(self):
+        return bool(self.only_a or self.only_b or self.changed)
+
+    def summary(self):
+        return f"{len(self.only_a)} only in A, {len(self.only_b)} only in B, {len(self.changed)} changed"
+
+
+def _node_hashes(conn, shape, base, lo, width, child_width):
+    """{child number: (rows, hash sums)} for the children of the node [lo, lo + width)"""
+    key = _quote(shape.integer_key)
+    rows = conn.execute(
+        f"SELECT ({key} - {base}) / {child_width} AS child, COUNT(*), SUM(hash >> 32), SUM(hash & 4294967295) "
+        f"FROM (SELECT {key}, {shape.hash_sql()} AS hash FROM {_quote(shape.table)} "
+        f"WHERE {key} >= ? AND {key} < ?) GROUP BY child",
+        (lo, lo + width)
+    )
+    return {child: tuple(sums) for child, *sums in rows}
+
+
+def _fetch_rows(conn, shape, lo=None, hi=None):
+    """{key: row} of table, optionally for integer keys in [lo, hi)"""
+    key_positions = [shape.columns.index(name) for name in shape.key_columns]
+    sql = f"SELECT {', '.join(_quote(column) for column in shape.columns)} FROM {_quote(shape.table)}"
+    params = ()
+    if lo is not None:
+        sql += f" WHERE {_quote(shape.integer_key)} >= ? AND {_quote(shape.integer_key)} < ?"
+        params = (lo, hi)
+    return {tuple(row[position] for position in key_positions): row for row in conn.execute(sql, params)}
+
+
+def _compare_rows(diff, shape, rows_a, rows_b):
+    for key in sorted(rows_a.keys() | rows_b.keys(), key=repr):
+        row_a, row_b = rows_a.get(key), rows_b.get(key)
+        if row_b is None:
+            diff.only_a.append(dict(zip(shape.columns, row_a)))
+        elif row_a is None:
+            diff.only_b.append(dict(zip(shape.columns, row_b)))
+        elif row_a != row_b:
+            changes = {column: (a, b) for column, a, b in zip(shape.columns, row_a, row_b) if a != b}
+            diff.changed.append((dict(zip(shape.key_columns, key)), changes))
+
+
+def diff_table(conn_a, conn_b, shape, leaf_rows=DEFAULT_LEAF_ROWS):
+    """Walk the hash trees of one table on both sides down to the ranges that differ"""
+    diff = TableDiff(shape.table)
+    if shape.integer_key is None:
+        _compare_rows(diff, shape, _fetch_rows(conn_a, shape), _fetch_rows(conn_b, shape))
+        return diff
+
+    key = _quote(shape.integer_key)
+    bounds = [conn.execute(f"SELECT MIN({key}), MAX({key}) FROM {_quote(shape.table)}").fetchone()
+              for conn in (conn_a, conn_b)]
+    lows = [low for low, _ in bounds if low is not None]
+    if not lows:
+        return diff
+    base = min(lows)
+    span = max(high for _, high in bounds if high is not None) - base + 1
+
+    # The root covers every key; each level splits a node into FANOUT aligned children
+    width = leaf_rows
+    while width < span:
+        width *= FANOUT
+    pending = [(base, width)]
+    while pending:
+        lo, width = pending.pop()
+        diff.nodes += 1
+        if width <= leaf_rows:
+            _compare_rows(diff, shape, _fetch_rows(conn_a, shape, lo, lo + width),
+                          _fetch_rows(conn_b, shape, lo, lo + width))
+            continue
+        child_width = width // FANOUT
+        children_a = _node_hashes(conn_a, shape, base, lo, width, child_width)
+        children_b = _node_hashes(conn_b, shape, base, lo, width, child_width)
+        for child in sorted(children_a.keys() | children_b.keys(), reverse=True):
+            if children_a.get(child) != children_b.get(child):
+                pending.append((base + child * child_width, child_width))
+    return diff
+
+
+def _format_value(value, limit=60):
+    text = repr(value)
+    return text if len(text) <= limit else text[:limit - 1] + '…'
+
+
+def _format_row(row):
+    return ', '.join(f"{column}={_format_value(value)}" for column, value in row.items())
+
+
+def print_diff(diff, max_rows=DEFAULT_MAX_ROWS):
+    print(f"❌ {diff.table}: {diff.summary()}")
+    lines = ([f"  - {_format_row(row)}" for row in diff.only_a] +
+             [f"  + {_format_row(row)}" for row in diff.only_b] +
+             [f"  ~ {_format_row(key)}: " + ', '.join(f"{column} {_format_value(a)} → {_format_value(b)}" for column, (a, b) in changes.items())
+              for key, changes in diff.changed])
+    for line in lines[:max_rows]:
+        print(line)
+    if len(lines) > max_rows:
+        print(f"  … {len(lines) - max_rows} more")
+
+
+def diff_databases(path_a, path_b, tables=None, leaf_rows=DEFAULT_LEAF_ROWS, max_rows=DEFAULT_MAX_ROWS):
+    """Print the differences between two databases; returns {table: TableDiff} of the tables that differ"""
+    print(f"🔀 A: {path_a}\n🔀 B: {path_b}")
+    conn_a, conn_b = connect(path_a), connect(path_b)
+    differences = {}
+    try:
+        names_a, names_b = table_names(conn_a), table_names(conn_b)
+        for table in sorted((names_a ^ names_b) & set(tables or names_a | names_b)):
+            print(f"❌ {table}: only in {'A' if table in names_a else 'B'}")
+        for table in sorted((names_a & names_b) & set(tables or names_a)):
+            started = time.perf_counter()
+            shape = TableShape(table, table_columns(conn_a, table), table_columns(conn_b, table))
+            if shape.only_a or shape.only_b:
+                print(f"⚠️ {table}: columns only in A: {', '.join(shape.only_a) or '-'}; "
+                      f"only in B: {', '.join(shape.only_b) or '-'} (compared on the shared columns)")
+            diff = diff_table(conn_a, conn_b, shape, leaf_rows)
+            seconds = time.perf_counter() - started
+            if diff:
+                print_diff(diff, max_rows)
+                differences[table] = diff
+            else:
+                print(f"✅ {table}: identical ({diff.nodes} nodes, {seconds:.2f}s)")
+    finally:
+        conn_a.close()
+        conn_b.close()
+    return differences
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show the rows that differ between two sqlite databases.")
+    parser.add_argument('databases', nargs='*', default=DATABASES, metavar='DATABASE',
+                        help='the two sqlite files to compare (default: the ones check_db.py inspects)')
+    parser.add_argument('--table', action='append', dest='tables', help='only compare this table (repeatable)')
+    parser.add_argument('--leaf-rows', type=int, default=DEFAULT_LEAF_ROWS,
+                        help='key range at which rows are fetched and compared')
+    parser.add_argument('--max-rows', type=int, default=DEFAULT_MAX_ROWS, help='differing rows printed per table')
+    args = parser.parse_args()
+    if len(args.databases) != 2:
+        parser.error('expected two databases')
+    for path in args.databases:
+        if not os.path.exists(path):
+            print(f"❌ Database not found: {path}")
+            raise SystemExit(2)
+    differences = diff_databases(*args.databases, tables=args.tables, leaf_rows=args.leaf_rows, max_rows=args.max_rows)
+    raise SystemExit(1 if differences else 0)
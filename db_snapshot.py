@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Prebuilt snapshots of the migrated local D1 database for instant resets.
+
+`npm run db:reset` deletes .wrangler/state/v3/d1 and replays every migration
+(megabytes of SQL, most of it the business-import migrations) and the seed
+through wrangler, which takes minutes. This tool builds the migrated and
+seeded sqlite file once and keeps it under .cache/db_snapshots, keyed by the
+SHA-256 of the migrations directory (file names and contents) and seed.sql.
+A reset restores the snapshot for the current key into the miniflare file
+with the sqlite backup API, which takes milliseconds; when the migrations
+change, the key changes and the next reset builds a new snapshot.
+
+Migrations are applied in file-name order, each atomically, and recorded in
+d1_migrations like `wrangler d1 migrations apply` does, so wrangler sees the
+restored database as up to date. A migration that fails stops the build
+(--keep-going skips it instead and leaves it unrecorded). `build
+--from-local` adopts the current local database, e.g. after a wrangler
+replay, as the snapshot for the current migrations; `npm run db:reset`
+falls back to that (`npm run db:snapshot`) when the snapshot cannot be
+built from the migrations.
+
+    python3 db_snapshot.py reset        # restore, building the snapshot first if needed
+    python3 db_snapshot.py build [--from-local] [--keep-going]
+    python3 db_snapshot.py list | clear
+"""
+
+import argparse
+import hashlib
+import os
+import sqlite3
+import time
+
+from d1_executor import LOCAL_D1_DIR, LOCAL_D1_FILE, LocalD1Executor, find_local_database
+
+# The project this script lives in: migrations/, seed.sql and .wrangler/ sit next to it
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+SNAPSHOT_DIR = os.environ.get('KWIKR_DB_SNAPSHOTS', os.path.join(PROJECT_DIR, '.cache', 'db_snapshots'))
+MAX_SNAPSHOTS = 4
+
+MIGRATIONS_TABLE = 'd1_migrations'
+
+# Same table wrangler creates to track applied migrations
+MIGRATIONS_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS {MIGRATIONS_TABLE} (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT UNIQUE,
+    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL
+)
+"""
+
+
+def migration_files(project_dir=PROJECT_DIR):
+    """Migration .sql files in the order wrangler applies them"""
+    migrations_dir = os.path.join(project_dir, 'migrations')
+    return [os.path.join(migrations_dir, name) for name in sorted(os.listdir(migrations_dir))
+            if name.endswith('.sql')]
+
+
+def seed_file(project_dir=PROJECT_DIR):
+    """seed.sql run by `npm run db:seed`, if the project has one"""
+    path = os.path.join(project_dir, 'seed.sql')
+    return path if os.path.exists(path) else None
+
+
+def build_files(project_dir=PROJECT_DIR):
+    """Every file a reset applies: the migrations, then the seed"""
+    seed = seed_file(project_dir)
+    return migration_files(project_dir) + ([seed] if seed else [])
+
+
+def snapshot_key(project_dir=PROJECT_DIR):
+    """SHA-256 over the names and contents of the migrations and the seed"""
+    digest = hashlib.sha256()
+    for path in build_files(project_dir):
+        digest.update(os.path.basename(path).encode('utf-8') + b'\0')
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def snapshot_path(key, snapshot_dir=SNAPSHOT_DIR):
+    return os.path.join(snapshot_dir, f"{key[:32]}.sqlite")
+
+
+def local_database_path(project_dir=PROJECT_DIR):
+    """Where miniflare keeps the local D1 database, whether or not it exists yet"""
+    try:
+        return find_local_database(project_dir)
+    except FileNotFoundError:
+        return os.path.join(project_dir, LOCAL_D1_DIR, LOCAL_D1_FILE)
+
+
+def _copy_database(source, target):
+    # The backup API copies a consistent image page by page, even from a database in use
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    for suffix in ('-wal', '-shm', '-journal'):
+        if os.path.exists(target + suffix):
+            os.remove(target + suffix)
+    source_conn = sqlite3.connect(f"file:{source}?mode=ro", uri=True)
+    target_conn = sqlite3.connect(target)
+    try:
+        source_conn.backup(target_conn)
+    finally:
+        target_conn.close()
+        source_conn.close()
+
+
+def _publish(temp_path, key, snapshot_dir):
+    path = snapshot_path(key, snapshot_dir)
+    os.replace(temp_path, path)
+    evict(snapshot_dir)
+    return path
+
+
+def apply_migrations(db_path, project_dir=PROJECT_DIR, keep_going=False):
+    """
+    Apply every migration and the seed to db_path, recording migrations in d1_migrations.
+
+    Returns the names of the files that failed; without keep_going the
+    first failure stops the build.
+    """
+    failed = []
+    seed = seed_file(project_dir)
+    with LocalD1Executor(db_path=db_path) as executor:
+        executor.conn.execute(MIGRATIONS_SCHEMA)
+        for path in build_files(project_dir):
+            name = os.path.basename(path)
+            started = time.perf_counter()
+            result = executor.execute_file(path)
+            if result.returncode != 0:
+                print(f"❌ {name} failed: {result.stderr[:200]}")
+                failed.append(name)
+                if not keep_going:
+                    break
+                continue
+            if path != seed:
+                executor.conn.execute(f"INSERT INTO {MIGRATIONS_TABLE} (name) VALUES (?)", (name,))
+            print(f"✅ {name} ({time.perf_counter() - started:.2f}s)")
+        executor.conn.execute("VACUUM")
+    return failed
+
+
+def build_snapshot(project_dir=PROJECT_DIR, snapshot_dir=SNAPSHOT_DIR, from_local=False, keep_going=False):
+    """Build the snapshot for the current migrations; returns its path, or None if a migration failed"""
+    key = snapshot_key(project_dir)
+    os.makedirs(snapshot_dir, exist_ok=True)
+    temp_path = os.path.join(snapshot_dir, f".building-{os.getpid()}.sqlite")
+    try:
+        if from_local:
+            print(f"📥 Adopting {find_local_database(project_dir)} as the snapshot")
+            _copy_database(find_local_database(project_dir), temp_path)
+        else:
+            print(f"🏗️ Building database snapshot {key[:16]}… from {len(migration_files(project_dir))} migrations")
+            failed = apply_migrations(temp_path, project_dir, keep_going)
+            if failed and not keep_going:
+                print("❌ Snapshot not saved; fix the migration, use --keep-going, or run `npm run db:snapshot` "
+                      "to replay the migrations with wrangler and adopt the result")
+                return None
+            if failed:
+                print(f"⚠️ Skipped {len(failed)} failing migrations: {', '.join(failed)}")
+        path = _publish(temp_path, key, snapshot_dir)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    print(f"📸 Saved database snapshot: {path} ({os.path.getsize(path):,} bytes)")
+    return path
+
+
+def restore_snapshot(project_dir=PROJECT_DIR, snapshot_dir=SNAPSHOT_DIR, keep_going=False):
+    """Replace the local D1 database with the snapshot for the current migrations, building it if needed"""
+    path = snapshot_path(snapshot_key(project_dir), snapshot_dir)
+    if not os.path.exists(path):
+        path = build_snapshot(project_dir, snapshot_dir, keep_going=keep_going)
+        if path is None:
+            return False
+    else:
+        # Touch the snapshot so eviction sees it as recently used
+        os.utime(path)
+
+    started = time.perf_counter()
+    target = local_database_path(project_dir)
+    _copy_database(path, target)
+    print(f"♻️ Restored {os.path.basename(path)} into {target} in {(time.perf_counter() - started) * 1000:.0f} ms")
+    return True
+
+
+def _snapshots(snapshot_dir):
+    if not os.path.isdir(snapshot_dir):
+        return []
+    return sorted((os.path.getmtime(os.path.join(snapshot_dir, name)), os.path.join(snapshot_dir, name))
+                  for name in os.listdir(snapshot_dir)
+                  if name.endswith('.sqlite') and not name.startswith('.'))
+
+
+def evict(snapshot_dir=SNAPSHOT_DIR, max_snapshots=MAX_SNAPSHOTS):
+    """Drop the least recently used snapshots beyond max_snapshots"""
+    snapshots = _snapshots(snapshot_dir)
+    for _, path in snapshots[:max(0, len(snapshots) - max_snapshots)]:
+        os.remove(path)
+
+
+def clear(snapshot_dir=SNAPSHOT_DIR):
+    """Remove every snapshot"""
+    for _, path in _snapshots(snapshot_dir):
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build and restore prebuilt snapshots of the local D1 database.")
+    parser.add_argument('command', nargs='?', default='reset', choices=('reset', 'build', 'list', 'clear'))
+    parser.add_argument('--from-local', action='store_true',
+                        help='build: adopt the current local database instead of applying the migrations')
+    parser.add_argument('--keep-going', action='store_true',
+                        help='skip migrations that fail instead of stopping the build')
+    args = parser.parse_args()
+
+    if args.command == 'reset':
+        raise SystemExit(0 if restore_snapshot(keep_going=args.keep_going) else 1)
+    elif args.command == 'build':
+        raise SystemExit(0 if build_snapshot(from_local=args.from_local, keep_going=args.keep_going) else 1)
+    elif args.command == 'clear':
+        clear()
+        print(f"🧹 Cleared database snapshots: {SNAPSHOT_DIR}")
+    else:
+        current = snapshot_path(snapshot_key())
+        print(f"📦 Database snapshots: {SNAPSHOT_DIR}")
+        for _, path in _snapshots(SNAPSHOT_DIR):
+            marker = '  (current migrations)' if path == current else ''
+            print(f"  {os.path.basename(path)}  {os.path.getsize(path):,} bytes{marker}")
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Per-row content hashes for incremental (delta) imports.
+
+A full import clears users, user_profiles and worker_services and reloads
+every business. A delta import instead hashes each source row, keyed by its
+Kwikr user_id (or email when the id is missing), and compares the hashes
+with the ones recorded after the previous run against the same target:
+
+- new rows are inserted,
+- changed rows are upserted (INSERT ... ON CONFLICT DO UPDATE) under the
+  database id they were given before,
+- rows that vanished from the export are deleted,
+- unchanged rows are not sent at all.
+
+Hashes are kept in a small local sqlite file next to the import journal and
+are only recorded for rows that actually landed, so a rejected or failed
+row is tried again on the next run.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+
+import pandas as pd
+
+from d1_dispatch import rejected_rows
+from import_journal import JOURNAL_FILE
+
+HASH_FILE = os.environ.get('KWIKR_ROW_HASHES', os.path.join(os.path.dirname(JOURNAL_FILE), 'row_hashes.sqlite'))
+
+# Ids per DELETE ... WHERE id IN (...) statement
+DELETE_BATCH_IDS = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS row_hashes (
+    target TEXT NOT NULL,
+    source_key TEXT NOT NULL,
+    db_id INTEGER NOT NULL,
+    content_hash TEXT NOT NULL,
+    PRIMARY KEY (target, source_key)
+)
+"""
+
+
+def row_key(row):
+    """Stable key of a source row: the Kwikr user_id, else the lower-cased email"""
+    if 'user_id' in row and pd.notna(row['user_id']):
+        return str(int(row['user_id']))
+    if 'email' in row and pd.notna(row['email']):
+        return str(row['email']).strip().lower()
+    return None
+
+
+def row_hash(row):
+    """SHA-256 of every column of a source row, independent of column order"""
+    values = {str(column): (None if pd.isna(value) else value) for column, value in row.items()}
+    return hashlib.sha256(json.dumps(values, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def source_hashes(batches):
+    """{key: (DataFrame index, content hash)} for every keyed row of the export"""
+    hashes = {}
+    for batch in batches:
+        for idx, row in batch.iterrows():
+            key = row_key(row)
+            if key is not None:
+                hashes[key] = (idx, row_hash(row))
+    return hashes
+
+
+class RowHashStore:
+    """Content hashes and database ids of the rows last applied to one target."""
+
+    def __init__(self, target='local', path=HASH_FILE):
+        self.target = target
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def load(self):
+        """{key: (db_id, content hash)} from the previous run"""
+        return {key: (db_id, content_hash) for key, db_id, content_hash in self.conn.execute(
+            "SELECT source_key, db_id, content_hash FROM row_hashes WHERE target = ?", (self.target,)
+        )}
+
+    def save(self, applied, removed=(), replace=False):
+        """
+        Record applied {key: (db_id, hash)} rows and forget removed keys.
+
+        replace drops every other row first, for a full import that rewrote
+        the tables.
+        """
+        with self.conn:
+            if replace:
+                self.conn.execute("DELETE FROM row_hashes WHERE target = ?", (self.target,))
+            self.conn.executemany("DELETE FROM row_hashes WHERE target = ? AND source_key = ?",
+                                  [(self.target, key) for key in removed])
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO row_hashes (target, source_key, db_id, content_hash) VALUES (?, ?, ?, ?)",
+                [(self.target, key, db_id, content_hash) for key, (db_id, content_hash) in applied.items()]
+            )
+
+
+class DeltaPlan:
+    """Which source rows are new, changed, unchanged or gone since the previous run."""
+
+    def __init__(self, previous, current):
+        self.new = [key for key in current if key not in previous]
+        self.changed = [key for key, (_, content_hash) in current.items()
+                        if key in previous and previous[key][1] != content_hash]
+        self.unchanged = len(current) - len(self.new) - len(self.changed)
+        self.vanished = {key: db_id for key, (db_id, _) in previous.items() if key not in current}
+
+    def __bool__(self):
+        return bool(self.new or self.changed or self.vanished)
+
+    def print_summary(self):
+        print(f"🔁 Delta: {len(self.new)} new, {len(self.changed)} changed, "
+              f"{len(self.vanished)} vanished, {self.unchanged} unchanged")
+
+
+def upsert_clause(conflict_column, columns):
+    """Terminator turning a multi-row INSERT into an upsert that overwrites columns"""
+    assignments = ', '.join(f"{column} = excluded.{column}" for column in columns)
+    return f"\nON CONFLICT({conflict_column}) DO UPDATE SET {assignments};"
+
+
+def delete_statements(table, column, ids, batch_ids=DELETE_BATCH_IDS):
+    """DELETE statements for ids, batch_ids at a time"""
+    ids = sorted(ids)
+    for start in range(0, len(ids), batch_ids):
+        id_list = ', '.join(str(db_id) for db_id in ids[start:start + batch_ids])
+        yield f"DELETE FROM {table} WHERE {column} IN ({id_list});"
+
+
+def selected_batches(batches, db_ids=None):
+    """Batches restricted to the DataFrame indexes in db_ids, or every batch when db_ids is None"""
+    for batch in batches:
+        if db_ids is not None:
+            batch = batch[batch.index.isin(list(db_ids))]
+        if len(batch):
+            yield batch
+
+
+def tracked(statements, sink=None):
+    """Pass statements through while appending them to sink, to match them with run_stages results later"""
+    for statement in statements:
+        if sink is not None:
+            sink.append(statement)
+        yield statement
+
+
+def landed_keys(statements, results):
+    """Row keys of statements that were committed, minus rows rejected from them"""
+    landed = set()
+    for statement, result in zip(statements, results or []):
+        if result.returncode == 0:
+            rejected = {key for key, _, _ in rejected_rows(result)}
+            landed.update(key for key, _ in statement.rows if key not in rejected)
+    return landed
+
+
+def add_delta_arguments(parser):
+    """Add the --delta flag for scripts that can import only changed rows"""
+    parser.add_argument('--delta', action='store_true',
+                        help='only write new and changed rows and delete vanished ones, using the row hashes of the last run')
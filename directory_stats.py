@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+The worker_directory_stats rollup: workers, their services and average
+hourly rates per (province, service category).
+
+Migration 0022 creates the table and the triggers on users and
+worker_services that keep it current as imports and the app write rows, so
+the reports and the client directory read a few dozen rollup rows instead
+of grouping every worker. `rebuild` recomputes it from scratch in one
+transaction, for databases loaded before the migration or with services
+inserted ahead of their users. A worker offering several categories is in
+several rollup rows, so workers per province are counted from users.
+
+    python3 directory_stats.py rebuild [--remote]
+    python3 directory_stats.py show [--remote]
+"""
+
+import argparse
+
+from d1_executor import add_target_arguments, open_executor
+
+STATS_TABLE = 'worker_directory_stats'
+
+REBUILD_SQL = f"""
+DELETE FROM {STATS_TABLE};
+INSERT INTO {STATS_TABLE} (province, service_category, worker_count, service_count, rated_count, rate_total, avg_hourly_rate)
+SELECT COALESCE(u.province, ''), ws.service_category, COUNT(DISTINCT ws.user_id), COUNT(*), COUNT(ws.hourly_rate),
+       COALESCE(SUM(ws.hourly_rate), 0), AVG(ws.hourly_rate)
+FROM worker_services ws
+JOIN users u ON u.id = ws.user_id
+WHERE u.role = 'worker'
+GROUP BY 1, 2;
+"""
+
+
+def rebuild_stats(executor):
+    """Recompute the rollup from users and worker_services; returns whether it committed"""
+    print(f"🔄 Rebuilding {STATS_TABLE}...")
+    with executor.stage('rebuild'):
+        result = executor.execute(REBUILD_SQL)
+    if result.returncode != 0:
+        print(f"❌ Rebuild failed: {result.stderr[:200]}")
+        return False
+    rows = executor.query(f"SELECT COUNT(*) AS groups, COALESCE(SUM(service_count), 0) AS services FROM {STATS_TABLE}")[0]
+    print(f"✅ {rows['groups']} province/category rows covering {rows['services']} worker services")
+    return True
+
+
+def province_counts(executor):
+    """[{province, worker_count}] of the workers in users, largest first"""
+    return executor.query(
+        "SELECT province, COUNT(*) AS worker_count FROM users WHERE role = 'worker' "
+        "GROUP BY province ORDER BY worker_count DESC"
+    )
+
+
+def category_counts(executor):
+    """[{service_category, worker_count, service_count, avg_hourly_rate}] from the rollup, largest first"""
+    # A worker lives in one province, so summing over provinces still counts each worker once per category
+    return executor.query(
+        f"SELECT service_category, SUM(worker_count) AS worker_count, SUM(service_count) AS service_count, "
+        f"SUM(rate_total) / NULLIF(SUM(rated_count), 0) AS avg_hourly_rate "
+        f"FROM {STATS_TABLE} GROUP BY service_category ORDER BY worker_count DESC"
+    )
+
+
+def print_stats(executor):
+    print("=== WORKERS BY PROVINCE ===")
+    for row in province_counts(executor):
+        print(f"{row['province'] or '?'}: {row['worker_count']} workers")
+
+    print("\n=== SERVICE CATEGORIES ===")
+    for row in category_counts(executor):
+        rate = f" (avg ${row['avg_hourly_rate']:.2f}/hr)" if row['avg_hourly_rate'] is not None else ''
+        print(f"{row['service_category']}: {row['worker_count']} workers, {row['service_count']} services{rate}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild or show the worker_directory_stats rollup.")
+    parser.add_argument('command', nargs='?', default='show', choices=('rebuild', 'show'))
+    add_target_arguments(parser)
+    args = parser.parse_args()
+
+    with open_executor(args.remote) as executor:
+        if args.command == 'rebuild':
+            raise SystemExit(0 if rebuild_stats(executor) else 1)
+        print_stats(executor)
@@ -1,17 +1,29 @@
 #!/usr/bin/env python3
 
+import numpy as np
 import pandas as pd
 import sqlite3
 import json
 import re
-import hashlib
-import secrets
 import requests
 import os
 import random
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from urllib.parse import urlparse
 
+from bulk_loader import (DEFAULT_BATCH_SIZE, add_bulk_mode_arguments, build_column_batches, bulk_load, bulk_load_mode,
+                         find_existing_emails, print_throughput)
+from company_names import CompanyNameExtractor
+from import_columns import categorical_lookup
+from import_credentials import add_credential_arguments, provision_credentials
+from import_readers import DEFAULT_BATCH_ROWS, iter_record_batches
+from keyword_classifier import KeywordClassifier
+from sharded_load import (add_shard_arguments, assign_shards, create_shard_database, merge_shards,
+                          reserve_shard_ranges, shard_count)
+
 def clean_text(text):
     """Clean and normalize text data"""
     if pd.isna(text):
@@ -21,42 +33,29 @@ def clean_text(text):
     clean = ' '.join(clean.split())
     return clean
 
-def extract_name_from_company(company_name):
-    """Enhanced name extraction for different business patterns"""
-    if pd.isna(company_name):
-        return "Business", "Owner"
-    
-    company = str(company_name).strip()
-    
-    # Patterns for extracting names from business names
-    patterns = [
-        # Personal names: "John Smith Plumbing" → John, Smith
-        r'^([A-Z][a-z]+)\s+([A-Z][a-z]+)(?:\s+.*)?$',
-        # French names: "Jean-Claude Plomberie" → Jean, Claude
-        r'^([A-Z][a-z]+)-([A-Z][a-z]+)(?:\s+.*)?$',
-        # Initials + surname: "R Smith Electrical" → R, Smith
-        r'^([A-Z])\s+([A-Z][a-z]+)(?:\s+.*)?$',
-        # Multiple initials: "R & B Heating" → R, B
-        r'^([A-Z])\s*&\s*([A-Z])(?:\s+.*)?$',
-        # Company with owner: "Smith's Plumbing" → Smith, Business
-        r'^([A-Z][a-z]+)\'?s\s+.*$',
-    ]
-    
-    for pattern in patterns:
-        match = re.match(pattern, company)
-        if match:
-            first = match.group(1)
-            last = match.group(2) if len(match.groups()) > 1 and match.group(2) else "Business"
-            return first, last
-    
-    # Extract first significant word as name
+# Patterns for extracting names from business names
+NAME_PATTERNS = [
+    # Personal names: "John Smith Plumbing" → John, Smith
+    r'^([A-Z][a-z]+)\s+([A-Z][a-z]+)(?:\s+.*)?$',
+    # French names: "Jean-Claude Plomberie" → Jean, Claude
+    r'^([A-Z][a-z]+)-([A-Z][a-z]+)(?:\s+.*)?$',
+    # Initials + surname: "R Smith Electrical" → R, Smith
+    r'^([A-Z])\s+([A-Z][a-z]+)(?:\s+.*)?$',
+    # Multiple initials: "R & B Heating" → R, B
+    r'^([A-Z])\s*&\s*([A-Z])(?:\s+.*)?$',
+    # Company with owner: "Smith's Plumbing" → Smith, Business
+    r'^([A-Z][a-z]+)\'?s\s+.*$',
+]
+
+# Common business words skipped when picking name words
+BUSINESS_WORDS = {'ltd', 'inc', 'corp', 'llc', 'plumbing', 'heating', 'electrical', 
+                  'services', 'systems', 'solutions', 'contractors', 'construction',
+                  'plomberie', 'chauffage', 'electrique'}
+
+def significant_word_names(company):
+    """Extract first significant words as name when no pattern matches"""
     words = company.split()
-    # Remove common business words
-    business_words = {'ltd', 'inc', 'corp', 'llc', 'plumbing', 'heating', 'electrical', 
-                     'services', 'systems', 'solutions', 'contractors', 'construction',
-                     'plomberie', 'chauffage', 'electrique'}
-    
-    significant_words = [w for w in words if w.lower() not in business_words and len(w) > 2]
+    significant_words = [w for w in words if w.lower() not in BUSINESS_WORDS and len(w) > 2]
     
     if significant_words:
         if len(significant_words) >= 2:
@@ -70,80 +69,101 @@ def extract_name_from_company(company_name):
     
     return "Business", "Owner"
 
-def categorize_service(category, services_provided):
-    """Map original categories to our standardized service categories"""
+NAME_EXTRACTOR = CompanyNameExtractor(NAME_PATTERNS, significant_word_names, missing=("Business", "Owner"))
+
+def extract_name_from_company(company_name):
+    """Enhanced name extraction for different business patterns"""
+    return NAME_EXTRACTOR.extract(company_name)
+
+# Service mapping with priority order
+SERVICE_MAPPINGS = [
+    ('Plumbing', ['plumbing', 'drain', 'sewer', 'pipe', 'faucet', 'toilet', 'water']),
+    ('Electrical', ['electrical', 'electric', 'wiring', 'lighting', 'automation', 'panel']),
+    ('HVAC', ['hvac', 'heating', 'cooling', 'furnace', 'air conditioning', 'ventilation']),
+    ('Flooring', ['flooring', 'hardwood', 'laminate', 'vinyl', 'carpet', 'tile', 'refinishing']),
+    ('Roofing', ['roofing', 'roof', 'shingle', 'gutter']),
+    ('General Contracting', ['contracting', 'contractor', 'construction', 'renovation', 'reno']),
+    ('Cleaning', ['cleaning', 'pressure washing', 'window', 'carpet cleaning', 'office cleaning']),
+    ('Landscaping', ['landscaping', 'landscape', 'lawn', 'garden', 'seasonal']),
+]
+
+SERVICE_CLASSIFIER = KeywordClassifier(SERVICE_MAPPINGS)
+
+def service_text(category, services_provided):
+    """Text that service categorization looks at"""
     if pd.isna(category):
         category = ""
     if pd.isna(services_provided):
         services_provided = ""
-    
-    text = f"{category} {services_provided}".lower()
-    
-    # Service mapping with priority order
-    service_mappings = [
-        ('Plumbing', ['plumbing', 'drain', 'sewer', 'pipe', 'faucet', 'toilet', 'water']),
-        ('Electrical', ['electrical', 'electric', 'wiring', 'lighting', 'automation', 'panel']),
-        ('HVAC', ['hvac', 'heating', 'cooling', 'furnace', 'air conditioning', 'ventilation']),
-        ('Flooring', ['flooring', 'hardwood', 'laminate', 'vinyl', 'carpet', 'tile', 'refinishing']),
-        ('Roofing', ['roofing', 'roof', 'shingle', 'gutter']),
-        ('General Contracting', ['contracting', 'contractor', 'construction', 'renovation', 'reno']),
-        ('Cleaning', ['cleaning', 'pressure washing', 'window', 'carpet cleaning', 'office cleaning']),
-        ('Landscaping', ['landscaping', 'landscape', 'lawn', 'garden', 'seasonal']),
-    ]
-    
-    for service_cat, keywords in service_mappings:
-        if any(keyword in text for keyword in keywords):
-            return service_cat
-    
-    # Default fallback
-    return 'General Contracting'
+    return f"{category} {services_provided}".lower()
 
-def calculate_hourly_rate(province, service_category, subscription_type):
-    """Calculate realistic hourly rates"""
-    # Base rates by service category
-    base_rates = {
-        'Plumbing': 85,
-        'Electrical': 90,
-        'HVAC': 95,
-        'Flooring': 65,
-        'Roofing': 75,
-        'General Contracting': 70,
-        'Cleaning': 45,
-        'Landscaping': 55,
-    }
-    
-    # Province multipliers (cost of living adjustments)
-    province_multipliers = {
-        'Ontario': 1.15,
-        'British Columbia': 1.20,
-        'Alberta': 1.10,
-        'Quebec': 1.05,
-        'Manitoba': 0.95,
-        'Saskatchewan': 0.90,
-        'Nova Scotia': 0.90,
-        'New Brunswick': 0.85,
-        'Newfoundland and Labrador': 0.80,
-        'Prince Edward Island': 0.85,
-        'Yukon': 1.25,
-        'Northwest Territories': 1.30,
-        'Nunavut': 1.35
-    }
-    
-    # Subscription multipliers
-    subscription_multipliers = {
-        'Pro Plan': 1.25,
-        'Growth Plan': 1.10,
-        'Pay-as-you-go': 1.00
-    }
+def categorize_service(category, services_provided):
+    """Map original categories to our standardized service categories"""
+    # Default fallback is General Contracting
+    return SERVICE_CLASSIFIER.first_match(service_text(category, services_provided), 'General Contracting')
+
+def categorize_services(categories, services_provided):
+    """Map whole columns of original categories at once"""
+    texts = [service_text(category, services) for category, services in zip(categories, services_provided)]
+    return SERVICE_CLASSIFIER.first_match_batch(texts, 'General Contracting')
+
+# Base rates by service category
+BASE_RATES = {
+    'Plumbing': 85,
+    'Electrical': 90,
+    'HVAC': 95,
+    'Flooring': 65,
+    'Roofing': 75,
+    'General Contracting': 70,
+    'Cleaning': 45,
+    'Landscaping': 55,
+}
+
+# Province multipliers (cost of living adjustments)
+PROVINCE_MULTIPLIERS = {
+    'Ontario': 1.15,
+    'British Columbia': 1.20,
+    'Alberta': 1.10,
+    'Quebec': 1.05,
+    'Manitoba': 0.95,
+    'Saskatchewan': 0.90,
+    'Nova Scotia': 0.90,
+    'New Brunswick': 0.85,
+    'Newfoundland and Labrador': 0.80,
+    'Prince Edward Island': 0.85,
+    'Yukon': 1.25,
+    'Northwest Territories': 1.30,
+    'Nunavut': 1.35
+}
+
+# Subscription multipliers
+SUBSCRIPTION_MULTIPLIERS = {
+    'Pro Plan': 1.25,
+    'Growth Plan': 1.10,
+    'Pay-as-you-go': 1.00
+}
+
+# Seed for the rate variation draw, so repeated imports produce the same rates
+RATE_SEED = 2025
+
+_rate_rng = np.random.default_rng(RATE_SEED)
+
+def calculate_hourly_rates(provinces, service_categories, subscription_types, rng=None):
+    """Calculate realistic hourly rates for whole columns"""
+    rng = rng if rng is not None else _rate_rng
     
-    base_rate = base_rates.get(service_category, 75)
-    prov_mult = province_multipliers.get(province, 1.0)
-    sub_mult = subscription_multipliers.get(subscription_type, 1.0)
+    base_rate = categorical_lookup(service_categories, BASE_RATES, 75)
+    prov_mult = categorical_lookup(provinces, PROVINCE_MULTIPLIERS, 1.0)
+    sub_mult = categorical_lookup(subscription_types, SUBSCRIPTION_MULTIPLIERS, 1.0)
     
     # Add some realistic variation (±10%)
-    variation = random.uniform(0.9, 1.1)
+    variation = rng.uniform(0.9, 1.1, size=len(base_rate))
     
-    return round(base_rate * prov_mult * sub_mult * variation, 2)
+    return np.round(base_rate * prov_mult * sub_mult * variation, 2).tolist()
+
+def calculate_hourly_rate(province, service_category, subscription_type, rng=None):
+    """Calculate realistic hourly rates"""
+    return calculate_hourly_rates([province], [service_category], [subscription_type], rng)[0]
 
 def determine_compliance_status(province, service_category, subscription_type):
     """Assign realistic compliance status"""
@@ -242,23 +262,62 @@ def download_and_store_logo(photo_url, company_name, user_id):
     except:
         return None
 
-def import_complete_dataset(excel_file, db_file):
-    """Import the complete 1000+ worker dataset"""
-    
-    print("=== ENHANCED KWIKR WORKER IMPORT ===")
-    print(f"Loading dataset from: {excel_file}")
-    
-    # Read Excel data
-    df = pd.read_excel(excel_file)
-    print(f"Found {len(df)} businesses to import")
-    
-    # Connect to database
-    conn = sqlite3.connect(db_file)
-    cursor = conn.cursor()
-    
-    # Import statistics
-    stats = {
-        'total': len(df),
+def build_business_record(row, email, company, password_hash, service_category, hourly_rate, name):
+    """Transform one Excel row into per-table column values for the bulk loader"""
+    first_name, last_name = name
+    province_full = clean_text(row.get('province', ''))
+    province = map_province_to_code(province_full)  # Convert to 2-letter code
+    city = clean_text(row.get('city', ''))
+    subscription_type = clean_text(row.get('subscription_type', 'Pay-as-you-go'))
+    
+    # Calculate compliance (rates are calculated for the whole batch up front)
+    compliance_status = determine_compliance_status(province, service_category, subscription_type)
+    compliance_percentage = calculate_compliance_percentage(compliance_status)
+    
+    # Handle profile photo
+    profile_photo_url = download_and_store_logo(
+        row.get('profile_photo'), company, None
+    )
+    
+    return {
+        'users': {
+            'email': email, 'password_hash': password_hash, 'password_salt': 'salt',
+            'role': 'worker', 'first_name': first_name, 'last_name': last_name,
+            'province': province, 'city': city, 'is_verified': 1, 'is_active': 1,
+            'created_at': datetime.now().isoformat()
+        },
+        'user_profiles': {
+            'bio': clean_text(row.get('description', ''))[:1000],
+            'company_name': company,
+            'company_description': clean_text(row.get('description', ''))[:500],
+            'website_url': clean_text(row.get('website', '')),
+            'address_line1': clean_text(row.get('address', '')),
+            'postal_code': clean_text(row.get('postal_code', '')),
+            'profile_image_url': profile_photo_url
+        },
+        'worker_services': {
+            'service_category': service_category,
+            'service_name': f"{service_category} Services",
+            'description': f"Professional {service_category.lower()} services in {city}, {province}",
+            'hourly_rate': hourly_rate, 'is_available': 1,
+            'service_area': f"{city}, {province}", 'years_experience': random.randint(3, 15)
+        },
+        'worker_service_areas': {'area_name': city, 'is_active': 1} if city else None,
+        'worker_compliance_summary': {
+            'province': province, 'primary_trade': service_category,
+            'overall_compliance_status': compliance_status,
+            'compliance_percentage': compliance_percentage,
+            'total_requirements': 5,
+            'compliant_requirements': 2 if compliance_status == 'compliant' else 1 if compliance_status == 'partial' else 0,
+            'pending_requirements': 3 if compliance_status == 'partial' else 2 if compliance_status == 'non_compliant' else 1,
+            'expired_requirements': 0 if compliance_status in ['compliant', 'partial'] else 2
+        },
+    }, province_full
+
+def new_stats():
+    """Empty import statistics"""
+    return {
+        'total': 0,
         'imported': 0,
         'skipped': 0,
         'errors': 0,
@@ -266,13 +325,53 @@ def import_complete_dataset(excel_file, db_file):
         'service_categories': set(),
         'with_logos': 0
     }
-    
 
-    
+def merge_stats(stats, other):
+    """Add the statistics of a shard to stats"""
+    for key, value in other.items():
+        if isinstance(value, set):
+            stats[key] |= value
+        else:
+            stats[key] += value
+
+def add_timings(timings, other):
+    """Add {table: (rows, seconds)} load timings to timings"""
+    for table, (rows, seconds) in other.items():
+        total_rows, total_seconds = timings.get(table, (0, 0.0))
+        timings[table] = (total_rows + rows, total_seconds + seconds)
+
+def import_batch(conn, df, stats, timings, seen_emails, rng, batch_size=DEFAULT_BATCH_SIZE, id_strategy='preassigned',
+                 credential_mode='hashed', credential_workers=None):
+    """Transform one batch of export rows and bulk-load it, updating stats, timings and seen_emails"""
+    stats['total'] += len(df)
+    
+    # Duplicate detection for the whole batch in one query
+    existing_emails = find_existing_emails(conn, {clean_text(email) for email in df['email']} - {''})
+    
+    # Classify the whole batch's service categories at once
+    missing = pd.Series(index=df.index, dtype=object)
+    service_categories = pd.Series(categorize_services(
+        df.get('category', missing), df.get('services_provided', missing)
+    ), index=df.index)
+    
+    # Calculate the whole batch's rates at once (use full province name for rate calculation)
+    hourly_rates = pd.Series(calculate_hourly_rates(
+        df.get('province', missing).map(clean_text),
+        service_categories,
+        df.get('subscription_type', pd.Series('Pay-as-you-go', index=df.index)).map(clean_text),
+        rng
+    ), index=df.index)
+    
+    # Extract owner names for the whole batch (repeated names come from the cache)
+    names = pd.Series(NAME_EXTRACTOR.extract_batch(df.get('company', missing).map(clean_text)), index=df.index)
+    
+    # Transform stage: build column values for every row before touching the DB
+    records = []
+    province_names = []
     for index, row in df.iterrows():
         try:
             if index % 100 == 0:
-                print(f"Processing {index + 1}/{len(df)}...")
+                print(f"Processing {index + 1}...")
             
             company = clean_text(row.get('company', ''))
             email = clean_text(row.get('email', ''))
@@ -281,113 +380,184 @@ def import_complete_dataset(excel_file, db_file):
                 stats['errors'] += 1
                 continue
             
-            # Skip if email already exists
-            cursor.execute("SELECT id FROM users WHERE email = ?", (email,))
-            if cursor.fetchone():
+            # Skip if email already exists (in the DB or earlier in this file)
+            if email in existing_emails or email in seen_emails:
                 stats['skipped'] += 1
                 continue
             
-            # Extract and prepare data
-            first_name, last_name = extract_name_from_company(company)
-            province_full = clean_text(row.get('province', ''))
-            province = map_province_to_code(province_full)  # Convert to 2-letter code
-            city = clean_text(row.get('city', ''))
-            service_category = categorize_service(row.get('category'), row.get('services_provided'))
-            subscription_type = clean_text(row.get('subscription_type', 'Pay-as-you-go'))
-            
-            # Calculate rates and compliance (use full province name for rate calculation)
-            hourly_rate = calculate_hourly_rate(province_full, service_category, subscription_type)
-            compliance_status = determine_compliance_status(province, service_category, subscription_type)
-            compliance_percentage = calculate_compliance_percentage(compliance_status)
-            
-            # Generate secure credentials
-            password = secrets.token_urlsafe(16)
-            password_hash = hashlib.pbkdf2_hmac('sha256', password.encode(), b'salt', 100000).hex()
-            
-            # Handle profile photo
-            profile_photo_url = download_and_store_logo(
-                row.get('profile_photo'), company, None
+            record, province_full = build_business_record(
+                row, email, company, None, service_categories[index], hourly_rates[index], names[index]
             )
-            
-            # Insert user
-            cursor.execute("""
-                INSERT INTO users (
-                    email, password_hash, password_salt, role, first_name, last_name, 
-                    province, city, is_verified, is_active, created_at
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                email, password_hash, 'salt', 'worker', first_name, last_name,
-                province, city, 1, 1, datetime.now().isoformat()
-            ))
-            
-            user_id = cursor.lastrowid
-            
-            # Insert user profile
-            cursor.execute("""
-                INSERT INTO user_profiles (
-                    user_id, bio, company_name, company_description, website_url, 
-                    address_line1, postal_code, profile_image_url
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                user_id, 
-                clean_text(row.get('description', ''))[:1000],
-                company,
-                clean_text(row.get('description', ''))[:500],
-                clean_text(row.get('website', '')),
-                clean_text(row.get('address', '')),
-                clean_text(row.get('postal_code', '')),
-                profile_photo_url
-            ))
-            
-            # Insert worker service
-            cursor.execute("""
-                INSERT INTO worker_services (
-                    user_id, service_category, service_name, description, 
-                    hourly_rate, is_available, service_area, years_experience
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                user_id, service_category, f"{service_category} Services",
-                f"Professional {service_category.lower()} services in {city}, {province}",
-                hourly_rate, 1, f"{city}, {province}", random.randint(3, 15)
-            ))
-            
-            # Insert service area
-            if city:
-                cursor.execute("""
-                    INSERT INTO worker_service_areas (user_id, area_name, is_active)
-                    VALUES (?, ?, ?)
-                """, (user_id, city, 1))
-            
-            # Create compliance summary
-            cursor.execute("""
-                INSERT INTO worker_compliance_summary (
-                    user_id, province, primary_trade, overall_compliance_status,
-                    compliance_percentage, total_requirements, compliant_requirements,
-                    pending_requirements, expired_requirements
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                user_id, province, service_category, compliance_status,
-                compliance_percentage, 5, 
-                2 if compliance_status == 'compliant' else 1 if compliance_status == 'partial' else 0,
-                3 if compliance_status == 'partial' else 2 if compliance_status == 'non_compliant' else 1,
-                0 if compliance_status in ['compliant', 'partial'] else 2
-            ))
-            
-            # Update statistics
-            stats['imported'] += 1
-            stats['provinces'].add(f"{province} ({province_full})")  # Show both code and full name
-            stats['service_categories'].add(service_category)
-            if profile_photo_url:
-                stats['with_logos'] += 1
+            records.append(record)
+            province_names.append(province_full)
+            seen_emails.add(email)
                 
         except Exception as e:
             stats['errors'] += 1
             print(f"  Error importing {row.get('company', 'Unknown')}: {e}")
             continue
     
-    # Commit all changes
-    conn.commit()
+    # Credential stage: hash passwords across all cores, or defer to invite tokens
+    provision_credentials(records, mode=credential_mode, workers=credential_workers)
+    
+    # Load stage: one transaction per batch, executemany per table
+    batches = build_column_batches(records)
+    user_ids, load_errors, batch_timings = bulk_load(conn, batches, batch_size=batch_size, id_strategy=id_strategy)
+    add_timings(timings, batch_timings)
+    
+    failed = set()
+    for position, table, e in load_errors:
+        print(f"  Error importing {records[position]['user_profiles']['company_name']} ({table}): {e}")
+        failed.add(position)
+    stats['errors'] += len(failed)
+    
+    # Update statistics
+    for position, record in enumerate(records):
+        if position in failed:
+            continue
+        stats['imported'] += 1
+        stats['provinces'].add(f"{record['users']['province']} ({province_names[position]})")  # Show both code and full name
+        stats['service_categories'].add(record['worker_services']['service_category'])
+        if record['user_profiles']['profile_image_url']:
+            stats['with_logos'] += 1
+
+def province_codes(df):
+    """2-letter province code of every row of a batch"""
+    return df.get('province', pd.Series(index=df.index, dtype=object)).map(
+        lambda province: map_province_to_code(clean_text(province)))
+
+def plan_shards(conn, excel_file, stats, read_batch_rows=DEFAULT_BATCH_ROWS):
+    """
+    One streaming pass over the export before a sharded import.
+    
+    Rows that no shard should load are decided here, because duplicates can
+    span provinces: rows without a company or email count as errors, and
+    emails already in the target or seen earlier in the file as skipped.
+    Returns ({province code: rows to load}, set of excluded row indexes).
+    """
+    province_counts = {}
+    excluded_rows = set()
+    seen_emails = set()
+    for df in iter_record_batches(excel_file, read_batch_rows):
+        stats['total'] += len(df)
+        existing_emails = find_existing_emails(conn, {clean_text(email) for email in df['email']} - {''})
+        missing = pd.Series(index=df.index, dtype=object)
+        companies = df.get('company', missing).map(clean_text)
+        emails = df.get('email', missing).map(clean_text)
+        for index, code in province_codes(df).items():
+            if not companies[index] or not emails[index]:
+                stats['errors'] += 1
+            elif emails[index] in existing_emails or emails[index] in seen_emails:
+                stats['skipped'] += 1
+            else:
+                seen_emails.add(emails[index])
+                province_counts[code] = province_counts.get(code, 0) + 1
+                continue
+            excluded_rows.add(index)
+    return province_counts, excluded_rows
+
+def _import_shard(excel_file, shard_path, provinces, excluded_rows, batch_size, id_strategy, credential_mode,
+                  read_batch_rows, seed_sequence):
+    # Runs in a worker process: load this shard's provinces into its private sqlite file
+    conn = sqlite3.connect(shard_path)
+    stats = new_stats()
+    timings = {}
+    rng = np.random.default_rng(seed_sequence)
+    # Forked workers inherit the parent's stdlib random state; statuses and years must differ per shard
+    random.seed(int(seed_sequence.generate_state(1)[0]))
+    # The name cache is per process; only this shard's lookups are reported back
+    cache_start = NAME_EXTRACTOR.cache_counts()
+    try:
+        for df in iter_record_batches(excel_file, read_batch_rows):
+            df = df[province_codes(df).isin(provinces) & ~df.index.isin(excluded_rows)]
+            if len(df):
+                # The worker processes already use every core, so hash passwords serially
+                import_batch(conn, df, stats, timings, set(), rng, batch_size, id_strategy, credential_mode,
+                             credential_workers=1)
+    finally:
+        conn.close()
+    cache_counts = tuple(end - start for end, start in zip(NAME_EXTRACTOR.cache_counts(), cache_start))
+    return stats, timings, cache_counts
+
+def import_sharded(conn, excel_file, stats, timings, shards=0, batch_size=DEFAULT_BATCH_SIZE,
+                   id_strategy='preassigned', credential_mode='hashed', read_batch_rows=DEFAULT_BATCH_ROWS,
+                   seed=RATE_SEED, bulk_mode=False):
+    """
+    Import the export by province in parallel processes, each into its own shard file, then merge them.
+
+    Returns the name cache counts summed over the shard processes.
+    """
+    province_counts, excluded_rows = plan_shards(conn, excel_file, stats, read_batch_rows)
+    shards = shard_count(shards or None, len(province_counts))
+    assignment = assign_shards(province_counts, shards)
+    shard_provinces = [{code for code, shard in assignment.items() if shard == number} for number in range(shards)]
+    sizes = [sum(province_counts[code] for code in provinces) for provinces in shard_provinces]
+    first_ids = reserve_shard_ranges(conn, sizes)
+    print(f"🧩 Loading {sum(sizes)} rows in {shards} shards: "
+          + ', '.join(f"{'/'.join(sorted(provinces))} ({size})" for provinces, size in zip(shard_provinces, sizes)))
+    
+    shard_dir = tempfile.mkdtemp(prefix='kwikr-shards-')
+    try:
+        shard_paths = [os.path.join(shard_dir, f"shard_{number}.sqlite") for number in range(shards)]
+        for shard_path, first_id in zip(shard_paths, first_ids):
+            create_shard_database(conn, shard_path, first_id)
+        
+        # Every shard gets its own reproducible random stream for rates
+        seeds = np.random.SeedSequence(seed).spawn(shards)
+        cache_counts = (0, 0, 0)
+        with ProcessPoolExecutor(max_workers=shards) as pool:
+            futures = [
+                pool.submit(_import_shard, excel_file, shard_path, provinces, excluded_rows, batch_size,
+                            id_strategy, credential_mode, read_batch_rows, shard_seed)
+                for shard_path, provinces, shard_seed in zip(shard_paths, shard_provinces, seeds)
+            ]
+            for future in futures:
+                shard_stats, shard_timings, shard_cache_counts = future.result()
+                shard_stats.pop('total')
+                merge_stats(stats, shard_stats)
+                add_timings(timings, shard_timings)
+                cache_counts = tuple(total + count for total, count in zip(cache_counts, shard_cache_counts))
+        
+        # One merge transaction; bulk-load mode rebuilds the target's indexes once afterwards
+        with bulk_load_mode(conn, enabled=bulk_mode):
+            merged = merge_shards(conn, shard_paths)
+        print("🔗 Merged shards: " + ', '.join(f"{table} {rows}" for table, rows in merged.items()))
+    finally:
+        shutil.rmtree(shard_dir, ignore_errors=True)
+    return cache_counts
+
+def import_complete_dataset(excel_file, db_file, batch_size=DEFAULT_BATCH_SIZE, id_strategy='preassigned',
+                            credential_mode='hashed', read_batch_rows=DEFAULT_BATCH_ROWS, seed=RATE_SEED,
+                            bulk_mode=False, shards=1):
+    """Import the complete 1000+ worker dataset"""
+    
+    print("=== ENHANCED KWIKR WORKER IMPORT ===")
+    print(f"Loading dataset from: {excel_file}")
+    
+    # Connect to database
+    conn = sqlite3.connect(db_file)
+    
+    # Import statistics
+    stats = new_stats()
+    timings = {}
+    seen_emails = set()
+    rng = np.random.default_rng(seed)
+    cache_counts = None
+    
+    if shards != 1:
+        cache_counts = import_sharded(conn, excel_file, stats, timings, shards, batch_size, id_strategy,
+                                      credential_mode, read_batch_rows, seed, bulk_mode)
+    else:
+        # Opt-in bulk-load mode spans every batch, so indexes are rebuilt once at the end
+        with bulk_load_mode(conn, enabled=bulk_mode):
+            # Stream the export in fixed-size batches so memory stays flat
+            for df in iter_record_batches(excel_file, read_batch_rows):
+                import_batch(conn, df, stats, timings, seen_emails, rng, batch_size, id_strategy, credential_mode)
+    
     conn.close()
+    print(f"Processed {stats['total']} businesses")
+    print_throughput(timings)
+    NAME_EXTRACTOR.print_cache_stats(cache_counts)
     
     # Print comprehensive statistics
     print("\n=== IMPORT COMPLETE ===")
@@ -410,7 +580,17 @@ def import_complete_dataset(excel_file, db_file):
     return stats
 
 if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Import the complete Kwikr worker dataset into the local D1 database")
+    add_bulk_mode_arguments(parser)
+    add_shard_arguments(parser)
+    add_credential_arguments(parser)
+    args = parser.parse_args()
     stats = import_complete_dataset(
         "Kwikr_platform_import-sept-2025.xlsx", 
-        ".wrangler/state/v3/d1/miniflare-D1DatabaseObject/a31fcc237b8df81a82a97d8eeaf66c7474deb533ac08d408898123bbd56ffee7.sqlite"
+        ".wrangler/state/v3/d1/miniflare-D1DatabaseObject/a31fcc237b8df81a82a97d8eeaf66c7474deb533ac08d408898123bbd56ffee7.sqlite",
+        credential_mode=args.credentials,
+        bulk_mode=args.bulk_mode,
+        shards=args.shards
     )
\ No newline at end of file
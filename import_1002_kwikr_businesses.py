@@ -1,13 +1,26 @@
 #!/usr/bin/env python3
 """
-Import ALL 1,002 authentic Kwikr businesses with proper province mapping and small chunks.
+Import ALL 1,002 authentic Kwikr businesses with proper province mapping and size-limited chunks.
 """
 
+import argparse
 import pandas as pd
 import re
-import subprocess
-import time
-import os
+from collections import Counter
+from itertools import chain
+
+from d1_dispatch import DEFAULT_CONCURRENCY, DEFAULT_REJECT_FILE, TABLE_DEPENDENCIES, add_dispatch_arguments, add_reject_arguments, all_succeeded, print_chunk_result, print_stage_summary, run_stages
+from d1_executor import add_target_arguments, open_executor
+from delta_import import (DeltaPlan, RowHashStore, add_delta_arguments, delete_statements, landed_keys,
+                          selected_batches, source_hashes, tracked, upsert_clause)
+from import_readers import iter_record_batches
+from import_journal import add_journal_arguments, open_journal
+from import_verification import source_report, verify_import
+from parse_cache import cache_key
+from sql_chunks import DEFAULT_MAX_BYTES, StatementChunker, add_chunk_arguments, labelled_chunks
+from staging_swap import add_staging_arguments, prepare_staging, staged_chunks, swap_in_staging, validate_staging
+
+EXCEL_FILE = '/home/user/webapp/Kwikr_complete_data.xlsx'
 
 # Province name to code mapping
 PROVINCE_MAPPING = {
@@ -26,6 +39,26 @@ PROVINCE_MAPPING = {
     'Nunavut': 'NU'
 }
 
+USERS_INSERT = "INSERT INTO users (id, email, password_hash, role, first_name, last_name, phone, province, city, is_verified, email_verified, is_active, created_at) VALUES\n"
+PROFILES_INSERT = "INSERT INTO user_profiles (user_id, company_name, company_description, profile_image_url, address_line1, postal_code, website_url, created_at) VALUES\n"
+SERVICES_INSERT = "INSERT INTO worker_services (user_id, service_name, service_category, service_area, hourly_rate, created_at) VALUES\n"
+
+STAGE_TITLES = {
+    'users': 'Users Import',
+    'user_profiles': 'Profiles Import',
+    'stale_services': 'Changed Services Cleanup',
+    'worker_services': 'Services Import',
+    'vanished': 'Vanished Businesses',
+}
+
+# Columns a --delta run overwrites for changed businesses
+USERS_UPSERT = upsert_clause('id', ('email', 'first_name', 'last_name', 'phone', 'province', 'city'))
+PROFILES_UPSERT = upsert_clause('user_id', ('company_name', 'company_description', 'profile_image_url',
+                                            'address_line1', 'postal_code', 'website_url'))
+
+# A changed user's old services are deleted before the new ones are written
+DELTA_DEPENDENCIES = dict(TABLE_DEPENDENCIES, worker_services=('users', 'stale_services'))
+
 def clean_text(text):
     """Clean text for SQL insertion."""
     if pd.isna(text) or text is None:
@@ -44,7 +77,7 @@ def generate_email(company_name, index):
     
     return f"{clean_name}@kwikr.ca"
 
-def clear_existing_data():
+def clear_existing_data(executor):
     """Clear existing data from all tables."""
     print("🧹 Clearing existing data...")
     
@@ -55,10 +88,7 @@ def clear_existing_data():
     ]
     
     for cmd in clear_commands:
-        result = subprocess.run([
-            "npx", "wrangler", "d1", "execute", 
-            "kwikr-directory-production", "--local", f"--command={cmd}"
-        ], cwd="/home/user/webapp", capture_output=True, text=True, timeout=30)
+        result = executor.execute_command(cmd)
         
         if result.returncode == 0:
             print(f"✅ Cleared: {cmd}")
@@ -66,25 +96,12 @@ def clear_existing_data():
             print(f"❌ Failed to clear: {cmd}")
             print(result.stderr)
 
-def import_users_in_small_chunks(df):
-    """Import users in chunks of 25 records."""
-    print("👥 Importing 1,002 users in small chunks...")
-    
-    chunk_size = 25
-    total_chunks = (len(df) + chunk_size - 1) // chunk_size
-    successful_imports = 0
-    
-    for chunk_num in range(total_chunks):
-        start_idx = chunk_num * chunk_size
-        end_idx = min(start_idx + chunk_size, len(df))
-        chunk_df = df.iloc[start_idx:end_idx]
-        
-        print(f"📦 Chunk {chunk_num + 1}/{total_chunks}: Records {start_idx + 1}-{end_idx}")
-        
-        # Build SQL for this chunk
-        user_values = []
-        
-        for idx, row in chunk_df.iterrows():
+def user_rows(batches, db_ids=None):
+    """Yield (user id, VALUES SQL) for every user, or for the rows in db_ids ({DataFrame index: user id})."""
+    # Rows are packed into statements by size; db_ids selects rows and their user ids
+    for batch in selected_batches(batches, db_ids):
+        for idx, row in batch.iterrows():
+            user_id = idx + 1 if db_ids is None else db_ids[idx]
             # Map province name to code
             province_name = clean_text(row['province'])
             province_code = PROVINCE_MAPPING.get(province_name, 'ON')  # Default to ON
@@ -106,59 +123,14 @@ def import_users_in_small_chunks(df):
             
             city = clean_text(row['city']) or 'Toronto'
             
-            user_values.append(f"({idx + 1}, '{email}', 'hashed_password_placeholder', 'worker', '{first_name}', '{last_name}', '{phone}', '{province_code}', '{city}', TRUE, TRUE, TRUE, '2024-01-01 12:00:00')")
-        
-        # Create SQL statement
-        sql = f"""INSERT INTO users (id, email, password_hash, role, first_name, last_name, phone, province, city, is_verified, email_verified, is_active, created_at) VALUES
-{','.join(user_values)};"""
-        
-        # Write to temp file and execute
-        temp_file = f"/tmp/users_chunk_{chunk_num + 1}.sql"
-        with open(temp_file, 'w', encoding='utf-8') as f:
-            f.write(sql)
-        
-        result = subprocess.run([
-            "npx", "wrangler", "d1", "execute", 
-            "kwikr-directory-production", "--local", f"--file={temp_file}"
-        ], cwd="/home/user/webapp", capture_output=True, text=True, timeout=60)
-        
-        if result.returncode == 0:
-            print(f"✅ Chunk {chunk_num + 1} imported successfully")
-            successful_imports += 1
-        else:
-            print(f"❌ Chunk {chunk_num + 1} failed: {result.stderr[:200]}...")
-        
-        # Clean up temp file
-        try:
-            os.remove(temp_file)
-        except:
-            pass
-        
-        # Small delay
-        time.sleep(0.5)
-    
-    print(f"📊 Users Import: {successful_imports}/{total_chunks} chunks successful")
-    return successful_imports > 0
+            yield user_id, f"({user_id}, '{email}', 'hashed_password_placeholder', 'worker', '{first_name}', '{last_name}', '{phone}', '{province_code}', '{city}', TRUE, TRUE, TRUE, '2024-01-01 12:00:00')"
 
-def import_profiles_in_small_chunks(df):
-    """Import user profiles in chunks of 25 records."""
-    print("🏢 Importing 1,002 business profiles in small chunks...")
-    
-    chunk_size = 25
-    total_chunks = (len(df) + chunk_size - 1) // chunk_size
-    successful_imports = 0
-    
-    for chunk_num in range(total_chunks):
-        start_idx = chunk_num * chunk_size
-        end_idx = min(start_idx + chunk_size, len(df))
-        chunk_df = df.iloc[start_idx:end_idx]
-        
-        print(f"📦 Profile Chunk {chunk_num + 1}/{total_chunks}: Records {start_idx + 1}-{end_idx}")
-        
-        # Build SQL for this chunk
-        profile_values = []
-        
-        for idx, row in chunk_df.iterrows():
+def profile_rows(batches, db_ids=None):
+    """Yield (user id, VALUES SQL) for every user profile, or for the rows in db_ids ({DataFrame index: user id})."""
+    # Rows are packed into statements by size; db_ids selects rows and their user ids
+    for batch in selected_batches(batches, db_ids):
+        for idx, row in batch.iterrows():
+            user_id = idx + 1 if db_ids is None else db_ids[idx]
             company_name = clean_text(row['company'])
             description = clean_text(row['description'])
             
@@ -177,59 +149,14 @@ def import_profiles_in_small_chunks(df):
             postal_code = clean_text(row['postal_code'])
             website = clean_text(row['website'])
             
-            profile_values.append(f"({idx + 1}, '{company_name}', '{description}', '{profile_image_url}', '{address}', '{postal_code}', '{website}', '2024-01-01 12:00:00')")
-        
-        # Create SQL statement
-        sql = f"""INSERT INTO user_profiles (user_id, company_name, company_description, profile_image_url, address_line1, postal_code, website_url, created_at) VALUES
-{','.join(profile_values)};"""
-        
-        # Write to temp file and execute
-        temp_file = f"/tmp/profiles_chunk_{chunk_num + 1}.sql"
-        with open(temp_file, 'w', encoding='utf-8') as f:
-            f.write(sql)
-        
-        result = subprocess.run([
-            "npx", "wrangler", "d1", "execute", 
-            "kwikr-directory-production", "--local", f"--file={temp_file}"
-        ], cwd="/home/user/webapp", capture_output=True, text=True, timeout=60)
-        
-        if result.returncode == 0:
-            print(f"✅ Profile Chunk {chunk_num + 1} imported successfully")
-            successful_imports += 1
-        else:
-            print(f"❌ Profile Chunk {chunk_num + 1} failed: {result.stderr[:200]}...")
-        
-        # Clean up temp file
-        try:
-            os.remove(temp_file)
-        except:
-            pass
-        
-        # Small delay
-        time.sleep(0.5)
-    
-    print(f"📊 Profiles Import: {successful_imports}/{total_chunks} chunks successful")
-    return successful_imports > 0
+            yield user_id, f"({user_id}, '{company_name}', '{description}', '{profile_image_url}', '{address}', '{postal_code}', '{website}', '2024-01-01 12:00:00')"
 
-def import_services_in_small_chunks(df):
-    """Import worker services in chunks of 25 records."""
-    print("⚙️ Importing 1,002 business services in small chunks...")
-    
-    chunk_size = 25
-    total_chunks = (len(df) + chunk_size - 1) // chunk_size
-    successful_imports = 0
-    
-    for chunk_num in range(total_chunks):
-        start_idx = chunk_num * chunk_size
-        end_idx = min(start_idx + chunk_size, len(df))
-        chunk_df = df.iloc[start_idx:end_idx]
-        
-        print(f"📦 Service Chunk {chunk_num + 1}/{total_chunks}: Records {start_idx + 1}-{end_idx}")
-        
-        # Build SQL for this chunk
-        service_values = []
-        
-        for idx, row in chunk_df.iterrows():
+def service_rows(batches, db_ids=None):
+    """Yield (user id, VALUES SQL) for every worker service, or for the rows in db_ids ({DataFrame index: user id})."""
+    # Rows are packed into statements by size; db_ids selects rows and their user ids
+    for batch in selected_batches(batches, db_ids):
+        for idx, row in batch.iterrows():
+            user_id = idx + 1 if db_ids is None else db_ids[idx]
             category = clean_text(row['category']) or 'Professional Services'
             city = clean_text(row['city']) or 'Toronto'
             service_area = f"Greater {city} Area"
@@ -238,115 +165,194 @@ def import_services_in_small_chunks(df):
             if pd.notna(row['hourly_rate']) and row['hourly_rate'] > 0:
                 hourly_rate = int(row['hourly_rate'])
             
-            service_values.append(f"({idx + 1}, '{category}', '{category}', '{service_area}', {hourly_rate}, '2024-01-01 12:00:00')")
-        
-        # Create SQL statement
-        sql = f"""INSERT INTO worker_services (user_id, service_name, service_category, service_area, hourly_rate, created_at) VALUES
-{','.join(service_values)};"""
-        
-        # Write to temp file and execute
-        temp_file = f"/tmp/services_chunk_{chunk_num + 1}.sql"
-        with open(temp_file, 'w', encoding='utf-8') as f:
-            f.write(sql)
-        
-        result = subprocess.run([
-            "npx", "wrangler", "d1", "execute", 
-            "kwikr-directory-production", "--local", f"--file={temp_file}"
-        ], cwd="/home/user/webapp", capture_output=True, text=True, timeout=60)
-        
-        if result.returncode == 0:
-            print(f"✅ Service Chunk {chunk_num + 1} imported successfully")
-            successful_imports += 1
-        else:
-            print(f"❌ Service Chunk {chunk_num + 1} failed: {result.stderr[:200]}...")
-        
-        # Clean up temp file
-        try:
-            os.remove(temp_file)
-        except:
-            pass
-        
-        # Small delay
-        time.sleep(0.5)
-    
-    print(f"📊 Services Import: {successful_imports}/{total_chunks} chunks successful")
-    return successful_imports > 0
+            yield user_id, f"({user_id}, '{category}', '{category}', '{service_area}', {hourly_rate}, '2024-01-01 12:00:00')"
+
+def user_chunks(excel_file, chunker, sink=None):
+    """Yield (label, statement) for users packed into size-limited INSERTs."""
+    print("👥 Importing 1,002 users...")
+    yield from labelled_chunks(tracked(chunker.pack(USERS_INSERT, user_rows(iter_record_batches(excel_file))), sink))
 
-def verify_import():
-    """Verify the final import counts."""
-    print("\n🔍 Verifying complete import...")
+def profile_chunks(excel_file, chunker, sink=None):
+    """Yield (label, statement) for user profiles packed into size-limited INSERTs."""
+    print("🏢 Importing 1,002 business profiles...")
+    yield from labelled_chunks(tracked(chunker.pack(PROFILES_INSERT, profile_rows(iter_record_batches(excel_file))), sink),
+                               'Profile Chunk')
+
+def service_chunks(excel_file, chunker, sink=None):
+    """Yield (label, statement) for worker services packed into size-limited INSERTs."""
+    print("⚙️ Importing 1,002 business services...")
+    yield from labelled_chunks(tracked(chunker.pack(SERVICES_INSERT, service_rows(iter_record_batches(excel_file))), sink),
+                               'Service Chunk')
+
+def source_inserts(excel_file):
+    """(INSERT header, rows) of every row a full import writes, for the verification checksums."""
+    return [
+        (USERS_INSERT, user_rows(iter_record_batches(excel_file))),
+        (PROFILES_INSERT, profile_rows(iter_record_batches(excel_file))),
+        (SERVICES_INSERT, service_rows(iter_record_batches(excel_file))),
+    ]
+
+def existing_user_ids(executor, db_ids):
+    """db_ids ({DataFrame index: user id}) restricted to the users present in the database."""
+    if not db_ids:
+        return {}
+    id_list = ', '.join(str(user_id) for user_id in db_ids.values())
+    present = {row['id'] for row in executor.query(f"SELECT id FROM users WHERE id IN ({id_list})")}
+    return {idx: user_id for idx, user_id in db_ids.items() if user_id in present}
+
+def rows_for_existing_users(executor, rows_function, excel_file, db_ids):
+    """rows_function rows for the users in db_ids that exist once iteration starts, i.e. after the users stage."""
+    yield from rows_function(iter_record_batches(excel_file), existing_user_ids(executor, db_ids))
+
+def delta_stages(executor, excel_file, new_ids, changed_ids, vanished_ids, chunker, sinks):
+    """run_stages stages writing only new and changed rows ({DataFrame index: user id}) and deleting vanished ids."""
+    written = {**new_ids, **changed_ids}
     
-    # Check users
-    result = subprocess.run([
-        "npx", "wrangler", "d1", "execute", 
-        "kwikr-directory-production", "--local", 
-        "--command=SELECT COUNT(*) as total_users FROM users"
-    ], cwd="/home/user/webapp", capture_output=True, text=True, timeout=30)
+    # New users are plain INSERTs, so an id taken by a signup is rejected rather than overwritten
+    user_statements = chain(
+        chunker.pack(USERS_INSERT, user_rows(iter_record_batches(excel_file), new_ids)),
+        chunker.pack(USERS_INSERT, user_rows(iter_record_batches(excel_file), changed_ids), terminator=USERS_UPSERT),
+    )
+    # Profiles and services only for users that landed, so rejected users leave no orphans
+    profile_statements = chunker.pack(PROFILES_INSERT, rows_for_existing_users(executor, profile_rows, excel_file, written),
+                                      terminator=PROFILES_UPSERT)
+    service_statements = chunker.pack(SERVICES_INSERT, rows_for_existing_users(executor, service_rows, excel_file, written))
     
-    if result.returncode == 0:
-        print("👥 Users count:")
-        print(result.stdout)
+    # worker_services has no unique key per user, so a changed user's services are replaced
+    stale_services = delete_statements('worker_services', 'user_id', changed_ids.values())
+    vanished = zip(*(delete_statements(table, column, vanished_ids) for table, column in
+                     (('worker_services', 'user_id'), ('user_profiles', 'user_id'), ('users', 'id'))))
+    
+    return [
+        ('users', labelled_chunks(tracked(user_statements, sinks['users']), 'User Chunk')),
+        ('user_profiles', labelled_chunks(tracked(profile_statements, sinks['user_profiles']), 'Profile Chunk')),
+        ('stale_services', [(f"Stale Services {n}", sql) for n, sql in enumerate(stale_services, 1)]),
+        ('worker_services', labelled_chunks(tracked(service_statements, sinks['worker_services']), 'Service Chunk')),
+        ('vanished', [(f"Vanished {n}", '\n'.join(sql)) for n, sql in enumerate(vanished, 1)]),
+    ]
+
+def landed_user_ids(sinks, results):
+    """User ids whose user, profile and service rows were all committed."""
+    return set.intersection(*(landed_keys(sinks[name], results.get(name)) for name in sinks))
+
+def import_delta(executor, store, chunker, concurrency, reject_file):
+    """Write only the businesses that changed since the last recorded run."""
+    current = source_hashes(iter_record_batches(EXCEL_FILE))
+    previous = store.load()
+    if not previous:
+        print("❌ No row hashes recorded for this database yet; run a full import first")
+        return
     
-    # Check profiles
-    result = subprocess.run([
-        "npx", "wrangler", "d1", "execute", 
-        "kwikr-directory-production", "--local", 
-        "--command=SELECT COUNT(*) as total_profiles FROM user_profiles"
-    ], cwd="/home/user/webapp", capture_output=True, text=True, timeout=30)
+    plan = DeltaPlan(previous, current)
+    plan.print_summary()
+    if not plan:
+        print("✅ Database already matches the export")
+        return
     
-    if result.returncode == 0:
-        print("🏢 Profiles count:")
-        print(result.stdout)
+    # New businesses get ids above every existing user and every id handed out before
+    max_id = executor.query("SELECT MAX(id) AS max_id FROM users")[0]['max_id'] or 0
+    next_id = max([max_id] + [db_id for db_id, _ in previous.values()]) + 1
+    new_ids = {current[key][0]: next_id + n for n, key in enumerate(plan.new)}
+    changed_ids = {current[key][0]: previous[key][0] for key in plan.changed}
     
-    # Check services
-    result = subprocess.run([
-        "npx", "wrangler", "d1", "execute", 
-        "kwikr-directory-production", "--local", 
-        "--command=SELECT COUNT(*) as total_services FROM worker_services"
-    ], cwd="/home/user/webapp", capture_output=True, text=True, timeout=30)
+    sinks = {name: [] for name in ('users', 'user_profiles', 'worker_services')}
+    stages = delta_stages(executor, EXCEL_FILE, new_ids, changed_ids, plan.vanished.values(), chunker, sinks)
+    results = run_stages(executor, stages, concurrency=concurrency, dependencies=DELTA_DEPENDENCIES,
+                         on_result=print_chunk_result, reject_file=reject_file)
+    print_stage_summary(results, STAGE_TITLES)
     
-    if result.returncode == 0:
-        print("⚙️ Services count:")
-        print(result.stdout)
+    # Only rows that fully landed are recorded, the rest are retried next run
+    landed = landed_user_ids(sinks, results)
+    db_ids = {key: new_ids.get(current[key][0], changed_ids.get(current[key][0])) for key in plan.new + plan.changed}
+    applied = {key: (db_id, current[key][1]) for key, db_id in db_ids.items() if db_id in landed}
+    vanished_results = results.get('vanished') or []
+    removed = plan.vanished if all(result.returncode == 0 for result in vanished_results) else {}
+    store.save(applied, removed)
+    print(f"💾 Recorded {len(applied)} applied rows, {len(removed)} removed rows")
 
-def main():
+def main(remote=False, concurrency=DEFAULT_CONCURRENCY, max_statement_bytes=DEFAULT_MAX_BYTES,
+         reject_file=DEFAULT_REJECT_FILE, restart=False, delta=False, staging=False):
     """Main import process for all 1,002 authentic Kwikr businesses."""
     print("🎯 IMPORTING ALL 1,002 AUTHENTIC KWIKR BUSINESSES")
     print("=" * 60)
     
-    # Read Excel file
+    # Stream the Excel file once for the row count and province distribution
     print("📖 Reading complete Kwikr dataset from Excel...")
-    df = pd.read_excel('/home/user/webapp/Kwikr_complete_data.xlsx')
-    print(f"📊 Found {len(df)} authentic Kwikr businesses")
+    total_rows = 0
+    province_counts = Counter()
+    for batch in iter_record_batches(EXCEL_FILE):
+        total_rows += len(batch)
+        province_counts.update(batch['province'].dropna())
+    print(f"📊 Found {total_rows} authentic Kwikr businesses")
     
     # Show province distribution
     print("\n🗺️ Province Distribution:")
-    for province, count in df['province'].value_counts().items():
+    for province, count in province_counts.most_common():
         code = PROVINCE_MAPPING.get(province, '??')
         print(f"  {province} ({code}): {count} businesses")
     
-    # Clear existing data
-    clear_existing_data()
+    chunker = StatementChunker(max_statement_bytes)
+    if delta:
+        with open_executor(remote) as executor, RowHashStore('remote' if remote else 'local') as store:
+            import_delta(executor, store, chunker, concurrency, reject_file)
+            verify_import(executor)
+        print("\n🎉 KWIKR BUSINESSES DELTA IMPORT FINISHED!")
+        return
     
-    # Import in sequence
-    print("\n🚀 Starting sequential import of all data...")
+    # Checkpoints are only valid for the same input, chunking and target tables
+    source_hash = cache_key(EXCEL_FILE, str(max_statement_bytes) + ('-staging' if staging else ''))
     
-    # Import users first
-    users_success = import_users_in_small_chunks(df)
-    
-    if users_success:
-        # Import profiles
-        profiles_success = import_profiles_in_small_chunks(df)
+    with open_executor(remote) as executor, open_journal(__file__, source_hash, remote, restart) as journal, \
+            RowHashStore('remote' if remote else 'local') as store:
+        # Clear existing data (or prepare empty staging tables), unless resuming over chunks an earlier run committed
+        if not journal.resuming:
+            if staging:
+                if not prepare_staging(executor):
+                    return
+            else:
+                with executor.stage('clear'):
+                    clear_existing_data(executor)
         
-        # Import services
-        services_success = import_services_in_small_chunks(df)
-    else:
-        print("❌ Users import failed, skipping profiles and services")
-    
-    # Verify results
-    verify_import()
+        # Users first, then profiles and services (skipped if no user chunk succeeded)
+        print("\n🚀 Starting import of all data...")
+        sinks = {name: [] for name in ('users', 'user_profiles', 'worker_services')}
+        stages = [
+            ('users', user_chunks(EXCEL_FILE, chunker, sinks['users'])),
+            ('user_profiles', profile_chunks(EXCEL_FILE, chunker, sinks['user_profiles'])),
+            ('worker_services', service_chunks(EXCEL_FILE, chunker, sinks['worker_services'])),
+        ]
+        if staging:
+            stages = [(name, staged_chunks(chunks, name)) for name, chunks in stages]
+        results = run_stages(executor, stages, concurrency=concurrency, on_result=print_chunk_result,
+                             reject_file=reject_file, journal=journal)
+        print_stage_summary(results, STAGE_TITLES)
+        
+        # Staged rows only go live once every chunk landed and the staging tables validate
+        if staging and not (all_succeeded(results) and validate_staging(executor) and swap_in_staging(executor)):
+            print("⚠️ Live tables left unchanged; staging tables kept for inspection")
+            verify_import(executor)
+            return
+        
+        # Row hashes for a later --delta run; ids are the row positions
+        landed = landed_user_ids(sinks, results)
+        current = source_hashes(iter_record_batches(EXCEL_FILE))
+        store.save({key: (idx + 1, content_hash) for key, (idx, content_hash) in current.items() if idx + 1 in landed},
+                   replace=True)
+        
+        # Verify the tables against the rows generated from the export
+        verify_import(executor, source_report(source_inserts(EXCEL_FILE)))
     
     print("\n🎉 COMPLETE 1,002 KWIKR BUSINESSES IMPORT FINISHED!")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description=__doc__)
+    add_target_arguments(parser)
+    add_dispatch_arguments(parser)
+    add_chunk_arguments(parser)
+    add_reject_arguments(parser)
+    add_journal_arguments(parser)
+    add_delta_arguments(parser)
+    add_staging_arguments(parser)
+    args = parser.parse_args()
+    main(args.remote, args.concurrency, args.max_statement_bytes, args.reject_file, args.restart, args.delta,
+         args.staging)
\ No newline at end of file
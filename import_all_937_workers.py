@@ -4,11 +4,24 @@ Import ALL 937 workers to match the user's exact facts.
 Handle duplicates properly and ensure complete import.
 """
 
+import argparse
 import pandas as pd
 import re
-import subprocess
-import time
 import hashlib
+from collections import Counter
+from functools import partial
+
+from d1_dispatch import DEFAULT_CONCURRENCY, DEFAULT_REJECT_FILE, add_dispatch_arguments, add_reject_arguments, all_succeeded, print_chunk_result, print_stage_summary, run_stages
+from d1_executor import add_target_arguments, open_executor
+from import_readers import DEFAULT_BATCH_ROWS, count_records, iter_record_batches, limit_records, rebatch
+from import_journal import add_journal_arguments, open_journal
+from import_verification import source_report, verify_import
+from parse_cache import cache_key
+from sql_chunks import DEFAULT_MAX_BYTES, StatementChunker, add_chunk_arguments, labelled_chunks
+from staging_swap import add_staging_arguments, prepare_staging, staged_chunks, swap_in_staging, validate_staging
+
+EXCEL_FILE = '/home/user/webapp/Kwikr_complete_data.xlsx'
+TARGET_WORKERS = 937
 
 # Province name to code mapping
 PROVINCE_MAPPING = {
@@ -27,6 +40,10 @@ PROVINCE_MAPPING = {
     'Nunavut': 'NU'
 }
 
+USERS_INSERT = "INSERT OR IGNORE INTO users (id, email, password_hash, role, first_name, last_name, phone, province, city, is_verified, email_verified, is_active, created_at) VALUES\n"
+PROFILES_INSERT = "INSERT OR IGNORE INTO user_profiles (user_id, company_name, company_description, profile_image_url, address_line1, postal_code, website_url, created_at) VALUES\n"
+SERVICES_INSERT = "INSERT OR IGNORE INTO worker_services (user_id, service_name, service_category, service_area, hourly_rate, created_at) VALUES\n"
+
 def clean_text(text):
     """Clean text for SQL insertion."""
     if pd.isna(text) or text is None:
@@ -56,7 +73,18 @@ def generate_unique_email(company_name, index, existing_emails):
     existing_emails.add(email)
     return email
 
-def clear_all_data():
+def has_company(batch):
+    """Rows with a non-empty company name"""
+    return batch['company'].map(lambda company: isinstance(company, str) and len(company) > 0)
+
+def selected_batches(excel_file, chunk_size, filter_companies=False):
+    """Stream the records chosen for import in batches of chunk_size."""
+    batches = iter_record_batches(excel_file, chunk_size)
+    if filter_companies:
+        batches = (batch[has_company(batch)] for batch in batches)
+    return rebatch(limit_records(batches, TARGET_WORKERS), chunk_size)
+
+def clear_all_data(executor):
     """Clear existing data completely."""
     print("🧹 Clearing ALL existing data...")
     
@@ -67,35 +95,20 @@ def clear_all_data():
     ]
     
     for cmd in clear_commands:
-        result = subprocess.run([
-            "npx", "wrangler", "d1", "execute", 
-            "kwikr-directory-production", "--local", f"--command={cmd}"
-        ], cwd="/home/user/webapp", capture_output=True, text=True, timeout=30)
+        result = executor.execute_command(cmd)
         
         if result.returncode == 0:
             print(f"✅ Cleared: {cmd}")
         else:
             print(f"❌ Failed to clear: {cmd}")
 
-def import_all_users(df):
-    """Import ALL users with proper duplicate handling."""
-    print(f"👥 Importing ALL {len(df)} users...")
-    
+def user_rows(select_batches):
+    """Yield (record number, VALUES SQL) for every user, with proper duplicate handling."""
     existing_emails = set()
-    chunk_size = 10  # Smaller chunks to avoid issues
-    total_chunks = (len(df) + chunk_size - 1) // chunk_size
-    successful_imports = 0
     
-    for chunk_num in range(total_chunks):
-        start_idx = chunk_num * chunk_size
-        end_idx = min(start_idx + chunk_size, len(df))
-        chunk_df = df.iloc[start_idx:end_idx]
-        
-        print(f"📦 User Chunk {chunk_num + 1}/{total_chunks}: Records {start_idx + 1}-{end_idx}")
-        
-        user_values = []
-        
-        for idx, row in chunk_df.iterrows():
+    # Rows are packed into statements by size
+    for batch in select_batches(DEFAULT_BATCH_ROWS):
+        for idx, row in batch.iterrows():
             # Map province name to code
             province_name = clean_text(row['province'])
             province_code = PROVINCE_MAPPING.get(province_name, 'ON')
@@ -119,57 +132,13 @@ def import_all_users(df):
             city = clean_text(row['city']) or 'Toronto'
             city = city[:50]  # Limit city length
             
-            user_values.append(f"({idx + 1}, '{email}', 'hashed_password_placeholder', 'worker', '{first_name}', '{last_name}', '{phone}', '{province_code}', '{city}', TRUE, TRUE, TRUE, '2024-01-01 12:00:00')")
-        
-        # Create and execute SQL
-        sql = f"""INSERT OR IGNORE INTO users (id, email, password_hash, role, first_name, last_name, phone, province, city, is_verified, email_verified, is_active, created_at) VALUES
-{','.join(user_values)};"""
-        
-        temp_file = f"/tmp/users_chunk_{chunk_num + 1}.sql"
-        with open(temp_file, 'w', encoding='utf-8') as f:
-            f.write(sql)
-        
-        result = subprocess.run([
-            "npx", "wrangler", "d1", "execute", 
-            "kwikr-directory-production", "--local", f"--file={temp_file}"
-        ], cwd="/home/user/webapp", capture_output=True, text=True, timeout=120)
-        
-        if result.returncode == 0:
-            print(f"✅ User Chunk {chunk_num + 1} imported successfully")
-            successful_imports += 1
-        else:
-            print(f"❌ User Chunk {chunk_num + 1} failed: {result.stderr[:200]}...")
-            # Continue anyway
-        
-        # Clean up
-        try:
-            import os
-            os.remove(temp_file)
-        except:
-            pass
-        
-        time.sleep(0.2)
-    
-    return successful_imports
+            yield idx + 1, f"({idx + 1}, '{email}', 'hashed_password_placeholder', 'worker', '{first_name}', '{last_name}', '{phone}', '{province_code}', '{city}', TRUE, TRUE, TRUE, '2024-01-01 12:00:00')"
 
-def import_all_profiles(df):
-    """Import ALL user profiles."""
-    print(f"🏢 Importing ALL {len(df)} business profiles...")
-    
-    chunk_size = 10
-    total_chunks = (len(df) + chunk_size - 1) // chunk_size
-    successful_imports = 0
-    
-    for chunk_num in range(total_chunks):
-        start_idx = chunk_num * chunk_size
-        end_idx = min(start_idx + chunk_size, len(df))
-        chunk_df = df.iloc[start_idx:end_idx]
-        
-        print(f"📦 Profile Chunk {chunk_num + 1}/{total_chunks}: Records {start_idx + 1}-{end_idx}")
-        
-        profile_values = []
-        
-        for idx, row in chunk_df.iterrows():
+def profile_rows(select_batches):
+    """Yield (record number, VALUES SQL) for every user profile."""
+    # Rows are packed into statements by size
+    for batch in select_batches(DEFAULT_BATCH_ROWS):
+        for idx, row in batch.iterrows():
             company_name = clean_text(row['company'])[:255]  # Limit length
             description = clean_text(row['description'])[:2000]  # Limit length
             
@@ -187,51 +156,13 @@ def import_all_profiles(df):
             postal_code = clean_text(row['postal_code'])[:10]
             website = clean_text(row['website'])[:255]
             
-            profile_values.append(f"({idx + 1}, '{company_name}', '{description}', '{profile_image_url}', '{address}', '{postal_code}', '{website}', '2024-01-01 12:00:00')")
-        
-        sql = f"""INSERT OR IGNORE INTO user_profiles (user_id, company_name, company_description, profile_image_url, address_line1, postal_code, website_url, created_at) VALUES
-{','.join(profile_values)};"""
-        
-        temp_file = f"/tmp/profiles_chunk_{chunk_num + 1}.sql"
-        with open(temp_file, 'w', encoding='utf-8') as f:
-            f.write(sql)
-        
-        result = subprocess.run([
-            "npx", "wrangler", "d1", "execute", 
-            "kwikr-directory-production", "--local", f"--file={temp_file}"
-        ], cwd="/home/user/webapp", capture_output=True, text=True, timeout=120)
-        
-        if result.returncode == 0:
-            successful_imports += 1
-        
-        try:
-            import os
-            os.remove(temp_file)
-        except:
-            pass
-        
-        time.sleep(0.2)
-    
-    return successful_imports
+            yield idx + 1, f"({idx + 1}, '{company_name}', '{description}', '{profile_image_url}', '{address}', '{postal_code}', '{website}', '2024-01-01 12:00:00')"
 
-def import_all_services(df):
-    """Import ALL worker services."""
-    print(f"⚙️ Importing ALL {len(df)} business services...")
-    
-    chunk_size = 10
-    total_chunks = (len(df) + chunk_size - 1) // chunk_size
-    successful_imports = 0
-    
-    for chunk_num in range(total_chunks):
-        start_idx = chunk_num * chunk_size
-        end_idx = min(start_idx + chunk_size, len(df))
-        chunk_df = df.iloc[start_idx:end_idx]
-        
-        print(f"📦 Service Chunk {chunk_num + 1}/{total_chunks}: Records {start_idx + 1}-{end_idx}")
-        
-        service_values = []
-        
-        for idx, row in chunk_df.iterrows():
+def service_rows(select_batches):
+    """Yield (record number, VALUES SQL) for every worker service."""
+    # Rows are packed into statements by size
+    for batch in select_batches(DEFAULT_BATCH_ROWS):
+        for idx, row in batch.iterrows():
             category = clean_text(row['category']) or 'Professional Services'
             city = clean_text(row['city']) or 'Toronto'
             service_area = f"Greater {city} Area"[:100]
@@ -240,103 +171,109 @@ def import_all_services(df):
             if pd.notna(row['hourly_rate']) and row['hourly_rate'] > 0:
                 hourly_rate = int(row['hourly_rate'])
             
-            service_values.append(f"({idx + 1}, '{category}', '{category}', '{service_area}', {hourly_rate}, '2024-01-01 12:00:00')")
-        
-        sql = f"""INSERT OR IGNORE INTO worker_services (user_id, service_name, service_category, service_area, hourly_rate, created_at) VALUES
-{','.join(service_values)};"""
-        
-        temp_file = f"/tmp/services_chunk_{chunk_num + 1}.sql"
-        with open(temp_file, 'w', encoding='utf-8') as f:
-            f.write(sql)
-        
-        result = subprocess.run([
-            "npx", "wrangler", "d1", "execute", 
-            "kwikr-directory-production", "--local", f"--file={temp_file}"
-        ], cwd="/home/user/webapp", capture_output=True, text=True, timeout=120)
-        
-        if result.returncode == 0:
-            successful_imports += 1
-        
-        try:
-            import os
-            os.remove(temp_file)
-        except:
-            pass
-        
-        time.sleep(0.2)
-    
-    return successful_imports
+            yield idx + 1, f"({idx + 1}, '{category}', '{category}', '{service_area}', {hourly_rate}, '2024-01-01 12:00:00')"
 
-def verify_final_counts():
-    """Verify we have the expected 937 workers."""
-    print("\n🔍 Verifying final worker count...")
-    
-    # Total count
-    result = subprocess.run([
-        "npx", "wrangler", "d1", "execute", 
-        "kwikr-directory-production", "--local", 
-        "--command=SELECT COUNT(*) as total_workers FROM users"
-    ], cwd="/home/user/webapp", capture_output=True, text=True, timeout=30)
-    
-    if result.returncode == 0:
-        print("👥 Total workers:")
-        print(result.stdout)
-    
-    # Province breakdown
-    result = subprocess.run([
-        "npx", "wrangler", "d1", "execute", 
-        "kwikr-directory-production", "--local", 
-        "--command=SELECT province, COUNT(*) as count FROM users GROUP BY province ORDER BY count DESC"
-    ], cwd="/home/user/webapp", capture_output=True, text=True, timeout=30)
-    
-    if result.returncode == 0:
-        print("🗺️ Province breakdown:")
-        print(result.stdout)
+def user_chunks(select_batches, total_rows, chunker):
+    """Yield (label, statement) for users packed into size-limited INSERTs."""
+    print(f"👥 Importing ALL {total_rows} users...")
+    yield from labelled_chunks(chunker.pack(USERS_INSERT, user_rows(select_batches)), 'User Chunk')
 
-def main():
+def profile_chunks(select_batches, total_rows, chunker):
+    """Yield (label, statement) for user profiles packed into size-limited INSERTs."""
+    print(f"🏢 Importing ALL {total_rows} business profiles...")
+    yield from labelled_chunks(chunker.pack(PROFILES_INSERT, profile_rows(select_batches)), 'Profile Chunk')
+
+def service_chunks(select_batches, total_rows, chunker):
+    """Yield (label, statement) for worker services packed into size-limited INSERTs."""
+    print(f"⚙️ Importing ALL {total_rows} business services...")
+    yield from labelled_chunks(chunker.pack(SERVICES_INSERT, service_rows(select_batches)), 'Service Chunk')
+
+def source_inserts(select_batches):
+    """(INSERT header, rows) of every row the import writes, for the verification checksums."""
+    return [
+        (USERS_INSERT, user_rows(select_batches)),
+        (PROFILES_INSERT, profile_rows(select_batches)),
+        (SERVICES_INSERT, service_rows(select_batches)),
+    ]
+
+def main(remote=False, concurrency=DEFAULT_CONCURRENCY, max_statement_bytes=DEFAULT_MAX_BYTES,
+         reject_file=DEFAULT_REJECT_FILE, restart=False, staging=False):
     """Import ALL workers to achieve 937 total as per user's facts."""
     print("🎯 IMPORTING ALL WORKERS TO MATCH EXACT FACTS: 937 TOTAL")
     print("=" * 70)
     
-    # Read Excel file
+    # Stream the Excel file once to size the selection
     print("📖 Reading complete Kwikr dataset...")
-    df = pd.read_excel('/home/user/webapp/Kwikr_complete_data.xlsx')
+    total_rows = count_records(EXCEL_FILE)
+    filter_companies = False
     
     # Filter out rows with missing critical data (only if we have 1002 and need to reduce to 937)
-    if len(df) > 937:
-        print(f"📊 Original: {len(df)} records, filtering to best {937} records...")
-        # Keep records with company names and descriptions
-        df_filtered = df.dropna(subset=['company'])
-        df_filtered = df_filtered[df_filtered['company'].str.len() > 0]
-        
-        if len(df_filtered) >= 937:
-            df = df_filtered.head(937)
-        else:
-            df = df.head(937)
+    if total_rows > TARGET_WORKERS:
+        print(f"📊 Original: {total_rows} records, filtering to best {TARGET_WORKERS} records...")
+        # Keep records with company names
+        filter_companies = count_records(EXCEL_FILE, predicate=has_company) >= TARGET_WORKERS
     
-    print(f"📊 Working with {len(df)} businesses for import")
+    select_batches = partial(selected_batches, EXCEL_FILE, filter_companies=filter_companies)
     
     # Show expected province distribution
+    import_rows = 0
+    province_counts = Counter()
+    for batch in select_batches(1000):
+        import_rows += len(batch)
+        province_counts.update(batch['province'].dropna())
+    
+    print(f"📊 Working with {import_rows} businesses for import")
+    
     print(f"\n🗺️ Target distribution (should total 937):")
-    df_province_counts = df['province'].value_counts()
-    for province, count in df_province_counts.items():
+    for province, count in province_counts.most_common():
         code = PROVINCE_MAPPING.get(province, '??')
         print(f"  {province} ({code}): {count} workers")
     
-    # Clear and import
-    clear_all_data()
+    # Checkpoints are only valid for the same input, chunking and target tables
+    source_hash = cache_key(EXCEL_FILE, f"{TARGET_WORKERS}-{max_statement_bytes}" + ('-staging' if staging else ''))
     
-    print(f"\n🚀 Starting import of {len(df)} workers...")
-    
-    # Import all data
-    import_all_users(df)
-    import_all_profiles(df)
-    import_all_services(df)
-    
-    # Verify
-    verify_final_counts()
+    with open_executor(remote) as executor, open_journal(__file__, source_hash, remote, restart) as journal:
+        # Clear (or stage) and import; a resumed run keeps the chunks an earlier run committed
+        if not journal.resuming:
+            if staging:
+                if not prepare_staging(executor):
+                    return
+            else:
+                with executor.stage('clear'):
+                    clear_all_data(executor)
+        
+        print(f"\n🚀 Starting import of {import_rows} workers...")
+        
+        # Import all data, users before the profiles and services that reference them
+        chunker = StatementChunker(max_statement_bytes)
+        stages = [
+            ('users', user_chunks(select_batches, import_rows, chunker)),
+            ('user_profiles', profile_chunks(select_batches, import_rows, chunker)),
+            ('worker_services', service_chunks(select_batches, import_rows, chunker)),
+        ]
+        if staging:
+            stages = [(name, staged_chunks(chunks, name)) for name, chunks in stages]
+        results = run_stages(executor, stages, concurrency=concurrency, on_result=print_chunk_result,
+                             reject_file=reject_file, journal=journal)
+        print_stage_summary(results)
+        
+        # Staged rows only go live once every chunk landed and the staging tables validate
+        if staging and not (all_succeeded(results) and validate_staging(executor) and swap_in_staging(executor)):
+            print("⚠️ Live tables left unchanged; staging tables kept for inspection")
+            verify_import(executor)
+        else:
+            # Verify the tables against the rows generated from the export
+            verify_import(executor, source_report(source_inserts(select_batches)))
     
     print("\n🎉 COMPLETE IMPORT TO MATCH USER'S EXACT FACTS!")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description=__doc__)
+    add_target_arguments(parser)
+    add_dispatch_arguments(parser)
+    add_chunk_arguments(parser)
+    add_reject_arguments(parser)
+    add_journal_arguments(parser)
+    add_staging_arguments(parser)
+    args = parser.parse_args()
+    main(args.remote, args.concurrency, args.max_statement_bytes, args.reject_file, args.restart, args.staging)
\ No newline at end of file
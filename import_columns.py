@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Column-at-a-time helpers shared by the worker import scripts.
+"""
+
+import html
+import re
+
+import numpy as np
+import pandas as pd
+
+HTML_TAG = re.compile('<[^<]+?>')
+
+# The entities the importers always decoded, in their original replace order
+LEGACY_ENTITIES = (('&nbsp;', ' '), ('&amp;', '&'), ('&lt;', '<'), ('&gt;', '>'))
+
+# Every other semicolon-terminated named or numeric character reference
+HTML_ENTITY = re.compile(r'&(?!(?:nbsp|amp|lt|gt);)(?:#[0-9]+|#[xX][0-9a-fA-F]+|[A-Za-z][A-Za-z0-9]*);')
+
+
+def categorical_lookup(values, table, default):
+    """
+    Look up every value of a column in a dict table, returning a float array.
+
+    Values are encoded as categorical codes against the table keys, so the
+    lookup is a single NumPy take; values missing from the table get default.
+    """
+    keys = list(table)
+    codes = pd.Categorical(list(values), categories=keys).codes
+    # Code -1 (not in table) indexes the trailing default slot
+    lookup = np.append(np.array([table[key] for key in keys], dtype=float), float(default))
+    return lookup[codes]
+
+
+def _decode_entity(match):
+    # html.unescape leaves unknown names like &foo; untouched
+    return html.unescape(match.group())
+
+
+def clean_html_column(values, max_length=None):
+    """
+    Strip HTML tags and entities from every value of a column, returning a list of strings.
+
+    Whitespace is collapsed to single spaces and each result is truncated to
+    max_length characters. Other character references are decoded before the
+    four legacy entities are replaced in their old order, so text that only
+    uses those cleans exactly as before.
+    """
+    results = []
+    for text in values:
+        if pd.isna(text):
+            results.append("")
+            continue
+        clean = HTML_TAG.sub('', str(text))
+        if '&' in clean:
+            clean = HTML_ENTITY.sub(_decode_entity, clean)
+            for entity, char in LEGACY_ENTITIES:
+                clean = clean.replace(entity, char)
+        results.append(' '.join(clean.split())[:max_length])
+    return results
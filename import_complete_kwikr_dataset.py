@@ -3,11 +3,28 @@
 Import the complete 1,002 authentic Kwikr businesses from Excel file into D1 database.
 """
 
+import argparse
+import itertools
 import pandas as pd
 import re
-import subprocess
 import hashlib
-import time
+
+from d1_dispatch import DEFAULT_CONCURRENCY, TABLE_DEPENDENCIES, add_dispatch_arguments, print_chunk_result, run_stages
+from d1_executor import add_target_arguments, open_executor
+from delta_import import delete_statements, row_key, upsert_clause
+from import_readers import read_records
+from migration_snapshot import TableDelta, assign_ids, delta_file, load_snapshot, save_snapshot, snapshot_file
+from sql_chunks import DEFAULT_MAX_BYTES, StatementChunker, add_chunk_arguments
+from sql_stream import MigrationWriter, read_sql_statements, statement_table
+
+USERS_INSERT = "INSERT INTO users (id, email, password_hash, role, first_name, last_name, phone, province, city, is_verified, email_verified, is_active, created_at) VALUES\n"
+PROFILES_INSERT = "INSERT INTO user_profiles (user_id, company_name, company_description, profile_image_url, address_line1, postal_code, website_url, created_at) VALUES\n"
+SERVICES_INSERT = "INSERT INTO worker_services (user_id, service_name, service_category, service_area, hourly_rate, created_at) VALUES\n"
+
+# Columns a delta migration overwrites for changed rows
+USERS_UPSERT = upsert_clause('id', ('email', 'first_name', 'last_name', 'phone', 'province', 'city'))
+PROFILES_UPSERT = upsert_clause('user_id', ('company_name', 'company_description', 'profile_image_url',
+                                            'address_line1', 'postal_code', 'website_url'))
 
 def clean_text(text):
     """Clean text for SQL insertion."""
@@ -20,13 +37,12 @@ def generate_phone(index):
     base = 4160000000 + index
     return f"+1-{str(base)[0:3]}-{str(base)[3:6]}-{str(base)[6:10]}"
 
-def create_migration_file():
-    """Create SQL migration file for all 1,002 Kwikr businesses."""
-    
+def read_dataset():
+    """Read and clean the complete Kwikr dataset."""
     print("🚀 Reading complete Kwikr dataset...")
     
-    # Read the Excel file
-    df = pd.read_excel('/home/user/webapp/Kwikr_complete_data.xlsx')
+    # Read the Excel file (reuses the cached parse when the file is unchanged)
+    df = read_records('/home/user/webapp/Kwikr_complete_data.xlsx')
     print(f"📊 Found {len(df)} businesses in Excel file")
     
     # Clean and prepare data
@@ -43,61 +59,40 @@ def create_migration_file():
     df['website'] = df['website'].fillna('')
     df['hourly_rate'] = df['hourly_rate'].fillna(75)
     
-    # Start building SQL
-    sql_parts = []
-    sql_parts.append("-- Import complete authentic Kwikr dataset (1,002 businesses)")
-    sql_parts.append("-- Generated from Kwikr_complete_data.xlsx")
-    sql_parts.append("")
-    
-    # Clear existing data
-    sql_parts.append("-- Clear existing test/incomplete data")
-    sql_parts.append("DELETE FROM user_profiles;")
-    sql_parts.append("DELETE FROM worker_services;")
-    sql_parts.append("DELETE FROM users;")
-    sql_parts.append("")
-    
-    # Insert users
-    sql_parts.append("-- Insert all 1,002 Kwikr businesses as users")
-    sql_parts.append("INSERT INTO users (id, email, password_hash, role, first_name, last_name, phone, province, city, is_verified, email_verified, is_active, created_at) VALUES")
+    return df
+
+def dataset_rows(df, ids=None):
+    """
+    Generated VALUES rows of all businesses as {table: {id: values_sql}}.
+
+    ids maps each DataFrame index to its user id; by default rows are
+    numbered from 1 in file order.
+    """
+    ids = ids or {index: index + 1 for index in df.index}
     
-    user_values = []
+    user_values = {}
     for index, row in df.iterrows():
+        user_id = ids[index]
         # Generate first/last name from company name
         company_words = clean_text(row['company']).split()
         first_name = company_words[0] if company_words else 'Business'
         last_name = company_words[1] if len(company_words) > 1 else 'Owner'
         
         # Use provided email or generate one
-        email = clean_text(row['email']) if row['email'] and '@' in str(row['email']) else f"business{index+1}@kwikr.ca"
+        email = clean_text(row['email']) if row['email'] and '@' in str(row['email']) else f"business{user_id}@kwikr.ca"
         
         # Use provided phone or generate one
-        phone = clean_text(row['phone']) if row['phone'] and str(row['phone']).strip() else generate_phone(index + 1)
+        phone = clean_text(row['phone']) if row['phone'] and str(row['phone']).strip() else generate_phone(user_id)
         
         # Clean location data
         city = clean_text(row['city'])
         province = clean_text(row['province'])
         
-        user_values.append(f"({index+1}, '{email}', 'hashed_password_placeholder', 'worker', '{first_name}', '{last_name}', '{phone}', '{province}', '{city}', TRUE, TRUE, TRUE, '2024-01-01 12:00:00')")
-    
-    # Split into chunks to avoid SQL length limits
-    chunk_size = 100
-    for i in range(0, len(user_values), chunk_size):
-        chunk = user_values[i:i + chunk_size]
-        if i == 0:
-            sql_parts.append(',\n'.join(chunk) + ';')
-        else:
-            sql_parts.append("")
-            sql_parts.append("INSERT INTO users (id, email, password_hash, role, first_name, last_name, phone, province, city, is_verified, email_verified, is_active, created_at) VALUES")
-            sql_parts.append(',\n'.join(chunk) + ';')
-    
-    sql_parts.append("")
-    
-    # Insert user profiles
-    sql_parts.append("-- Insert business profiles with authentic company data")
-    sql_parts.append("INSERT INTO user_profiles (user_id, company_name, company_description, profile_image_url, address_line1, postal_code, website_url, created_at) VALUES")
+        user_values[user_id] = f"({user_id}, '{email}', 'hashed_password_placeholder', 'worker', '{first_name}', '{last_name}', '{phone}', '{province}', '{city}', TRUE, TRUE, TRUE, '2024-01-01 12:00:00')"
     
-    profile_values = []
+    profile_values = {}
     for index, row in df.iterrows():
+        user_id = ids[index]
         company_name = clean_text(row['company'])
         description = clean_text(row['description'])
         
@@ -116,26 +111,11 @@ def create_migration_file():
         postal_code = clean_text(row['postal_code'])
         website = clean_text(row['website'])
         
-        profile_values.append(f"({index+1}, '{company_name}', '{description}', '{profile_image_url}', '{address}', '{postal_code}', '{website}', '2024-01-01 12:00:00')")
+        profile_values[user_id] = f"({user_id}, '{company_name}', '{description}', '{profile_image_url}', '{address}', '{postal_code}', '{website}', '2024-01-01 12:00:00')"
     
-    # Split profiles into chunks
-    for i in range(0, len(profile_values), chunk_size):
-        chunk = profile_values[i:i + chunk_size]
-        if i == 0:
-            sql_parts.append(',\n'.join(chunk) + ';')
-        else:
-            sql_parts.append("")
-            sql_parts.append("INSERT INTO user_profiles (user_id, company_name, company_description, profile_image_url, address_line1, postal_code, website_url, created_at) VALUES")
-            sql_parts.append(',\n'.join(chunk) + ';')
-    
-    sql_parts.append("")
-    
-    # Insert worker services
-    sql_parts.append("-- Insert professional services for all businesses")
-    sql_parts.append("INSERT INTO worker_services (user_id, service_name, service_category, service_area, hourly_rate, created_at) VALUES")
-    
-    service_values = []
+    service_values = {}
     for index, row in df.iterrows():
+        user_id = ids[index]
         category = clean_text(row['category']) if row['category'] else 'Professional Services'
         city = clean_text(row['city'])
         service_area = f"Greater {city} Area" if city else "Toronto Area"
@@ -144,109 +124,151 @@ def create_migration_file():
         # Create service name from category
         service_name = category
         
-        service_values.append(f"({index+1}, '{service_name}', '{category}', '{service_area}', {hourly_rate}, '2024-01-01 12:00:00')")
+        service_values[user_id] = f"({user_id}, '{service_name}', '{category}', '{service_area}', {hourly_rate}, '2024-01-01 12:00:00')"
     
-    # Split services into chunks
-    for i in range(0, len(service_values), chunk_size):
-        chunk = service_values[i:i + chunk_size]
-        if i == 0:
-            sql_parts.append(',\n'.join(chunk) + ';')
-        else:
-            sql_parts.append("")
-            sql_parts.append("INSERT INTO worker_services (user_id, service_name, service_category, service_area, hourly_rate, created_at) VALUES")
-            sql_parts.append(',\n'.join(chunk) + ';')
-    
-    # Write migration file
-    migration_content = '\n'.join(sql_parts)
+    return {
+        'users': user_values,
+        'user_profiles': profile_values,
+        'worker_services': service_values,
+    }
+
+def create_migration_file(tables, max_statement_bytes=DEFAULT_MAX_BYTES):
+    """Create SQL migration file for all 1,002 Kwikr businesses."""
+    chunker = StatementChunker(max_statement_bytes)
     migration_file = '/home/user/webapp/migrations/0015_complete_kwikr_dataset_1002_businesses.sql'
     
-    with open(migration_file, 'w', encoding='utf-8') as f:
-        f.write(migration_content)
+    # Statements are written as they are packed rather than joined in memory
+    with MigrationWriter(migration_file) as migration:
+        migration.line("-- Import complete authentic Kwikr dataset (1,002 businesses)")
+        migration.line("-- Generated from Kwikr_complete_data.xlsx")
+        migration.line()
+        
+        # Clear existing data
+        migration.line("-- Clear existing test/incomplete data")
+        migration.line("DELETE FROM user_profiles;")
+        migration.line("DELETE FROM worker_services;")
+        migration.line("DELETE FROM users;")
+        migration.line()
+        
+        # Insert users
+        migration.line("-- Insert all 1,002 Kwikr businesses as users")
+        
+        # Pack rows into statements that stay under D1's statement size limit
+        migration.statements(chunker.pack(USERS_INSERT, tables['users'].items(), separator=',\n'))
+        
+        migration.line()
+        
+        # Insert user profiles
+        migration.line("-- Insert business profiles with authentic company data")
+        
+        # Pack profiles into size-limited statements
+        migration.statements(chunker.pack(PROFILES_INSERT, tables['user_profiles'].items(), separator=',\n'))
+        
+        migration.line()
+        
+        # Insert worker services
+        migration.line("-- Insert professional services for all businesses")
+        
+        # Pack services into size-limited statements
+        migration.statements(chunker.pack(SERVICES_INSERT, tables['worker_services'].items(), separator=',\n'))
     
     print(f"✅ Generated migration file: {migration_file}")
-    print(f"📋 File size: {len(migration_content):,} characters")
+    print(f"📋 File size: {migration.characters:,} characters")
     
     return migration_file
 
-def apply_migration_in_chunks(migration_file):
-    """Apply the migration in manageable chunks."""
+def create_delta_migration_file(tables, previous, max_statement_bytes=DEFAULT_MAX_BYTES, remote=False):
+    """
+    Create a migration with only the rows that changed since the snapshot of the last applied migration.
+
+    Returns None when nothing changed.
+    """
+    chunker = StatementChunker(max_statement_bytes)
+    deltas = {table: TableDelta(previous.get(table, {}), rows) for table, rows in tables.items()}
+    for table, delta in deltas.items():
+        print(f"🔁 {table}: {delta.summary()}")
+    if not any(deltas.values()):
+        return None
+    
+    migration_file = delta_file(remote)
+    
+    with MigrationWriter(migration_file) as migration:
+        migration.line("-- Kwikr dataset delta: only new, changed and removed businesses")
+        migration.line("-- Generated from Kwikr_complete_data.xlsx")
+        migration.line()
+        
+        # Businesses that left the export, and the old services of changed businesses
+        migration.line("-- Remove vanished businesses and replaced services")
+        vanished = deltas['users'].vanished
+        for table, column in (('worker_services', 'user_id'), ('user_profiles', 'user_id'), ('users', 'id')):
+            migration.lines(delete_statements(table, column, vanished))
+        # worker_services has no unique key per user, so changed services are deleted and re-inserted;
+        # new ones too, in case an earlier apply of this delta landed them before failing
+        services = deltas['worker_services']
+        migration.lines(delete_statements('worker_services', 'user_id', services.changed + services.new))
+        migration.line()
+        
+        inserts = (('users', USERS_INSERT, USERS_UPSERT), ('user_profiles', PROFILES_INSERT, PROFILES_UPSERT),
+                   ('worker_services', SERVICES_INSERT, None))
+        for table, header, upsert in inserts:
+            delta = deltas[table]
+            rows = tables[table]
+            migration.line(f"-- {table}: {delta.summary()}")
+            # New rows are upserted as well, so re-applying a delta over a partial apply does not conflict
+            changed = ((row_id, rows[row_id]) for row_id in itertools.chain(delta.new, delta.changed))
+            if upsert:
+                statements = chunker.pack(header, changed, separator=',\n', terminator=upsert)
+            else:
+                statements = chunker.pack(header, changed, separator=',\n')
+            migration.statements(statements)
+            migration.line()
     
-    print("🚀 Starting chunked import of complete 1,002 business dataset...")
+    print(f"✅ Generated delta migration file: {migration_file}")
+    print(f"📋 File size: {migration.characters:,} characters")
     
-    # Read migration file and split into chunks
-    with open(migration_file, 'r', encoding='utf-8') as f:
-        content = f.read()
+    return migration_file
+
+def statement_stage(statement):
+    """Stage of a migration statement: 'clear' for the deletes, else the table it inserts into"""
+    return 'clear' if statement.startswith('DELETE FROM') else statement_table(statement)
+
+def apply_migration_in_chunks(executor, migration_file, concurrency=DEFAULT_CONCURRENCY):
+    """Apply the migration in manageable chunks."""
     
-    # Split by INSERT statements
-    statements = []
-    current_statement = []
+    print("🚀 Starting chunked import of complete 1,002 business dataset...")
     
-    for line in content.split('\n'):
-        if line.startswith('INSERT INTO') and current_statement:
-            # Save previous statement
-            statements.append('\n'.join(current_statement))
-            current_statement = [line]
-        elif line.startswith('DELETE FROM') or line.startswith('INSERT INTO'):
-            current_statement = [line]
-        elif current_statement:
-            current_statement.append(line)
+    # Count the statements of each stage in one streaming pass; each stage
+    # streams the file again when it runs, so the migration is never held in memory
+    stage_counts = {}
+    for statement in read_sql_statements(migration_file):
+        name = statement_stage(statement)
+        stage_counts[name] = stage_counts.get(name, 0) + 1
+    total_statements = sum(stage_counts.values())
     
-    if current_statement:
-        statements.append('\n'.join(current_statement))
+    print(f"📦 Split into {total_statements} SQL statements")
     
-    print(f"📦 Split into {len(statements)} SQL statements")
+    def stage_chunks(name):
+        for i, statement in enumerate(read_sql_statements(migration_file), 1):
+            if statement_stage(statement) == name:
+                yield f"Statement {i}/{total_statements}", statement
     
-    success_count = 0
+    stages = [(name, stage_chunks(name)) for name in stage_counts]
     
-    for i, statement in enumerate(statements, 1):
-        if not statement.strip() or statement.strip().startswith('--'):
-            continue
-            
-        print(f"⚡ Executing statement {i}/{len(statements)}")
-        
-        # Write temporary file
-        temp_file = f"/tmp/chunk_{i}.sql"
-        with open(temp_file, 'w', encoding='utf-8') as f:
-            f.write(statement)
-        
-        # Execute with wrangler
-        cmd = ["npx", "wrangler", "d1", "execute", "kwikr-directory-production", "--local", f"--file={temp_file}"]
-        
-        try:
-            result = subprocess.run(cmd, cwd="/home/user/webapp", capture_output=True, text=True, timeout=120)
-            
-            if result.returncode == 0:
-                print(f"✅ Statement {i} completed successfully")
-                success_count += 1
-            else:
-                print(f"❌ Statement {i} failed: {result.stderr[:200]}...")
-                # Continue with other statements
-        
-        except subprocess.TimeoutExpired:
-            print(f"⏰ Statement {i} timed out")
-        except Exception as e:
-            print(f"💥 Statement {i} error: {e}")
-        
-        # Clean up temp file
-        try:
-            import os
-            os.remove(temp_file)
-        except:
-            pass
-        
-        # Small delay between statements
-        time.sleep(1)
+    # Users wait for the delete; profiles and services wait for users
+    results = run_stages(executor, stages, concurrency=concurrency,
+                         dependencies=dict(TABLE_DEPENDENCIES, users=('clear',)), on_result=print_chunk_result)
+    success_count = sum(result.returncode == 0 for stage_results in results.values() for result in stage_results or [])
     
     print(f"\n📊 Import Summary:")
-    print(f"Total statements: {len([s for s in statements if s.strip() and not s.strip().startswith('--')])}")
+    print(f"Total statements: {total_statements}")
     print(f"Successful: {success_count}")
+    all_applied = all(stage_results is not None and all(result.returncode == 0 for result in stage_results)
+                      for stage_results in results.values())
     
     # Verify final count
     print("\n🔍 Verifying final import...")
-    verify_cmd = ["npx", "wrangler", "d1", "execute", "kwikr-directory-production", "--local", "--command=SELECT COUNT(*) as total_users FROM users"]
-    
     try:
-        result = subprocess.run(verify_cmd, cwd="/home/user/webapp", capture_output=True, text=True, timeout=30)
+        result = executor.execute_command("SELECT COUNT(*) as total_users FROM users")
         if result.returncode == 0:
             print("✅ Final verification:")
             print(result.stdout)
@@ -254,19 +276,54 @@ def apply_migration_in_chunks(migration_file):
             print("❌ Verification failed")
     except Exception as e:
         print(f"⚠️ Verification error: {e}")
+    
+    return all_applied
 
-def main():
+def main(remote=False, concurrency=DEFAULT_CONCURRENCY, max_statement_bytes=DEFAULT_MAX_BYTES, delta=False):
     """Main import process."""
     print("🎯 IMPORTING COMPLETE 1,002 AUTHENTIC KWIKR BUSINESSES")
     print("=" * 60)
     
-    # Create migration file
-    migration_file = create_migration_file()
-    
-    # Apply in chunks
-    apply_migration_in_chunks(migration_file)
+    df = read_dataset()
+    # Rows keep their user id across refreshes by Kwikr user_id (or email)
+    keys = {index: row_key(row) or f"#{index + 1}" for index, row in df.iterrows()}
+    
+    # Create migration file: only the changes since the last applied snapshot with --delta
+    snapshot_path = snapshot_file(remote)
+    applied_migration, previous_ids, previous = load_snapshot(snapshot_path)
+    if delta and applied_migration:
+        print(f"📸 Diffing against {applied_migration}")
+        ids = assign_ids(keys, previous_ids)
+        tables = dataset_rows(df, ids)
+        migration_file = create_delta_migration_file(tables, previous, max_statement_bytes, remote)
+        if migration_file is None:
+            print("✅ Dataset unchanged since the last applied migration, nothing to import")
+            return
+    else:
+        if delta:
+            print("⚠️ No applied snapshot yet, generating the full migration")
+        ids = {index: index + 1 for index in df.index}
+        tables = dataset_rows(df, ids)
+        migration_file = create_migration_file(tables, max_statement_bytes)
+    
+    # Apply in chunks, one transaction per table stage
+    with open_executor(remote) as executor:
+        if apply_migration_in_chunks(executor, migration_file, concurrency):
+            save_snapshot(migration_file, {keys[index]: user_id for index, user_id in ids.items()}, tables,
+                          snapshot_path)
+            print(f"📸 Saved dataset snapshot for {migration_file}")
+        elif delta and applied_migration:
+            # The snapshot is unchanged, so the next --delta run regenerates these changes
+            print(f"⚠️ Delta not fully applied, the next --delta run retries it: {migration_file}")
     
     print("\n🎉 Complete Kwikr dataset import finished!")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description=__doc__)
+    add_target_arguments(parser)
+    add_dispatch_arguments(parser)
+    add_chunk_arguments(parser)
+    parser.add_argument('--delta', action='store_true',
+                        help='generate and apply only the changes since the last applied migration snapshot')
+    args = parser.parse_args()
+    main(args.remote, args.concurrency, args.max_statement_bytes, args.delta)
\ No newline at end of file
@@ -3,170 +3,124 @@
 Import the complete Kwikr dataset in manageable chunks to avoid timeout issues.
 """
 
-import subprocess
-import time
+import argparse
 import os
 
-def run_import_chunk(chunk_file, chunk_number, total_chunks):
+from d1_dispatch import DEFAULT_CONCURRENCY, add_dispatch_arguments, print_chunk_result, run_stages
+from d1_executor import add_target_arguments, open_executor
+from import_journal import add_journal_arguments, open_journal
+from parse_cache import cache_key
+from sql_chunks import DEFAULT_MAX_BYTES, StatementChunker, add_chunk_arguments
+from sql_stream import read_sql_statements, split_insert, statement_table
+
+MIGRATION_FILE = "/home/user/webapp/migrations/0014_import_complete_kwikr_dataset.sql"
+
+# Chunk files are named import_<stage>_chunk*.sql
+CHUNK_DEPENDENCIES = {
+    'profiles': ('users',),
+    'services': ('users',),
+}
+
+# Chunk stage for each table the migration inserts into
+TABLE_STAGES = {
+    'users': 'users',
+    'user_profiles': 'profiles',
+    'worker_services': 'services',
+}
+
+def create_import_chunks(max_statement_bytes=DEFAULT_MAX_BYTES):
     """
-    Import a single chunk file and report progress.
+    Stream the full migration file and write its INSERT statements as smaller chunk files.
     """
-    print(f"Importing chunk {chunk_number}/{total_chunks}: {chunk_file}")
-    
-    cmd = ["npx", "wrangler", "d1", "execute", "kwikr-directory-production", "--local", f"--file={chunk_file}"]
-    
-    try:
-        result = subprocess.run(cmd, cwd="/home/user/webapp", capture_output=True, text=True, timeout=60)
+    chunker = StatementChunker(max_statement_bytes)
+    chunk_files = []
+    found = set()
+    
+    # Only one statement of the migration is in memory at a time
+    for statement in read_sql_statements(MIGRATION_FILE):
+        if not statement.startswith('INSERT INTO'):
+            continue
+        stage = TABLE_STAGES.get(statement_table(statement))
+        if stage is None:
+            continue
+        found.add(stage)
         
-        if result.returncode == 0:
-            print(f"✅ Chunk {chunk_number} imported successfully")
-            return True
+        if stage == 'users':
+            # Repack users into chunks that stay under the statement byte budget
+            header, rows, terminator = split_insert(statement)
+            statements = chunker.pack(header, enumerate(rows, 1), separator=',\n', terminator=terminator)
         else:
-            print(f"❌ Chunk {chunk_number} failed: {result.stderr}")
-            return False
+            statements = [statement]
+        
+        for statement_sql in statements:
+            chunk_file = f"/home/user/webapp/import_{stage}_chunk_{len(chunk_files) + 1}.sql"
+            with open(chunk_file, 'w') as f:
+                f.write(str(statement_sql))
             
-    except subprocess.TimeoutExpired:
-        print(f"⏰ Chunk {chunk_number} timed out")
-        return False
-    except Exception as e:
-        print(f"💥 Chunk {chunk_number} error: {e}")
-        return False
-
-def create_import_chunks():
-    """
-    Read the full migration file and create smaller chunks.
-    """
-    
-    # Read the complete migration
-    with open("/home/user/webapp/migrations/0014_import_complete_kwikr_dataset.sql", 'r') as f:
-        content = f.read()
-    
-    # Find the users INSERT statement
-    lines = content.split('\n')
-    users_start_idx = None
-    profiles_start_idx = None
-    services_start_idx = None
-    
-    for i, line in enumerate(lines):
-        if "INSERT INTO users" in line:
-            users_start_idx = i
-        elif "INSERT INTO user_profiles" in line:
-            profiles_start_idx = i
-        elif "INSERT INTO worker_services" in line:
-            services_start_idx = i
+            chunk_files.append(chunk_file)
+            if stage == 'users':
+                print(f"Created users chunk {len(chunk_files)}: {len(statement_sql)} records")
     
-    if not all([users_start_idx, profiles_start_idx, services_start_idx]):
+    if found != set(TABLE_STAGES.values()):
         print("❌ Could not find INSERT statements in migration file")
         return False
     
-    # Extract users data (between users_start_idx and profiles_start_idx)
-    users_lines = lines[users_start_idx:profiles_start_idx-1]
-    
-    # Extract profiles data (between profiles_start_idx and services_start_idx) 
-    profiles_lines = lines[profiles_start_idx:services_start_idx-1]
-    
-    # Extract services data (from services_start_idx to end)
-    services_lines = lines[services_start_idx:]
-    
-    # Process users in chunks of 25
-    chunk_size = 25
-    users_header = users_lines[0]  # "INSERT INTO users (...) VALUES"
-    users_data_lines = users_lines[1:]  # The actual data rows
-    
-    chunk_files = []
-    
-    # Create user chunks
-    for i in range(0, len(users_data_lines), chunk_size):
-        chunk_num = i // chunk_size + 1
-        chunk_data = users_data_lines[i:i + chunk_size]
-        
-        # Fix the last line to end with semicolon instead of comma
-        if chunk_data:
-            last_line = chunk_data[-1].rstrip(',') + ';'
-            chunk_data[-1] = last_line
-            
-        chunk_content = [users_header] + chunk_data
-        
-        chunk_file = f"/home/user/webapp/import_users_chunk_{chunk_num}.sql"
-        with open(chunk_file, 'w') as f:
-            f.write('\n'.join(chunk_content))
-        
-        chunk_files.append(chunk_file)
-        print(f"Created users chunk {chunk_num}: {len(chunk_data)} records")
-    
-    # Create profiles chunk
-    profiles_header = profiles_lines[0]
-    profiles_data_lines = profiles_lines[1:]
-    if profiles_data_lines:
-        last_line = profiles_data_lines[-1].rstrip(',') + ';'
-        profiles_data_lines[-1] = last_line
-    
-    profiles_chunk_file = "/home/user/webapp/import_profiles_chunk.sql"
-    with open(profiles_chunk_file, 'w') as f:
-        f.write('\n'.join([profiles_header] + profiles_data_lines))
-    chunk_files.append(profiles_chunk_file)
-    
-    # Create services chunk
-    services_data_lines = []
-    for line in services_lines:
-        if line.strip():
-            services_data_lines.append(line)
-    
-    if services_data_lines:
-        last_line = services_data_lines[-1].rstrip(',') + ';'
-        services_data_lines[-1] = last_line
-    
-    services_chunk_file = "/home/user/webapp/import_services_chunk.sql"
-    with open(services_chunk_file, 'w') as f:
-        f.write('\n'.join(services_data_lines))
-    chunk_files.append(services_chunk_file)
-    
     return chunk_files
 
-def main():
+def read_chunk_files(labelled_files):
+    """(label, sql) for each (label, chunk file), read only when the dispatcher gets to it"""
+    for label, chunk_file in labelled_files:
+        with open(chunk_file, 'r', encoding='utf-8') as f:
+            yield label, f.read()
+
+def main(remote=False, concurrency=DEFAULT_CONCURRENCY, max_statement_bytes=DEFAULT_MAX_BYTES, restart=False):
     """
     Main import process.
     """
     print("🚀 Starting chunked import of complete Kwikr dataset...")
     
     # Create import chunks
-    chunk_files = create_import_chunks()
+    chunk_files = create_import_chunks(max_statement_bytes)
     if not chunk_files:
         print("❌ Failed to create import chunks")
         return
     
     total_chunks = len(chunk_files)
-    successful_imports = 0
     
-    # Import each chunk
+    # Users chunks first, then the profiles and services chunks that reference them
+    stage_files = {}
     for i, chunk_file in enumerate(chunk_files, 1):
-        if run_import_chunk(chunk_file, i, total_chunks):
-            successful_imports += 1
-        else:
-            print(f"⚠️ Chunk {i} failed, but continuing...")
+        name = os.path.basename(chunk_file).split('_')[1]
+        stage_files.setdefault(name, []).append((f"Chunk {i}/{total_chunks} ({chunk_file})", chunk_file))
+    stages = [(name, read_chunk_files(files)) for name, files in stage_files.items()]
+    
+    # Resume after the chunks an earlier run of the same migration committed
+    source_hash = cache_key(MIGRATION_FILE, str(max_statement_bytes))
+    
+    with open_executor(remote) as executor, open_journal(__file__, source_hash, remote, restart) as journal:
+        results = run_stages(executor, stages, concurrency=concurrency,
+                             dependencies=CHUNK_DEPENDENCIES, on_result=print_chunk_result, journal=journal)
+        successful_imports = sum(
+            result.returncode == 0 for stage_results in results.values() for result in stage_results or []
+        )
         
-        # Small delay between chunks
-        if i < total_chunks:
-            time.sleep(2)
-    
-    print(f"\n📊 Import Summary:")
-    print(f"Total chunks: {total_chunks}")
-    print(f"Successful imports: {successful_imports}")
-    print(f"Failed imports: {total_chunks - successful_imports}")
-    
-    # Verify final count
-    print("\n🔍 Verifying import...")
-    verify_cmd = ["npx", "wrangler", "d1", "execute", "kwikr-directory-production", "--local", "--command=SELECT COUNT(*) as total_users FROM users"]
-    
-    try:
-        result = subprocess.run(verify_cmd, cwd="/home/user/webapp", capture_output=True, text=True, timeout=30)
-        if result.returncode == 0:
-            print("✅ Final verification completed")
-            print(result.stdout)
-        else:
-            print("❌ Verification failed")
-    except Exception as e:
-        print(f"⚠️ Verification error: {e}")
+        print(f"\n📊 Import Summary:")
+        print(f"Total chunks: {total_chunks}")
+        print(f"Successful imports: {successful_imports}")
+        print(f"Failed imports: {total_chunks - successful_imports}")
+        
+        # Verify final count
+        print("\n🔍 Verifying import...")
+        
+        try:
+            result = executor.execute_command("SELECT COUNT(*) as total_users FROM users")
+            if result.returncode == 0:
+                print("✅ Final verification completed")
+                print(result.stdout)
+            else:
+                print("❌ Verification failed")
+        except Exception as e:
+            print(f"⚠️ Verification error: {e}")
     
     # Clean up chunk files
     for chunk_file in chunk_files:
@@ -178,4 +132,10 @@ def main():
     print("\n🎉 Import process completed!")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description=__doc__)
+    add_target_arguments(parser)
+    add_dispatch_arguments(parser)
+    add_chunk_arguments(parser)
+    add_journal_arguments(parser)
+    args = parser.parse_args()
+    main(args.remote, args.concurrency, args.max_statement_bytes, args.restart)
\ No newline at end of file
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Checkpoint journal for resumable chunked imports.
+
+A chunked import that dies at chunk 87 of 100 used to start over with
+`DELETE FROM users`. The journal is a small sqlite file that records, per
+script and target (local/remote), the hash of the input the chunks were
+built from and what has been committed. A re-run with the same input skips
+the clear step and everything committed, so it continues where the failed
+run stopped.
+
+Multi-row INSERTs are journaled by row key: the keys of the rows that
+landed, and the keys and errors of the rows the database rejected, so a
+resumed run neither depends on packing rows into the same chunks again nor
+counts rejected rows as landed. Plain SQL chunks are journaled by label.
+Chunks are committed out of order when several run concurrently, so the
+journal keeps sets rather than a single high-water mark. On the local
+database a stage is one transaction, so its chunks are journaled when the
+stage commits. A run that finishes without failures
+clears its entries, and a changed input hash discards them.
+"""
+
+import json
+import os
+import sqlite3
+
+JOURNAL_FILE = os.environ.get('KWIKR_IMPORT_JOURNAL', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'import_journal.sqlite'))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS import_checkpoints (
+    script TEXT NOT NULL,
+    target TEXT NOT NULL,
+    source_hash TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    chunk TEXT NOT NULL,
+    committed_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (script, target, source_hash, stage, chunk)
+);
+CREATE TABLE IF NOT EXISTS import_committed_rows (
+    script TEXT NOT NULL,
+    target TEXT NOT NULL,
+    source_hash TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    row_key TEXT NOT NULL,
+    PRIMARY KEY (script, target, source_hash, stage, row_key)
+);
+CREATE TABLE IF NOT EXISTS import_rejected_rows (
+    script TEXT NOT NULL,
+    target TEXT NOT NULL,
+    source_hash TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    row_key TEXT NOT NULL,
+    error TEXT NOT NULL,
+    PRIMARY KEY (script, target, source_hash, stage, row_key)
+);
+"""
+
+_TABLES = ('import_checkpoints', 'import_committed_rows', 'import_rejected_rows')
+
+
+def encode_key(key):
+    """Row key as stored in the journal"""
+    return json.dumps(key)
+
+
+def decode_key(text):
+    key = json.loads(text)
+    return tuple(key) if isinstance(key, list) else key
+
+
+class ImportJournal:
+    """Committed chunks and rows of one script's import of one input into one target."""
+
+    def __init__(self, script, source_hash, target='local', path=JOURNAL_FILE):
+        self.script = script
+        self.source_hash = source_hash
+        self.target = target
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+        with self.conn:
+            # Checkpoints for a different input no longer describe what is in the database
+            for table in _TABLES:
+                self.conn.execute(f"DELETE FROM {table} WHERE script = ? AND target = ? AND source_hash != ?",
+                                  (script, target, source_hash))
+        self._committed = set(self.conn.execute(
+            "SELECT stage, chunk FROM import_checkpoints WHERE script = ? AND target = ? AND source_hash = ?",
+            (script, target, source_hash)
+        ).fetchall())
+        self._landed = {}
+        for stage, row_key in self.conn.execute(
+            "SELECT stage, row_key FROM import_committed_rows WHERE script = ? AND target = ? AND source_hash = ?",
+            (script, target, source_hash)
+        ):
+            self._landed.setdefault(stage, set()).add(decode_key(row_key))
+        self._rejected = {}
+        for stage, row_key, error in self.conn.execute(
+            "SELECT stage, row_key, error FROM import_rejected_rows WHERE script = ? AND target = ? AND source_hash = ?",
+            (script, target, source_hash)
+        ):
+            self._rejected.setdefault(stage, {})[decode_key(row_key)] = error
+        self.resuming = bool(self._committed or self._landed or self._rejected)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def is_committed(self, stage, chunk):
+        return (stage, chunk) in self._committed
+
+    def landed(self, stage):
+        """Keys of the rows of a stage committed to the target"""
+        return self._landed.get(stage, set())
+
+    def rejected(self, stage):
+        """{row key: error} of the rows of a stage the target rejected"""
+        return self._rejected.get(stage, {})
+
+    def commit(self, stage, chunks=(), landed=(), rejected=()):
+        """Record plain chunks and landed row keys of a stage, with (row key, error) of the rows rejected"""
+        rows = [(self.script, self.target, self.source_hash, stage, chunk) for chunk in chunks]
+        landed_rows = [(self.script, self.target, self.source_hash, stage, encode_key(key)) for key in landed]
+        rejected_rows = [(self.script, self.target, self.source_hash, stage, encode_key(key), error)
+                         for key, error in rejected]
+        with self.conn:
+            self.conn.executemany("INSERT OR IGNORE INTO import_checkpoints (script, target, source_hash, stage, chunk) "
+                                  "VALUES (?, ?, ?, ?, ?)", rows)
+            self.conn.executemany("INSERT OR IGNORE INTO import_committed_rows "
+                                  "(script, target, source_hash, stage, row_key) VALUES (?, ?, ?, ?, ?)", landed_rows)
+            self.conn.executemany("INSERT OR REPLACE INTO import_rejected_rows "
+                                  "(script, target, source_hash, stage, row_key, error) VALUES (?, ?, ?, ?, ?, ?)",
+                                  rejected_rows)
+        self._committed.update((stage, chunk) for chunk in chunks)
+        self._landed.setdefault(stage, set()).update(landed)
+        self._rejected.setdefault(stage, {}).update(rejected)
+
+    def finish(self):
+        """Forget this import's checkpoints once every chunk has been committed"""
+        with self.conn:
+            for table in _TABLES:
+                self.conn.execute(f"DELETE FROM {table} WHERE script = ? AND target = ?", (self.script, self.target))
+        self._committed.clear()
+        self._landed.clear()
+        self._rejected.clear()
+        self.resuming = False
+
+    def print_status(self):
+        if self.resuming:
+            rows = sum(len(keys) for keys in self._landed.values())
+            print(f"⏩ Resuming {self.script}: {rows} rows and {len(self._committed)} chunks already committed "
+                  f"(journal {self.path})")
+
+
+def open_journal(script, source_hash, remote=False, restart=False, path=JOURNAL_FILE):
+    """Journal for a script run; restart discards any checkpoints and starts from scratch"""
+    journal = ImportJournal(os.path.basename(script), source_hash, 'remote' if remote else 'local', path)
+    if restart:
+        journal.finish()
+    journal.print_status()
+    return journal
+
+
+def add_journal_arguments(parser):
+    """Add the --restart flag for scripts that resume from the checkpoint journal"""
+    parser.add_argument('--restart', action='store_true',
+                        help='ignore the checkpoint journal and import everything again')
+
+
+if __name__ == "__main__":
+    import sys
+
+    if not os.path.exists(JOURNAL_FILE):
+        print(f"📒 No import journal at {JOURNAL_FILE}")
+        sys.exit(0)
+    conn = sqlite3.connect(JOURNAL_FILE)
+    if sys.argv[1:] == ['clear']:
+        with conn:
+            for table in _TABLES:
+                conn.execute(f"DELETE FROM {table}")
+        print(f"🧹 Cleared import journal: {JOURNAL_FILE}")
+    else:
+        print(f"📒 Import journal: {JOURNAL_FILE}")
+        for script, target, source_hash, stage, chunks, last in conn.execute(
+            "SELECT script, target, source_hash, stage, COUNT(*), MAX(committed_at) FROM import_checkpoints "
+            "GROUP BY script, target, source_hash, stage ORDER BY script, target, MIN(committed_at)"
+        ):
+            print(f"  {script} [{target}] {source_hash[:16]}…  {stage}: {chunks} chunks, last at {last}")
+        for script, target, source_hash, stage, rows in conn.execute(
+            "SELECT script, target, source_hash, stage, COUNT(*) FROM import_committed_rows "
+            "GROUP BY script, target, source_hash, stage ORDER BY script, target"
+        ):
+            print(f"  {script} [{target}] {source_hash[:16]}…  {stage}: {rows} rows")
+    conn.close()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Streaming readers for Kwikr partner exports.
+
+iter_record_batches() yields fixed-size DataFrame batches from .xlsx, .csv
+or legacy .xls files without loading the whole sheet, so peak memory stays
+flat however large the export grows. Batches keep a global row index, so
+code that derives ids from the row index sees the same numbers it would
+with pd.read_excel/pd.read_csv.
+
+Excel files are parsed through the content-addressed parse cache, so a
+workbook that has been read once is served from the cache afterwards.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from parse_cache import cache_key, cached_batches
+
+DEFAULT_BATCH_ROWS = 1000
+
+# Batch size used when parsing into the cache; reads are regrouped to the caller's batch size
+CACHE_PART_ROWS = 5000
+
+
+def _frame(rows, columns, start):
+    """Build a batch DataFrame with a global RangeIndex and NaN for missing cells"""
+    frame = pd.DataFrame.from_records(rows, columns=columns)
+    frame.index = pd.RangeIndex(start, start + len(rows))
+    return frame.replace({None: np.nan}).infer_objects()
+
+
+def _convert_cell(value):
+    # Match pd.read_excel, which turns integral floats back into ints
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def _iter_sheet_batches(rows, batch_rows):
+    """Group an iterator of raw sheet rows (header first) into DataFrame batches"""
+    header = None
+    batch = []
+    start = 0
+    for raw in rows:
+        if header is None:
+            header = [str(name) if name is not None else f"Unnamed: {i}" for i, name in enumerate(raw)]
+            width = len(header)
+            continue
+
+        # Read-only sheets can return ragged rows; pad/trim them to the header
+        row = tuple(_convert_cell(value) for value in raw[:width])
+        row += (None,) * (width - len(row))
+        if all(value is None or value == '' for value in row):
+            continue
+
+        batch.append(row)
+        if len(batch) == batch_rows:
+            yield _frame(batch, header, start)
+            start += len(batch)
+            batch = []
+
+    if batch:
+        yield _frame(batch, header, start)
+
+
+def _iter_xlsx_rows(path, sheet_name):
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        sheet = workbook[sheet_name] if sheet_name else workbook.worksheets[0]
+        yield from sheet.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def _iter_xls_rows(path, sheet_name):
+    # Legacy BIFF files are only readable through xlrd
+    import xlrd
+
+    book = xlrd.open_workbook(path, on_demand=True)
+    try:
+        sheet = book.sheet_by_name(sheet_name) if sheet_name else book.sheet_by_index(0)
+        for index in range(sheet.nrows):
+            yield tuple(value if value != '' else None for value in sheet.row_values(index))
+    finally:
+        book.release_resources()
+
+
+def iter_record_batches(path, batch_rows=DEFAULT_BATCH_ROWS, sheet_name=None, use_cache=True):
+    """
+    Yield DataFrame batches of at most batch_rows rows from an export file.
+
+    .xlsx/.xlsm are streamed with openpyxl read_only mode, .csv with chunked
+    pd.read_csv, and legacy .xls through xlrd. Excel parses go through the
+    parse cache unless use_cache is False.
+    """
+    extension = os.path.splitext(path)[1].lower()
+
+    if extension == '.csv':
+        yield from pd.read_csv(path, chunksize=batch_rows)
+        return
+
+    if extension in ('.xlsx', '.xlsm'):
+        read_rows = _iter_xlsx_rows
+    elif extension == '.xls':
+        read_rows = _iter_xls_rows
+    else:
+        raise ValueError(f"Unsupported export format: {path}")
+
+    if not use_cache:
+        yield from _iter_sheet_batches(read_rows(path, sheet_name), batch_rows)
+        return
+
+    def parse():
+        return _iter_sheet_batches(read_rows(path, sheet_name), CACHE_PART_ROWS)
+
+    yield from rebatch(cached_batches(cache_key(path, sheet_name or ''), parse), batch_rows)
+
+
+def read_records(path, sheet_name=None):
+    """Read a whole export into one DataFrame (served from the parse cache for Excel files)"""
+    batches = list(iter_record_batches(path, CACHE_PART_ROWS, sheet_name))
+    return pd.concat(batches) if batches else pd.DataFrame()
+
+
+def rebatch(batches, batch_rows):
+    """Regroup an iterator of (possibly filtered) DataFrames into batches of exactly batch_rows"""
+    pending = []
+    pending_rows = 0
+    for frame in batches:
+        while len(frame):
+            take = min(batch_rows - pending_rows, len(frame))
+            pending.append(frame.iloc[:take])
+            pending_rows += take
+            frame = frame.iloc[take:]
+            if pending_rows == batch_rows:
+                yield pd.concat(pending)
+                pending = []
+                pending_rows = 0
+    if pending:
+        yield pd.concat(pending)
+
+
+def limit_records(batches, max_rows):
+    """Stop an iterator of DataFrames after max_rows rows in total"""
+    remaining = max_rows
+    for frame in batches:
+        if remaining <= 0:
+            return
+        if len(frame) > remaining:
+            frame = frame.iloc[:remaining]
+        remaining -= len(frame)
+        yield frame
+
+
+def count_records(path, batch_rows=DEFAULT_BATCH_ROWS, predicate=None):
+    """Count data rows (optionally only those matching predicate) with one streaming pass"""
+    total = 0
+    for frame in iter_record_batches(path, batch_rows):
+        total += int(predicate(frame).sum()) if predicate else len(frame)
+    return total
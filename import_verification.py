@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+One-round-trip verification of an imported worker directory.
+
+The importers used to verify by running one COUNT(*) per table through the
+executor and printing wrangler's raw output, which on --remote meant a
+wrangler process per query and nothing to compare against. The report here
+is a single SELECT that builds a JSON document inside the database: row
+counts, profiles and services whose user_id is not in users, the province
+and service category distributions, and a checksum per table.
+
+The checksum is order-independent (a sum over per-row hashes), so it can
+be recomputed from the rows the importer generated from the source
+DataFrame: source_report() replays those rows into an in-memory sqlite
+database and runs the same query there, so both sides read the values
+exactly as SQLite parsed them. Matching counts and checksums prove the
+import is complete, not just that the tables are non-empty.
+
+SQLite has no hash function, so each row is hashed in SQL by a recursive
+CTE that walks the row's own text, folding a block of characters at a time
+into a polynomial rolling hash. The work is linear in the row's length and
+covers every character, so free-text columns are checked in full.
+"""
+
+import json
+import re
+import sqlite3
+
+# Expressions hashed per table; each is cast to text, so numbers are formatted to compare across column types
+CHECKSUM_COLUMNS = {
+    'users': ('id', 'email', 'first_name', 'last_name', 'phone', 'province', 'city'),
+    'user_profiles': ('user_id', 'company_name', 'company_description', 'profile_image_url',
+                      'address_line1', 'postal_code', 'website_url'),
+    'worker_services': ('user_id', 'service_name', 'service_category', 'service_area',
+                        "printf('%.2f', hourly_rate)"),
+}
+
+# Child tables whose user_id must exist in users
+ORPHAN_TABLES = ('user_profiles', 'worker_services')
+
+_MODULUS = 1000000007
+
+# Characters folded into the rolling hash per recursion step
+_BLOCK = 16
+
+
+def _row_text(columns):
+    return " || char(31) || ".join(f"COALESCE(CAST({column} AS TEXT), '')" for column in columns)
+
+
+def _block_hash():
+    # Characters of the block weighted by position; past the end of the text unicode() is NULL
+    return ' + '.join(f"COALESCE(unicode(substr(rest, {k}, 1)), 0) * {k * 7919 % 1000003}"
+                      for k in range(1, _BLOCK + 1))
+
+
+def _walk_cte(table, columns):
+    # One row per step of each row's walk over its text; hash is final once rest is empty
+    return (f"{table}_checksum_walk(rest, hash) AS ("
+            f"SELECT text, length(text) % {_MODULUS} FROM (SELECT {_row_text(columns)} AS text FROM {table}) "
+            f"UNION ALL SELECT substr(rest, {_BLOCK + 1}), (hash * 1009 + {_block_hash()}) % {_MODULUS} "
+            f"FROM {table}_checksum_walk WHERE rest <> '')")
+
+
+def _checksum(table):
+    # Row hashes are squared so the sum is not linear in them
+    return (f"SELECT COALESCE(SUM(hash * hash % {_MODULUS}), 0) FROM {table}_checksum_walk "
+            f"WHERE rest = ''")
+
+
+def report_sql(checksum_columns=CHECKSUM_COLUMNS, orphan_tables=ORPHAN_TABLES):
+    """SELECT returning one row whose report column is the verification report as JSON"""
+    tables = list(checksum_columns)
+    walks = [_walk_cte(table, columns) for table, columns in checksum_columns.items()]
+
+    def pairs(items):
+        return ', '.join(f"'{key}', {value}" for key, value in items)
+
+    counts = pairs((table, f"(SELECT COUNT(*) FROM {table})") for table in tables)
+    orphans = pairs((table, f"(SELECT COUNT(*) FROM {table} WHERE user_id NOT IN (SELECT id FROM users))")
+                    for table in orphan_tables)
+    checksums = pairs((table, f"({_checksum(table)})") for table in tables)
+    return (
+        f"WITH RECURSIVE {', '.join(walks)} "
+        f"SELECT json_object("
+        f"'counts', json_object({counts}), "
+        f"'orphans', json_object({orphans}), "
+        f"'provinces', json((SELECT json_group_object(province, count) FROM "
+        f"(SELECT COALESCE(province, '') AS province, COUNT(*) AS count FROM users GROUP BY 1))), "
+        f"'categories', json((SELECT json_group_object(category, count) FROM "
+        f"(SELECT COALESCE(service_category, '') AS category, COUNT(*) AS count FROM worker_services GROUP BY 1))), "
+        f"'checksums', json_object({checksums})"
+        f") AS report"
+    )
+
+
+def fetch_report(executor):
+    """The verification report of the database behind executor, from one query"""
+    return json.loads(executor.query(report_sql())[0]['report'])
+
+
+_INSERT_HEADER = re.compile(r'^\s*INSERT(?:\s+OR\s+\w+)?\s+INTO\s+(\w+)\s*\(([^)]*)\)', re.IGNORECASE)
+
+
+def source_report(inserts):
+    """
+    The verification report of the rows an import writes.
+
+    inserts is a list of (INSERT ... VALUES header, (key, values_sql) rows)
+    as the importers' row generators produce them from the DataFrame. The
+    rows are replayed into in-memory tables without constraints, so the
+    report covers every generated row, including any the target rejects.
+    """
+    conn = sqlite3.connect(':memory:')
+    try:
+        for header, rows in inserts:
+            table, columns = _INSERT_HEADER.match(header).groups()
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {table} ({columns})")
+            insert = re.sub(r'^\s*INSERT(?:\s+OR\s+\w+)?', 'INSERT', header, flags=re.IGNORECASE)
+            for _, values in rows:
+                conn.execute(insert + values)
+        return json.loads(conn.execute(report_sql()).fetchone()[0])
+    finally:
+        conn.close()
+
+
+def print_report(report):
+    print("📋 Row counts: " + ', '.join(f"{table} {count}" for table, count in report['counts'].items()))
+    orphans = {table: count for table, count in report['orphans'].items() if count}
+    if orphans:
+        print("⚠️ Orphan rows (user_id not in users): " + ', '.join(f"{table} {count}" for table, count in orphans.items()))
+    else:
+        print("✅ No orphan profiles or services")
+    print("🗺️ Provinces: " + ', '.join(f"{province or '?'} {count}" for province, count in
+                                      sorted(report['provinces'].items(), key=lambda item: -item[1])))
+    print("🔧 Categories: " + ', '.join(f"{category or '?'} {count}" for category, count in
+                                       sorted(report['categories'].items(), key=lambda item: -item[1])))
+
+
+def compare_reports(report, expected):
+    """Tables whose count or checksum differs from expected, as {table: description}"""
+    differences = {}
+    for table, count in expected['counts'].items():
+        actual = report['counts'].get(table)
+        matches = report['checksums'].get(table) == expected['checksums'][table]
+        if actual != count:
+            checksum = "checksum matches" if matches else "checksum differs"
+            differences[table] = f"{actual} rows, expected {count} ({checksum})"
+        elif not matches:
+            differences[table] = f"{count} rows, but their contents differ from the source"
+    return differences
+
+
+def verify_import(executor, expected=None):
+    """
+    Print the report of the database and compare it with the expected (source) report.
+
+    Returns the report, and whether it matched expected (None without one).
+    """
+    print("\n🔍 Verifying import...")
+    report = fetch_report(executor)
+    print_report(report)
+    if expected is None:
+        return report, None
+
+    differences = compare_reports(report, expected)
+    for table, difference in differences.items():
+        print(f"❌ {table}: {difference}")
+    if not differences:
+        print("✅ Every table matches the source rows (counts and checksums)")
+    return report, not differences
@@ -1,50 +1,36 @@
 #!/usr/bin/env python3
 
+import numpy as np
 import pandas as pd
 import sqlite3
 import json
 import re
-import hashlib
-import secrets
 from datetime import datetime
 
+from bulk_loader import (DEFAULT_BATCH_SIZE, add_bulk_mode_arguments, build_column_batches, bulk_load, bulk_load_mode,
+                         find_existing_emails, print_throughput)
+from company_names import CompanyNameExtractor
+from import_columns import categorical_lookup, clean_html_column
+from import_credentials import add_credential_arguments, provision_credentials
+from keyword_classifier import KeywordClassifier
+
 def clean_html(text):
     """Remove HTML tags from text"""
-    if pd.isna(text):
-        return ""
-    # Remove HTML tags
-    clean = re.sub('<[^<]+?>', '', str(text))
-    # Replace HTML entities
-    clean = clean.replace('&nbsp;', ' ')
-    clean = clean.replace('&amp;', '&')
-    clean = clean.replace('&lt;', '<')
-    clean = clean.replace('&gt;', '>')
-    # Clean up extra whitespace
-    clean = ' '.join(clean.split())
-    return clean.strip()
+    return clean_html_column([text])[0]
 
-def extract_name_from_company(company_name):
-    """Extract first and last name from company name"""
-    if pd.isna(company_name):
-        return "Unknown", "Business"
-    
-    company = str(company_name).strip()
-    
-    # Common patterns for extracting personal names from business names
-    patterns = [
-        r'^([A-Z][a-z]+)\s+([A-Z][a-z]+)(?:\s+.*)?$',  # "John Smith Plumbing"
-        r'^([A-Z][a-z]+)(?:\s+&\s+([A-Z]))?.*$',  # "Smith & B Plumbing" -> "Smith", "B"
-        r'^([A-Z])\s*&\s*([A-Z])\s+.*$',  # "R & B Plumbing" -> "R", "B"
-    ]
-    
-    for pattern in patterns:
-        match = re.match(pattern, company)
-        if match:
-            return match.group(1), match.group(2) if match.group(2) else "Business"
-    
-    # If no pattern matches, use company name as last name
-    # Remove common business suffixes
-    clean_company = re.sub(r'\b(Ltd\.?|Inc\.?|Corp\.?|LLC|Plumbing|Heating|Services?|Systems?)\b', '', company, flags=re.IGNORECASE)
+# Common patterns for extracting personal names from business names
+NAME_PATTERNS = [
+    r'^([A-Z][a-z]+)\s+([A-Z][a-z]+)(?:\s+.*)?$',  # "John Smith Plumbing"
+    r'^([A-Z][a-z]+)(?:\s+&\s+([A-Z]))?.*$',  # "Smith & B Plumbing" -> "Smith", "B"
+    r'^([A-Z])\s*&\s*([A-Z])\s+.*$',  # "R & B Plumbing" -> "R", "B"
+]
+
+# Common business suffixes removed before falling back to the company name
+BUSINESS_SUFFIXES = re.compile(r'\b(Ltd\.?|Inc\.?|Corp\.?|LLC|Plumbing|Heating|Services?|Systems?)\b', re.IGNORECASE)
+
+def company_name_fallback(company):
+    """Use the company name as the name when no pattern matches"""
+    clean_company = BUSINESS_SUFFIXES.sub('', company)
     clean_company = clean_company.strip()
     
     if clean_company:
@@ -56,62 +42,117 @@ def extract_name_from_company(company_name):
     
     return "Business", "Owner"
 
+NAME_EXTRACTOR = CompanyNameExtractor(NAME_PATTERNS, company_name_fallback, missing=("Unknown", "Business"))
+
+def extract_name_from_company(company_name):
+    """Extract first and last name from company name"""
+    return NAME_EXTRACTOR.extract(company_name)
+
+# Service mapping based on keywords
+SERVICE_MAP = {
+    'plumbing': ['plumb', 'drain', 'sewer', 'water line', 'faucet', 'toilet', 'pipe'],
+    'hvac': ['heating', 'hvac', 'air conditioning', 'furnace', 'cooling', 'ventilation'],
+    'electrical': ['electric', 'electrical', 'wiring', 'lighting'],
+    'general contracting': ['renovation', 'construction', 'contracting', 'building'],
+    'mechanical': ['mechanical', 'industrial']
+}
+
+SERVICE_CLASSIFIER = KeywordClassifier(SERVICE_MAP.items())
+
+def service_text(services, profession_name, company_name, about_me):
+    """Text that service categorization looks at"""
+    return f"{services} {profession_name} {company_name} {about_me}".lower()
+
 def determine_service_category(services, profession_name, company_name, about_me):
     """Determine primary service category"""
-    text_to_analyze = f"{services} {profession_name} {company_name} {about_me}".lower()
-    
-    # Service mapping based on keywords
-    service_map = {
-        'plumbing': ['plumb', 'drain', 'sewer', 'water line', 'faucet', 'toilet', 'pipe'],
-        'hvac': ['heating', 'hvac', 'air conditioning', 'furnace', 'cooling', 'ventilation'],
-        'electrical': ['electric', 'electrical', 'wiring', 'lighting'],
-        'general contracting': ['renovation', 'construction', 'contracting', 'building'],
-        'mechanical': ['mechanical', 'industrial']
-    }
-    
-    scores = {}
-    for category, keywords in service_map.items():
-        scores[category] = sum(1 for keyword in keywords if keyword in text_to_analyze)
-    
     # Return the category with the highest score, default to plumbing
-    return max(scores, key=scores.get) if max(scores.values()) > 0 else 'plumbing'
+    return SERVICE_CLASSIFIER.best(service_text(services, profession_name, company_name, about_me), 'plumbing')
+
+def determine_service_categories(services, profession_names, company_names, about_mes):
+    """Determine primary service categories for whole columns at once"""
+    columns = (pd.Series(column).tolist() for column in (services, profession_names, company_names, about_mes))
+    texts = [service_text(*values) for values in zip(*columns)]
+    return SERVICE_CLASSIFIER.best_batch(texts, 'plumbing')
+
+BASE_RATES = {
+    'plumbing': 85,
+    'hvac': 95,
+    'electrical': 90,
+    'general contracting': 75,
+    'mechanical': 100
+}
+
+PROVINCE_MULTIPLIER = {
+    'BC': 1.15,  # Higher cost areas
+    'ON': 1.10,
+    'AB': 1.05,
+    'QC': 0.95,
+    'SK': 0.90,
+    'MB': 0.90,
+    'NB': 0.85
+}
+
+SUBSCRIPTION_MULTIPLIER = {
+    'Enhanced Visibility - Gold Plan': 1.2,
+    'Basic Plan': 1.0
+}
+
+def calculate_hourly_rates(subscription_names, provinces, service_categories):
+    """Calculate estimated hourly rates for whole columns based on subscription and location"""
+    base_rate = categorical_lookup(service_categories, BASE_RATES, 85)
+    prov_mult = categorical_lookup(provinces, PROVINCE_MULTIPLIER, 1.0)
+    sub_mult = categorical_lookup(subscription_names, SUBSCRIPTION_MULTIPLIER, 1.0)
+    
+    return np.round(base_rate * prov_mult * sub_mult, 2).tolist()
 
 def calculate_hourly_rate(subscription_name, province, service_category):
     """Calculate estimated hourly rate based on subscription and location"""
-    base_rates = {
-        'plumbing': 85,
-        'hvac': 95,
-        'electrical': 90,
-        'general contracting': 75,
-        'mechanical': 100
-    }
+    return calculate_hourly_rates([subscription_name], [province], [service_category])[0]
+
+def build_worker_record(row, password_hash, service_category, hourly_rate, bio, search_desc, name):
+    """Transform one CSV row into per-table column values for the bulk loader"""
+    first_name, last_name = name
     
-    province_multiplier = {
-        'BC': 1.15,  # Higher cost areas
-        'ON': 1.10,
-        'AB': 1.05,
-        'QC': 0.95,
-        'SK': 0.90,
-        'MB': 0.90,
-        'NB': 0.85
+    service_descriptions = {
+        'plumbing': f"{service_category.title()} services including installation, repair, and maintenance",
+        'hvac': f"Heating, ventilation, and air conditioning services",
+        'electrical': f"Electrical installation and repair services",
+        'general contracting': f"General contracting and renovation services",
+        'mechanical': f"Mechanical systems and industrial services"
     }
     
-    subscription_multiplier = {
-        'Enhanced Visibility - Gold Plan': 1.2,
-        'Basic Plan': 1.0
+    return {
+        'users': {
+            'email': row['email'], 'password_hash': password_hash, 'password_salt': 'salt',
+            'role': 'worker', 'first_name': first_name, 'last_name': last_name,
+            'province': row['state_code'], 'city': row['city'],
+            'is_verified': int(row['verified']), 'is_active': int(row['active']),
+            'created_at': datetime.now().isoformat()
+        },
+        'user_profiles': {
+            'bio': bio, 'company_name': row['company'], 'company_description': search_desc,
+            'website_url': row['website'], 'address_line1': row['address1'],
+            'postal_code': row['zip_code'], 'profile_image_url': row.get('profile_photo')
+        },
+        'worker_services': {
+            'service_category': service_category.title(),
+            'service_name': f"{service_category.title()} Services",
+            'description': service_descriptions.get(service_category, f"{service_category.title()} services"),
+            'hourly_rate': hourly_rate, 'is_available': 1,
+            'service_area': f"{row['city']}, {row['state_code']}", 'years_experience': 5
+        },
+        'worker_service_areas': {'area_name': row['city'], 'is_active': 1},
+        # Partial compliance for realism - 40% is realistic for new imports
+        'worker_compliance_summary': {
+            'province': row['state_code'], 'primary_trade': service_category.title(),
+            'overall_compliance_status': 'partial', 'compliance_percentage': 40.0,
+            'total_requirements': 5, 'compliant_requirements': 2,
+            'pending_requirements': 3, 'expired_requirements': 0
+        },
     }
-    
-    base_rate = base_rates.get(service_category, 85)
-    prov_mult = province_multiplier.get(province, 1.0)
-    sub_mult = subscription_multiplier.get(subscription_name, 1.0)
-    
-    return round(base_rate * prov_mult * sub_mult, 2)
-
-def generate_secure_password():
-    """Generate a secure random password"""
-    return secrets.token_urlsafe(16)
 
-def import_workers_to_db(csv_file, db_file):
+def import_workers_to_db(csv_file, db_file, batch_size=DEFAULT_BATCH_SIZE, id_strategy='preassigned',
+                          credential_mode='hashed', bulk_mode=False):
     """Import workers from CSV to SQLite database"""
     
     # Read CSV data
@@ -121,7 +162,6 @@ def import_workers_to_db(csv_file, db_file):
     
     # Connect to database
     conn = sqlite3.connect(db_file)
-    cursor = conn.cursor()
     
     # Track statistics
     stats = {
@@ -131,106 +171,72 @@ def import_workers_to_db(csv_file, db_file):
         'errors': 0
     }
     
+    # Duplicate detection for the whole file in one query
+    existing_emails = find_existing_emails(conn, df['email'].dropna().astype(str).unique())
+    
+    # Classify every row's service category in one batch
+    service_categories = determine_service_categories(
+        df['services'], df['profession_name'], df['company'], df['about_me']
+    )
+    hourly_rates = calculate_hourly_rates(df['subscription_name'], df['state_code'], service_categories)
+    
+    # Clean the HTML profile text for the whole file, truncated to the profile column limits
+    bios = clean_html_column(df['about_me'], max_length=1000)
+    search_descs = clean_html_column(df.get('search_description', pd.Series('', index=df.index)), max_length=500)
+    names = NAME_EXTRACTOR.extract_batch(df['company'])
+    
+    # Transform stage: build column values for every row before touching the DB
+    records = []
+    record_rows = []
+    seen_emails = set()
     for index, row in df.iterrows():
         try:
             print(f"Processing {index + 1}/{len(df)}: {row['company']}")
             
-            # Skip if email already exists
-            cursor.execute("SELECT id FROM users WHERE email = ?", (row['email'],))
-            if cursor.fetchone():
+            # Skip if email already exists (in the DB or earlier in this file)
+            if row['email'] in existing_emails or row['email'] in seen_emails:
                 print(f"  Skipping - email {row['email']} already exists")
                 stats['skipped'] += 1
                 continue
             
-            # Extract and prepare data
-            first_name, last_name = extract_name_from_company(row['company'])
-            service_category = determine_service_category(
-                row['services'], row['profession_name'], row['company'], row['about_me']
-            )
-            hourly_rate = calculate_hourly_rate(row['subscription_name'], row['state_code'], service_category)
-            
-            # Clean data
-            bio = clean_html(row['about_me'])
-            search_desc = clean_html(row.get('search_description', ''))
-            
-            # Generate password
-            password = generate_secure_password()
-            password_hash = hashlib.pbkdf2_hmac('sha256', password.encode(), b'salt', 100000).hex()
-            
-            # Insert user
-            cursor.execute("""
-                INSERT INTO users (
-                    email, password_hash, password_salt, role, first_name, last_name, 
-                    province, city, is_verified, is_active, created_at
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                row['email'], password_hash, 'salt', 'worker', first_name, last_name,
-                row['state_code'], row['city'], int(row['verified']), int(row['active']),
-                datetime.now().isoformat()
-            ))
-            
-            user_id = cursor.lastrowid
-            
-            # Insert user profile
-            cursor.execute("""
-                INSERT INTO user_profiles (
-                    user_id, bio, company_name, company_description, website_url, 
-                    address_line1, postal_code, profile_image_url
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                user_id, bio[:1000], row['company'], search_desc[:500], row['website'],
-                row['address1'], row['zip_code'], row.get('profile_photo')
+            records.append(build_worker_record(
+                row, None, service_categories[index], hourly_rates[index], bios[index], search_descs[index],
+                names[index]
             ))
-            
-            # Insert worker services
-            service_descriptions = {
-                'plumbing': f"{service_category.title()} services including installation, repair, and maintenance",
-                'hvac': f"Heating, ventilation, and air conditioning services",
-                'electrical': f"Electrical installation and repair services",
-                'general contracting': f"General contracting and renovation services",
-                'mechanical': f"Mechanical systems and industrial services"
-            }
-            
-            cursor.execute("""
-                INSERT INTO worker_services (
-                    user_id, service_category, service_name, description, 
-                    hourly_rate, is_available, service_area, years_experience
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                user_id, service_category.title(), f"{service_category.title()} Services",
-                service_descriptions.get(service_category, f"{service_category.title()} services"),
-                hourly_rate, 1, f"{row['city']}, {row['state_code']}", 5
-            ))
-            
-            # Insert service area
-            cursor.execute("""
-                INSERT INTO worker_service_areas (user_id, area_name, is_active)
-                VALUES (?, ?, ?)
-            """, (user_id, row['city'], 1))
-            
-            # Create compliance summary (partial compliance for realism)
-            cursor.execute("""
-                INSERT INTO worker_compliance_summary (
-                    user_id, province, primary_trade, overall_compliance_status,
-                    compliance_percentage, total_requirements, compliant_requirements,
-                    pending_requirements, expired_requirements
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                user_id, row['state_code'], service_category.title(), 'partial',
-                40.0, 5, 2, 3, 0  # 40% compliance - realistic for new imports
-            ))
-            
-            stats['imported'] += 1
-            print(f"  ✅ Imported: {first_name} {last_name} ({row['company']}) - {service_category.title()} in {row['city']}, {row['state_code']}")
+            record_rows.append(row)
+            seen_emails.add(row['email'])
             
         except Exception as e:
             stats['errors'] += 1
             print(f"  ❌ Error importing {row.get('company', 'Unknown')}: {e}")
     
-    # Commit changes
-    conn.commit()
+    # Credential stage: hash passwords across all cores, or defer to invite tokens
+    provision_credentials(records, mode=credential_mode)
+    
+    # Load stage: one transaction, executemany per table (optionally with deferred index builds)
+    batches = build_column_batches(records)
+    with bulk_load_mode(conn, enabled=bulk_mode):
+        user_ids, load_errors, timings = bulk_load(conn, batches, batch_size=batch_size, id_strategy=id_strategy)
     conn.close()
     
+    failed = set()
+    for position, table, e in load_errors:
+        row = record_rows[position]
+        print(f"  ❌ Error importing {row.get('company', 'Unknown')} ({table}): {e}")
+        failed.add(position)
+    stats['errors'] += len(failed)
+    
+    for position, record in enumerate(records):
+        if position in failed:
+            continue
+        user = record['users']
+        service = record['worker_services']
+        stats['imported'] += 1
+        print(f"  ✅ Imported: {user['first_name']} {user['last_name']} ({record['user_profiles']['company_name']}) - {service['service_category']} in {user['city']}, {user['province']}")
+    
+    print_throughput(timings)
+    NAME_EXTRACTOR.print_cache_stats()
+    
     # Print statistics
     print("\n=== IMPORT STATISTICS ===")
     print(f"Total workers processed: {stats['total']}")
@@ -240,4 +246,11 @@ def import_workers_to_db(csv_file, db_file):
     print(f"Success rate: {stats['imported']/stats['total']*100:.1f}%")
 
 if __name__ == "__main__":
-    import_workers_to_db("kwikr_sample.csv", ".wrangler/state/v3/d1/miniflare-D1DatabaseObject/a31fcc237b8df81a82a97d8eeaf66c7474deb533ac08d408898123bbd56ffee7.sqlite")
\ No newline at end of file
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Import workers from kwikr_sample.csv into the local D1 database")
+    add_bulk_mode_arguments(parser)
+    add_credential_arguments(parser)
+    args = parser.parse_args()
+    import_workers_to_db("kwikr_sample.csv", ".wrangler/state/v3/d1/miniflare-D1DatabaseObject/a31fcc237b8df81a82a97d8eeaf66c7474deb533ac08d408898123bbd56ffee7.sqlite",
+                         credential_mode=args.credentials, bulk_mode=args.bulk_mode)
\ No newline at end of file
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Snapshots of generated dataset migrations, for compact delta migrations.
+
+The full dataset migration rewrites every business, so each data refresh
+ships megabytes of SQL to remote D1. After a migration has been applied,
+the hash of every generated VALUES row is saved per table and row id,
+together with the user id each source row (by Kwikr user_id) was given. The
+next refresh keeps those ids, compares its rows with the snapshot and only
+emits SQL for rows that are new, changed or gone; unchanged rows cost
+nothing, and removing or reordering rows in the export does not renumber
+the rest. Local and remote D1 are refreshed independently, so each target
+has its own snapshot: a delta for production is diffed against what was
+last applied to production.
+
+Deltas are written to .cache/dataset_deltas, one file per target that each
+run overwrites, not to migrations/. They are applied only by the importer,
+to the target they were diffed against; in migrations/ they would never be
+recorded in d1_migrations, so `wrangler d1 migrations apply` would replay
+them later, on either database, over whatever changed since.
+"""
+
+import hashlib
+import json
+import os
+
+SNAPSHOT_DIR = '/home/user/webapp'
+DELTA_DIR = os.environ.get('KWIKR_DATASET_DELTAS', os.path.join(SNAPSHOT_DIR, '.cache', 'dataset_deltas'))
+
+
+def values_hash(values):
+    """Short SHA-256 of one generated VALUES row"""
+    return hashlib.sha256(values.encode('utf-8')).hexdigest()[:20]
+
+
+def snapshot_file(remote=False, snapshot_dir=SNAPSHOT_DIR):
+    """Snapshot path of the local or remote database"""
+    return os.path.join(snapshot_dir, f"kwikr_dataset_snapshot.{'remote' if remote else 'local'}.json")
+
+
+def load_snapshot(path):
+    """(migration name, {source key: id}, {table: {id: hash}}) of the last applied migration, or (None, {}, {})"""
+    if not os.path.exists(path):
+        return None, {}, {}
+    with open(path, 'r', encoding='utf-8') as f:
+        snapshot = json.load(f)
+    tables = {table: {int(row_id): row_hash for row_id, row_hash in rows.items()}
+              for table, rows in snapshot['tables'].items()}
+    return snapshot['migration'], snapshot['ids'], tables
+
+
+def save_snapshot(migration_file, ids, tables, path):
+    """Record {source key: id} and {table: {id: values_sql}} as applied by migration_file"""
+    snapshot = {
+        'migration': os.path.basename(migration_file),
+        'ids': ids,
+        'tables': {table: {str(row_id): values_hash(values) for row_id, values in rows.items()}
+                   for table, rows in tables.items()},
+    }
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(snapshot, f)
+    os.replace(temp_path, path)
+
+
+def assign_ids(keys, previous_ids):
+    """{index: id} for {index: source key}: snapshot ids for known keys, new ids above them for the rest"""
+    next_id = max(previous_ids.values(), default=0) + 1
+    ids = {}
+    for index, key in keys.items():
+        if key in previous_ids:
+            ids[index] = previous_ids[key]
+        else:
+            ids[index] = next_id
+            next_id += 1
+    return ids
+
+
+class TableDelta:
+    """Row ids of one table that are new, changed or gone compared with a snapshot."""
+
+    def __init__(self, previous, rows):
+        self.new = [row_id for row_id in rows if row_id not in previous]
+        self.changed = [row_id for row_id, values in rows.items()
+                        if row_id in previous and previous[row_id] != values_hash(values)]
+        self.vanished = [row_id for row_id in previous if row_id not in rows]
+
+    def __bool__(self):
+        return bool(self.new or self.changed or self.vanished)
+
+    def summary(self):
+        return f"{len(self.new)} new, {len(self.changed)} changed, {len(self.vanished)} vanished"
+
+
+def delta_file(remote=False, delta_dir=DELTA_DIR):
+    """Path of the delta migration for the local or remote database"""
+    os.makedirs(delta_dir, exist_ok=True)
+    return os.path.join(delta_dir, f"kwikr_dataset_delta.{'remote' if remote else 'local'}.sql")
@@ -0,0 +1,16 @@
+-- Account invites for bulk-imported workers
+
+-- Imported businesses get an invite token instead of a throwaway password hash.
+-- The password is only hashed when the business claims the account.
+CREATE TABLE IF NOT EXISTS worker_account_invites (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  user_id INTEGER NOT NULL UNIQUE,
+  token TEXT NOT NULL UNIQUE,
+  expires_at DATETIME NOT NULL,
+  claimed_at DATETIME,
+  created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+  FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_worker_account_invites_token ON worker_account_invites(token);
+CREATE INDEX IF NOT EXISTS idx_worker_account_invites_expires ON worker_account_invites(expires_at);
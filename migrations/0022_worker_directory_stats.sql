@@ -0,0 +1,156 @@
+-- Worker directory rollup per (province, service category)
+
+-- The directory's province and category breakdowns read this table instead of
+-- grouping every worker. Each row counts the workers (users with role
+-- 'worker') offering a category in a province, and their services of that
+-- category, with hourly rate totals so the average stays exact as rows come
+-- and go. A worker with several services of one category counts once in
+-- worker_count. Triggers keep it current; a service is counted under its
+-- user's province, so a service inserted before its user only appears after
+-- `python3 directory_stats.py rebuild`.
+CREATE TABLE IF NOT EXISTS worker_directory_stats (
+  province TEXT NOT NULL,
+  service_category TEXT NOT NULL,
+  worker_count INTEGER NOT NULL DEFAULT 0,
+  service_count INTEGER NOT NULL DEFAULT 0,
+  rated_count INTEGER NOT NULL DEFAULT 0,
+  rate_total REAL NOT NULL DEFAULT 0,
+  avg_hourly_rate REAL,
+  updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (province, service_category)
+);
+
+INSERT INTO worker_directory_stats (province, service_category, worker_count, service_count, rated_count, rate_total, avg_hourly_rate)
+SELECT COALESCE(u.province, ''), ws.service_category, COUNT(DISTINCT ws.user_id), COUNT(*), COUNT(ws.hourly_rate),
+       COALESCE(SUM(ws.hourly_rate), 0), AVG(ws.hourly_rate)
+FROM worker_services ws
+JOIN users u ON u.id = ws.user_id
+WHERE u.role = 'worker'
+GROUP BY 1, 2;
+
+-- Every trigger adds signed deltas with the same upsert, then drops emptied rows.
+-- A service changes worker_count only if it is its worker's first or last of the category.
+CREATE TRIGGER IF NOT EXISTS worker_directory_stats_service_insert
+AFTER INSERT ON worker_services
+BEGIN
+  INSERT INTO worker_directory_stats (province, service_category, worker_count, service_count, rated_count, rate_total, avg_hourly_rate)
+  SELECT COALESCE(province, ''), NEW.service_category,
+         NOT EXISTS (SELECT 1 FROM worker_services
+                     WHERE user_id = NEW.user_id AND service_category = NEW.service_category AND id <> NEW.id),
+         1, NEW.hourly_rate IS NOT NULL, COALESCE(NEW.hourly_rate, 0), NEW.hourly_rate
+  FROM users WHERE id = NEW.user_id AND role = 'worker'
+  ON CONFLICT (province, service_category) DO UPDATE SET
+    worker_count = worker_count + excluded.worker_count,
+    service_count = service_count + excluded.service_count,
+    rated_count = rated_count + excluded.rated_count,
+    rate_total = rate_total + excluded.rate_total,
+    avg_hourly_rate = (rate_total + excluded.rate_total) / NULLIF(rated_count + excluded.rated_count, 0),
+    updated_at = CURRENT_TIMESTAMP;
+END;
+
+CREATE TRIGGER IF NOT EXISTS worker_directory_stats_service_delete
+AFTER DELETE ON worker_services
+BEGIN
+  INSERT INTO worker_directory_stats (province, service_category, worker_count, service_count, rated_count, rate_total, avg_hourly_rate)
+  SELECT COALESCE(province, ''), OLD.service_category,
+         -(NOT EXISTS (SELECT 1 FROM worker_services
+                       WHERE user_id = OLD.user_id AND service_category = OLD.service_category)),
+         -1, -(OLD.hourly_rate IS NOT NULL), -COALESCE(OLD.hourly_rate, 0), NULL
+  FROM users WHERE id = OLD.user_id AND role = 'worker'
+  ON CONFLICT (province, service_category) DO UPDATE SET
+    worker_count = worker_count + excluded.worker_count,
+    service_count = service_count + excluded.service_count,
+    rated_count = rated_count + excluded.rated_count,
+    rate_total = rate_total + excluded.rate_total,
+    avg_hourly_rate = (rate_total + excluded.rate_total) / NULLIF(rated_count + excluded.rated_count, 0),
+    updated_at = CURRENT_TIMESTAMP;
+  DELETE FROM worker_directory_stats WHERE service_count <= 0;
+END;
+
+-- The worker counts only move when the service changes worker or category
+CREATE TRIGGER IF NOT EXISTS worker_directory_stats_service_update
+AFTER UPDATE OF user_id, service_category, hourly_rate ON worker_services
+BEGIN
+  INSERT INTO worker_directory_stats (province, service_category, worker_count, service_count, rated_count, rate_total, avg_hourly_rate)
+  SELECT COALESCE(province, ''), OLD.service_category,
+         -((OLD.user_id <> NEW.user_id OR OLD.service_category <> NEW.service_category)
+           AND NOT EXISTS (SELECT 1 FROM worker_services
+                           WHERE user_id = OLD.user_id AND service_category = OLD.service_category)),
+         -1, -(OLD.hourly_rate IS NOT NULL), -COALESCE(OLD.hourly_rate, 0), NULL
+  FROM users WHERE id = OLD.user_id AND role = 'worker'
+  ON CONFLICT (province, service_category) DO UPDATE SET
+    worker_count = worker_count + excluded.worker_count,
+    service_count = service_count + excluded.service_count,
+    rated_count = rated_count + excluded.rated_count,
+    rate_total = rate_total + excluded.rate_total,
+    avg_hourly_rate = (rate_total + excluded.rate_total) / NULLIF(rated_count + excluded.rated_count, 0),
+    updated_at = CURRENT_TIMESTAMP;
+  INSERT INTO worker_directory_stats (province, service_category, worker_count, service_count, rated_count, rate_total, avg_hourly_rate)
+  SELECT COALESCE(province, ''), NEW.service_category,
+         (OLD.user_id <> NEW.user_id OR OLD.service_category <> NEW.service_category)
+           AND NOT EXISTS (SELECT 1 FROM worker_services
+                           WHERE user_id = NEW.user_id AND service_category = NEW.service_category AND id <> NEW.id),
+         1, NEW.hourly_rate IS NOT NULL, COALESCE(NEW.hourly_rate, 0), NEW.hourly_rate
+  FROM users WHERE id = NEW.user_id AND role = 'worker'
+  ON CONFLICT (province, service_category) DO UPDATE SET
+    worker_count = worker_count + excluded.worker_count,
+    service_count = service_count + excluded.service_count,
+    rated_count = rated_count + excluded.rated_count,
+    rate_total = rate_total + excluded.rate_total,
+    avg_hourly_rate = (rate_total + excluded.rate_total) / NULLIF(rated_count + excluded.rated_count, 0),
+    updated_at = CURRENT_TIMESTAMP;
+  DELETE FROM worker_directory_stats WHERE service_count <= 0;
+END;
+
+-- Runs before ON DELETE CASCADE removes the services, whose own trigger then no longer finds the user
+CREATE TRIGGER IF NOT EXISTS worker_directory_stats_user_delete
+BEFORE DELETE ON users
+WHEN OLD.role = 'worker'
+BEGIN
+  INSERT INTO worker_directory_stats (province, service_category, worker_count, service_count, rated_count, rate_total, avg_hourly_rate)
+  SELECT COALESCE(OLD.province, ''), service_category, -1, -COUNT(*), -COUNT(hourly_rate),
+         -COALESCE(SUM(hourly_rate), 0), NULL
+  FROM worker_services WHERE user_id = OLD.id
+  GROUP BY service_category
+  ON CONFLICT (province, service_category) DO UPDATE SET
+    worker_count = worker_count + excluded.worker_count,
+    service_count = service_count + excluded.service_count,
+    rated_count = rated_count + excluded.rated_count,
+    rate_total = rate_total + excluded.rate_total,
+    avg_hourly_rate = (rate_total + excluded.rate_total) / NULLIF(rated_count + excluded.rated_count, 0),
+    updated_at = CURRENT_TIMESTAMP;
+  DELETE FROM worker_directory_stats WHERE service_count <= 0;
+END;
+
+-- Moves a worker's services to their new province, or in or out of the rollup when the role changes
+CREATE TRIGGER IF NOT EXISTS worker_directory_stats_user_update
+AFTER UPDATE OF province, role ON users
+WHEN (OLD.role = 'worker' OR NEW.role = 'worker')
+  AND (COALESCE(OLD.province, '') <> COALESCE(NEW.province, '') OR OLD.role IS NOT NEW.role)
+BEGIN
+  INSERT INTO worker_directory_stats (province, service_category, worker_count, service_count, rated_count, rate_total, avg_hourly_rate)
+  SELECT COALESCE(OLD.province, ''), service_category, -1, -COUNT(*), -COUNT(hourly_rate),
+         -COALESCE(SUM(hourly_rate), 0), NULL
+  FROM worker_services WHERE user_id = NEW.id AND OLD.role = 'worker'
+  GROUP BY service_category
+  ON CONFLICT (province, service_category) DO UPDATE SET
+    worker_count = worker_count + excluded.worker_count,
+    service_count = service_count + excluded.service_count,
+    rated_count = rated_count + excluded.rated_count,
+    rate_total = rate_total + excluded.rate_total,
+    avg_hourly_rate = (rate_total + excluded.rate_total) / NULLIF(rated_count + excluded.rated_count, 0),
+    updated_at = CURRENT_TIMESTAMP;
+  INSERT INTO worker_directory_stats (province, service_category, worker_count, service_count, rated_count, rate_total, avg_hourly_rate)
+  SELECT COALESCE(NEW.province, ''), service_category, 1, COUNT(*), COUNT(hourly_rate),
+         COALESCE(SUM(hourly_rate), 0), AVG(hourly_rate)
+  FROM worker_services WHERE user_id = NEW.id AND NEW.role = 'worker'
+  GROUP BY service_category
+  ON CONFLICT (province, service_category) DO UPDATE SET
+    worker_count = worker_count + excluded.worker_count,
+    service_count = service_count + excluded.service_count,
+    rated_count = rated_count + excluded.rated_count,
+    rate_total = rate_total + excluded.rate_total,
+    avg_hourly_rate = (rate_total + excluded.rate_total) / NULLIF(rated_count + excluded.rated_count, 0),
+    updated_at = CURRENT_TIMESTAMP;
+  DELETE FROM worker_directory_stats WHERE service_count <= 0;
+END;
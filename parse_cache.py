@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Content-addressed cache of parsed Excel exports.
+
+Parsing .xlsx is the slowest step before any DB work, and the same bytes get
+parsed by the importer, the analyzer and the SQL migration generators (the
+two Kwikr exports in the repo are even byte-identical). Parsed batches are
+stored under the SHA-256 of the file contents as pickled DataFrame parts,
+which keep pandas' columnar blocks, so later runs skip openpyxl entirely.
+
+Entries are invalidated automatically when the file changes (the hash
+changes) and evicted least-recently-used once the cache exceeds its size or
+entry limits.
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+
+import pandas as pd
+
+CACHE_DIR = os.environ.get('KWIKR_PARSE_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'parsed_exports'))
+MAX_CACHE_BYTES = 512 * 1024 * 1024
+MAX_CACHE_ENTRIES = 16
+
+
+def file_digest(path, block_size=1024 * 1024):
+    """SHA-256 of a file's contents, read in blocks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_key(path, variant=''):
+    """Cache key for a file; variant separates e.g. different sheets of one workbook"""
+    key = file_digest(path)
+    if variant:
+        key += '-' + hashlib.sha256(variant.encode()).hexdigest()[:12]
+    return key
+
+
+def _entry_size(entry):
+    return sum(os.path.getsize(os.path.join(entry, name)) for name in os.listdir(entry))
+
+
+def evict(cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES, max_entries=MAX_CACHE_ENTRIES):
+    """Drop least-recently-used entries until the cache fits its limits"""
+    if not os.path.isdir(cache_dir):
+        return
+    entries = []
+    for name in os.listdir(cache_dir):
+        entry = os.path.join(cache_dir, name)
+        if os.path.isdir(entry) and not name.startswith('.'):
+            entries.append((os.path.getmtime(entry), _entry_size(entry), entry))
+
+    entries.sort()
+    total = sum(size for _, size, _ in entries)
+    while entries and (total > max_bytes or len(entries) > max_entries):
+        _, size, entry = entries.pop(0)
+        shutil.rmtree(entry, ignore_errors=True)
+        total -= size
+
+
+def cached_batches(key, parse_batches, cache_dir=CACHE_DIR):
+    """
+    Yield DataFrame batches for key, parsing them with parse_batches() on a miss.
+
+    A miss writes each parsed batch as it is yielded and only publishes the
+    entry once parsing has finished, so an interrupted run never leaves a
+    partial entry behind.
+    """
+    entry = os.path.join(cache_dir, key)
+
+    if os.path.isdir(entry):
+        # Touch the entry so LRU eviction sees it as recently used
+        os.utime(entry)
+        for name in sorted(os.listdir(entry)):
+            yield pd.read_pickle(os.path.join(entry, name))
+        return
+
+    os.makedirs(cache_dir, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix='.staging-', dir=cache_dir)
+    try:
+        for part, batch in enumerate(parse_batches()):
+            batch.to_pickle(os.path.join(staging, f"part-{part:06d}.pkl"))
+            yield batch
+        try:
+            os.rename(staging, entry)
+        except OSError:
+            # Another run published the same entry first
+            pass
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+    evict(cache_dir)
+
+
+def clear(cache_dir=CACHE_DIR):
+    """Remove every cached entry"""
+    shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    import sys
+
+    if sys.argv[1:] == ['clear']:
+        clear()
+        print(f"🧹 Cleared parse cache: {CACHE_DIR}")
+    else:
+        entries = sorted(os.listdir(CACHE_DIR)) if os.path.isdir(CACHE_DIR) else []
+        print(f"📦 Parse cache: {CACHE_DIR}")
+        for name in entries:
+            entry = os.path.join(CACHE_DIR, name)
+            if os.path.isdir(entry) and not name.startswith('.'):
+                print(f"  {name[:16]}…  {_entry_size(entry):,} bytes")
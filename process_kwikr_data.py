@@ -6,7 +6,9 @@ and generate SQL migration files for proper database import.
 
 import re
 import json
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Iterator
+
+from sql_stream import MigrationWriter
 
 def parse_business_data(raw_text: str) -> List[Dict[str, Any]]:
     """
@@ -106,29 +108,14 @@ def parse_business_data(raw_text: str) -> List[Dict[str, Any]]:
     
     return businesses
 
-def generate_sql_migration(businesses: List[Dict[str, Any]]) -> str:
-    """
-    Generate SQL migration file content for the businesses.
-    """
-    sql_parts = []
-    
-    # Header
-    sql_parts.append("-- Migration: Import complete Kwikr business dataset")
-    sql_parts.append("-- Generated from user-provided comprehensive business data")
-    sql_parts.append("")
-    
-    # Clear existing test data
-    sql_parts.append("-- Clear existing test/incomplete data")
-    sql_parts.append("DELETE FROM user_profiles;")
-    sql_parts.append("DELETE FROM worker_services;") 
-    sql_parts.append("DELETE FROM users;")
-    sql_parts.append("")
-    
-    # Insert users
-    sql_parts.append("-- Insert all Kwikr businesses as users")
-    sql_parts.append("INSERT INTO users (id, email, password_hash, role, first_name, last_name, phone, province, city, created_at) VALUES")
-    
-    user_values = []
+SERVICE_CATEGORIES = [
+    'Professional Services', 'Consulting', 'Technology Services', 'Business Services',
+    'Financial Services', 'Marketing Services', 'Legal Services', 'Healthcare Services',
+    'Construction Services', 'Real Estate Services', 'Educational Services', 'Retail Services'
+]
+
+def user_values(businesses: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    """VALUES rows for the users table, one business at a time."""
     for business in businesses:
         values = (
             business['id'],
@@ -142,16 +129,10 @@ def generate_sql_migration(businesses: List[Dict[str, Any]]) -> str:
             business['city'].replace("'", "''"),
             business['created_at']
         )
-        user_values.append(f"({values[0]}, '{values[1]}', '{values[2]}', '{values[3]}', '{values[4]}', '{values[5]}', '{values[6]}', '{values[7]}', '{values[8]}', '{values[9]}')")
-    
-    sql_parts.append(',\n'.join(user_values) + ';')
-    sql_parts.append("")
-    
-    # Insert user profiles
-    sql_parts.append("-- Insert business profiles with authentic company data")
-    sql_parts.append("INSERT INTO user_profiles (user_id, company_name, company_description, profile_image_url, created_at) VALUES")
-    
-    profile_values = []
+        yield f"({values[0]}, '{values[1]}', '{values[2]}', '{values[3]}', '{values[4]}', '{values[5]}', '{values[6]}', '{values[7]}', '{values[8]}', '{values[9]}')"
+
+def profile_values(businesses: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    """VALUES rows for the user_profiles table."""
     for business in businesses:
         values = (
             business['id'],
@@ -160,24 +141,12 @@ def generate_sql_migration(businesses: List[Dict[str, Any]]) -> str:
             business['profile_image_url'],
             business['created_at']
         )
-        profile_values.append(f"({values[0]}, '{values[1]}', '{values[2]}', '{values[3]}', '{values[4]}')")
-    
-    sql_parts.append(',\n'.join(profile_values) + ';')
-    sql_parts.append("")
-    
-    # Insert worker services
-    sql_parts.append("-- Insert professional services for all businesses")
-    sql_parts.append("INSERT INTO worker_services (user_id, service_category, service_area, hourly_rate, created_at) VALUES")
-    
-    service_categories = [
-        'Professional Services', 'Consulting', 'Technology Services', 'Business Services',
-        'Financial Services', 'Marketing Services', 'Legal Services', 'Healthcare Services',
-        'Construction Services', 'Real Estate Services', 'Educational Services', 'Retail Services'
-    ]
-    
-    service_values = []
+        yield f"({values[0]}, '{values[1]}', '{values[2]}', '{values[3]}', '{values[4]}')"
+
+def service_values(businesses: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    """VALUES rows for the worker_services table."""
     for business in businesses:
-        category = service_categories[business['id'] % len(service_categories)]
+        category = SERVICE_CATEGORIES[business['id'] % len(SERVICE_CATEGORIES)]
         service_area = f"Greater {business['city']} Area"
         hourly_rate = 50 + (business['id'] % 200)  # $50-$250 range
         
@@ -188,11 +157,45 @@ def generate_sql_migration(businesses: List[Dict[str, Any]]) -> str:
             hourly_rate,
             business['created_at']
         )
-        service_values.append(f"({values[0]}, '{values[1]}', '{values[2]}', {values[3]}, '{values[4]}')")
+        yield f"({values[0]}, '{values[1]}', '{values[2]}', {values[3]}, '{values[4]}')"
+
+def write_sql_migration(businesses: List[Dict[str, Any]], migration_file: str) -> int:
+    """
+    Write the SQL migration for the businesses to migration_file, row by row.
     
-    sql_parts.append(',\n'.join(service_values) + ';')
+    Returns the number of characters written.
+    """
+    with MigrationWriter(migration_file) as migration:
+        # Header
+        migration.line("-- Migration: Import complete Kwikr business dataset")
+        migration.line("-- Generated from user-provided comprehensive business data")
+        migration.line()
+        
+        # Clear existing test data
+        migration.line("-- Clear existing test/incomplete data")
+        migration.line("DELETE FROM user_profiles;")
+        migration.line("DELETE FROM worker_services;") 
+        migration.line("DELETE FROM users;")
+        migration.line()
+        
+        # Insert users
+        migration.line("-- Insert all Kwikr businesses as users")
+        migration.line("INSERT INTO users (id, email, password_hash, role, first_name, last_name, phone, province, city, created_at) VALUES")
+        migration.rows(user_values(businesses))
+        migration.line()
+        
+        # Insert user profiles
+        migration.line("-- Insert business profiles with authentic company data")
+        migration.line("INSERT INTO user_profiles (user_id, company_name, company_description, profile_image_url, created_at) VALUES")
+        migration.rows(profile_values(businesses))
+        migration.line()
+        
+        # Insert worker services
+        migration.line("-- Insert professional services for all businesses")
+        migration.line("INSERT INTO worker_services (user_id, service_category, service_area, hourly_rate, created_at) VALUES")
+        migration.rows(service_values(businesses))
     
-    return '\n'.join(sql_parts)
+    return migration.characters
 
 # Main execution
 if __name__ == "__main__":
@@ -427,13 +430,9 @@ if __name__ == "__main__":
     businesses = parse_business_data(raw_business_data)
     print(f"Parsed {len(businesses)} businesses")
     
-    # Generate SQL migration
-    sql_content = generate_sql_migration(businesses)
-    
-    # Write to migration file
+    # Write the SQL migration as it is generated
     migration_file = "/home/user/webapp/migrations/0014_import_complete_kwikr_dataset.sql"
-    with open(migration_file, 'w', encoding='utf-8') as f:
-        f.write(sql_content)
+    write_sql_migration(businesses, migration_file)
     
     print(f"Generated migration file: {migration_file}")
     print("Ready to import complete Kwikr dataset!")
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Shard planning, private shard databases and the ATTACH-based merge for
+parallel worker imports.
+
+A sharded import partitions the export by province code and gives each
+worker process a group of provinces. Every process transforms its rows and
+bulk-loads them into its own sqlite file, created with the target's table
+definitions, so the processes never contend for a write lock. User ids are
+reserved up front: each shard gets a contiguous block above every id the
+target has issued, seeded into the shard's sqlite_sequence, so ids stay
+unique across shards. Child rows keep their user_id but not their own
+shard-local id.
+
+The shard files are then ATTACHed to the target and copied with INSERT ...
+SELECT, all shards in one transaction.
+"""
+
+import os
+import sqlite3
+
+from bulk_loader import PARENT_TABLE, WORKER_TABLE_COLUMNS, reserve_user_ids
+
+# SQLite's default SQLITE_MAX_ATTACHED; every shard is attached for the merge transaction
+MAX_SHARDS = 10
+
+
+def shard_count(requested=None, groups=MAX_SHARDS):
+    """Worker processes to use: requested (or one per core), at most one per group and MAX_SHARDS"""
+    count = requested or os.cpu_count() or 1
+    return max(1, min(count, groups, MAX_SHARDS))
+
+
+def assign_shards(counts, shards):
+    """
+    {key: shard number} spreading keys with {key: row count} over shards.
+
+    Largest keys first, each to the shard with the fewest rows so far, which
+    keeps the shards' sizes (and running times) close to each other.
+    """
+    loads = [0] * shards
+    assignment = {}
+    for key, count in sorted(counts.items(), key=lambda item: (-item[1], str(item[0]))):
+        shard = loads.index(min(loads))
+        assignment[key] = shard
+        loads[shard] += count
+    return assignment
+
+
+def reserve_shard_ranges(conn, sizes):
+    """First user id of each shard's block, for shards of sizes rows, above every id the target issued"""
+    ids = reserve_user_ids(conn.cursor(), sum(sizes))
+    first_ids = []
+    offset = 0
+    for size in sizes:
+        first_ids.append(ids[offset] if size else None)
+        offset += size
+    return first_ids
+
+
+def create_shard_database(conn, shard_path, first_user_id, tables=WORKER_TABLE_COLUMNS):
+    """Create a shard file with the target's definitions of tables and user ids starting at first_user_id"""
+    names = list(tables)
+    definitions = conn.execute(
+        f"SELECT sql FROM sqlite_master WHERE type = 'table' AND name IN ({', '.join('?' for _ in names)})",
+        names
+    ).fetchall()
+    shard = sqlite3.connect(shard_path)
+    try:
+        # Shards are scratch files: nothing is worth a sync
+        shard.execute("PRAGMA journal_mode = OFF")
+        shard.execute("PRAGMA synchronous = OFF")
+        for (sql,) in definitions:
+            shard.execute(sql)
+        if first_user_id is not None:
+            shard.execute("INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)", (PARENT_TABLE, first_user_id - 1))
+        shard.commit()
+    finally:
+        shard.close()
+
+
+def merge_shards(conn, shard_paths, tables=WORKER_TABLE_COLUMNS):
+    """
+    Copy every shard's rows into the target in one transaction; returns {table: rows merged}.
+
+    Users keep their reserved ids, child tables get fresh ids from the target.
+    """
+    if len(shard_paths) > MAX_SHARDS:
+        raise ValueError(f"At most {MAX_SHARDS} shards can be attached at once")
+
+    existing = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    conn.commit()
+    aliases = [f"shard_{number}" for number in range(len(shard_paths))]
+    for alias, path in zip(aliases, shard_paths):
+        conn.execute(f"ATTACH DATABASE ? AS {alias}", (path,))
+
+    merged = {}
+    cursor = conn.cursor()
+    try:
+        cursor.execute("BEGIN")
+        try:
+            for table, columns in tables.items():
+                if table not in existing:
+                    continue
+                columns = (('id',) if table == PARENT_TABLE else ('user_id',)) + tuple(columns)
+                column_list = ', '.join(columns)
+                merged[table] = 0
+                for alias in aliases:
+                    cursor.execute(f"INSERT INTO main.{table} ({column_list}) SELECT {column_list} FROM {alias}.{table}")
+                    merged[table] += cursor.rowcount
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    finally:
+        for alias in aliases:
+            conn.execute(f"DETACH DATABASE {alias}")
+    return merged
+
+
+def add_shard_arguments(parser):
+    """Add the --shards flag for imports that can load provinces in parallel processes"""
+    parser.add_argument('--shards', type=int, default=1,
+                        help='worker processes, each loading a group of provinces into its own sqlite file '
+                             'before one merge (0 = one per core)')
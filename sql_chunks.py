@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Byte-budget packing of multi-row INSERT statements for D1.
+
+D1 rejects statements longer than 100,000 bytes and queries with more than
+100 bound parameters. Instead of a fixed number of rows per statement, rows
+are packed into a statement until the next row would cross the byte budget
+(or the parameter limit), so short rows share one statement and a row with
+a 2,000-character description simply closes it earlier.
+
+If D1 still reports a statement as too long, the dispatcher splits that
+statement in half and retries the halves, and the chunker lowers its budget
+to half that statement's size for the rest of the run (see d1_dispatch).
+Several statements rejected at once only lower it as far as the smallest
+of them calls for, not once per rejection.
+"""
+
+import re
+
+D1_MAX_STATEMENT_BYTES = 100_000
+D1_MAX_BOUND_PARAMETERS = 100
+
+# Headroom below the hard limit for wrangler's own wrapping
+DEFAULT_MAX_BYTES = 90_000
+MIN_MAX_BYTES = 4_096
+
+TOO_LONG_ERROR = re.compile(r'too long|too big|SQLITE_TOOBIG|too many SQL variables', re.IGNORECASE)
+
+
+def is_too_long(result):
+    """Whether a failed execution was rejected for statement size or parameter count"""
+    return result.returncode != 0 and bool(TOO_LONG_ERROR.search(result.stderr or ''))
+
+
+class RowStatement:
+    """A multi-row INSERT built from a header, (key, values_sql) rows and a terminator."""
+
+    def __init__(self, header, rows, separator=',', terminator=';', chunker=None):
+        self.header = header
+        self.rows = rows
+        self.separator = separator
+        self.terminator = terminator
+        self.chunker = chunker
+
+    @property
+    def sql(self):
+        return self.header + self.separator.join(values for _, values in self.rows) + self.terminator
+
+    @property
+    def first_key(self):
+        return self.rows[0][0]
+
+    @property
+    def last_key(self):
+        return self.rows[-1][0]
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __str__(self):
+        return self.sql
+
+    def split(self):
+        """Two statements with the first and second half of the rows"""
+        middle = len(self.rows) // 2
+        return [RowStatement(self.header, rows, self.separator, self.terminator, self.chunker)
+                for rows in (self.rows[:middle], self.rows[middle:])]
+
+
+class StatementChunker:
+    """Pack rows into RowStatements that stay under a byte budget and a bound-parameter limit."""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, max_parameters=D1_MAX_BOUND_PARAMETERS):
+        self.max_bytes = max_bytes
+        self.max_parameters = max_parameters
+
+    def shrink(self, failed_bytes):
+        """Lower the byte budget to half a statement of failed_bytes that D1 rejected as too long"""
+        max_bytes = max(MIN_MAX_BYTES, min(self.max_bytes, failed_bytes // 2))
+        if max_bytes < self.max_bytes:
+            self.max_bytes = max_bytes
+            print(f"📉 Statement budget reduced to {self.max_bytes:,} bytes")
+
+    def pack(self, header, rows, separator=',', terminator=';', parameters_per_row=0):
+        """
+        Yield RowStatements for an iterable of (key, values_sql) rows.
+
+        parameters_per_row counts the bound parameters each row adds (0 for
+        rows with inline literals). A row that exceeds the budget on its own
+        still gets a statement of its own.
+        """
+        base_bytes = len(header.encode('utf-8')) + len(terminator.encode('utf-8'))
+        separator_bytes = len(separator.encode('utf-8'))
+        max_rows = self.max_parameters // parameters_per_row if parameters_per_row else None
+
+        pending = []
+        size = base_bytes
+        for key, values in rows:
+            row_bytes = len(values.encode('utf-8'))
+            if pending and (size + separator_bytes + row_bytes > self.max_bytes
+                            or (max_rows is not None and len(pending) >= max_rows)):
+                yield RowStatement(header, pending, separator, terminator, self)
+                pending = []
+                size = base_bytes
+            if pending:
+                size += separator_bytes
+            pending.append((key, values))
+            size += row_bytes
+
+        if pending:
+            yield RowStatement(header, pending, separator, terminator, self)
+
+
+def labelled_chunks(statements, prefix='Chunk'):
+    """(label, statement) pairs for d1_dispatch.run_stages, labelled with their record range"""
+    for number, statement in enumerate(statements, 1):
+        yield f"{prefix} {number} (records {statement.first_key}-{statement.last_key})", statement
+
+
+def add_chunk_arguments(parser):
+    """Add the --max-statement-bytes flag shared by the D1 import scripts"""
+    parser.add_argument('--max-statement-bytes', type=int, default=DEFAULT_MAX_BYTES,
+                        help=f'byte budget per INSERT statement (D1 allows {D1_MAX_STATEMENT_BYTES:,})')
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Streaming reader and writer for SQL migration files.
+
+The migration generators used to collect every line of a migration in a
+list and join it into one string before writing it, and the importers read
+whole migration files with `.read()` and cut them up on lines that start
+with `INSERT INTO`. Memory grew with the dataset, and a value that contained
+a semicolon or a line starting with `INSERT INTO` inside a quoted string
+split a statement in the wrong place.
+
+MigrationWriter writes a migration piece by piece as it is generated (to a
+temporary file that replaces the target once complete). read_sql_statements
+streams a file line by line through a small tokenizer that tracks quotes
+('...' with '' escapes, "...", `...`, [...]) and comments (--, /* */), and
+yields one statement at a time, so only the current statement is held in
+memory. A CREATE TRIGGER runs on to the END that closes its BEGIN body;
+CASE ... END expressions inside the body are matched by depth.
+split_insert uses the same tokenizer to cut a multi-row INSERT into its
+VALUES rows.
+"""
+
+import os
+import re
+
+# Outside quotes and comments: punctuation and keywords that matter, or the start of a quote/comment
+_NORMAL_TOKEN = re.compile(r"['\"`\[;(),]|--|/\*|\b(?:CASE|END)\b", re.IGNORECASE)
+_KEYWORDS = ('CASE', 'END')
+
+# What ends each kind of quote or comment
+_CLOSERS = {"'": "'", '"': '"', '`': '`', '[': ']', '--': '\n', '/*': '*/'}
+
+# Quotes that are escaped by doubling them
+_DOUBLED_ESCAPES = ("'", '"', '`')
+
+_VALUES = re.compile(r'\bVALUES\b\s*', re.IGNORECASE)
+
+# A trigger body holds statements of its own; the trigger ends at the END closing its BEGIN
+_CREATE_TRIGGER = re.compile(r'CREATE\s+(?:TEMP\s+|TEMPORARY\s+)?TRIGGER\b', re.IGNORECASE)
+
+
+class SqlScanner:
+    """Quote and comment state of SQL text that is fed in pieces."""
+
+    def __init__(self):
+        self.open = None
+
+    def scan(self, text):
+        """
+        Yield (position, token) for each ; ( ) , and CASE or END keyword
+        (upper-cased) of text outside quotes and comments.
+
+        The state carries over to the next piece, so a quote or block comment
+        may span pieces. Pieces should end at line breaks (or the end of the
+        input), so a doubled quote is never cut in half.
+        """
+        position = 0
+        while position < len(text):
+            if self.open is None:
+                match = _NORMAL_TOKEN.search(text, position)
+                if match is None:
+                    return
+                token = match.group()
+                position = match.end()
+                if token in ';(),':
+                    yield match.start(), token
+                elif token.upper() in _KEYWORDS:
+                    yield match.start(), token.upper()
+                else:
+                    self.open = token
+            else:
+                closer = _CLOSERS[self.open]
+                end = text.find(closer, position)
+                if end < 0:
+                    return
+                position = end + len(closer)
+                if closer in _DOUBLED_ESCAPES and text.startswith(closer, position):
+                    # '' inside a string is an escaped quote, not the end of it
+                    position += len(closer)
+                    continue
+                self.open = None
+
+
+def _without_leading_comments(sql):
+    # Comments between statements belong to neither statement
+    while True:
+        sql = sql.lstrip()
+        if sql.startswith('--'):
+            end = sql.find('\n')
+            sql = '' if end < 0 else sql[end + 1:]
+        elif sql.startswith('/*'):
+            end = sql.find('*/')
+            sql = '' if end < 0 else sql[end + 2:]
+        else:
+            return sql.rstrip()
+
+
+def iter_sql_statements(pieces):
+    """
+    Yield the statements of SQL text given as an iterable of pieces (e.g. lines).
+
+    Statements end at a semicolon outside quotes and comments and keep it,
+    except inside the BEGIN ... END body of a CREATE TRIGGER, where CASE
+    and END keywords are counted so the END of a CASE expression does not
+    end the body; comments between statements and empty statements are
+    dropped, and a final statement without a semicolon is still yielded.
+    """
+    scanner = SqlScanner()
+    pending = []
+    # Open CASE expressions of the current statement, and whether an END has closed its body
+    case_depth = 0
+    body_closed = False
+    for piece in pieces:
+        start = 0
+        for position, token in scanner.scan(piece):
+            if token == 'CASE':
+                case_depth += 1
+            elif token == 'END':
+                if case_depth:
+                    case_depth -= 1
+                else:
+                    body_closed = True
+            if token != ';':
+                continue
+            pending.append(piece[start:position + 1])
+            start = position + 1
+            statement = _without_leading_comments(''.join(pending))
+            if _CREATE_TRIGGER.match(statement) and not body_closed:
+                # A semicolon inside a trigger body
+                continue
+            pending = []
+            case_depth = 0
+            body_closed = False
+            if statement.strip(' \t\r\n;'):
+                yield statement
+        pending.append(piece[start:])
+
+    statement = _without_leading_comments(''.join(pending))
+    if statement.strip(' \t\r\n;'):
+        yield statement
+
+
+def read_sql_statements(path):
+    """Stream the statements of a .sql file without reading it into memory"""
+    with open(path, 'r', encoding='utf-8') as f:
+        yield from iter_sql_statements(f)
+
+
+def statement_table(statement):
+    """Table an INSERT INTO / DELETE FROM statement writes to"""
+    return statement.split(None, 3)[2]
+
+
+def split_insert(statement):
+    """
+    (header, [values_sql, ...], terminator) of a multi-row INSERT ... VALUES statement.
+
+    header runs up to the first row and terminator is whatever follows the
+    last row (';' or an ON CONFLICT clause), so a sql_chunks.StatementChunker
+    can repack the rows.
+    """
+    match = _VALUES.search(statement)
+    if match is None:
+        raise ValueError(f"Not an INSERT ... VALUES statement: {statement[:80]}")
+
+    rows = []
+    depth = 0
+    expect_row = True
+    row_start = end = match.end()
+    text = statement[match.end():]
+    for position, token in SqlScanner().scan(text):
+        position += match.end()
+        if token == '(':
+            if depth == 0:
+                if not expect_row:
+                    # e.g. the column list of an ON CONFLICT(...) clause after the last row
+                    break
+                row_start = position
+                expect_row = False
+            depth += 1
+        elif token == ',' and depth == 0:
+            expect_row = True
+        elif token == ')':
+            depth -= 1
+            if depth == 0:
+                rows.append(statement[row_start:position + 1])
+                end = position + 1
+    return statement[:match.end()], rows, statement[end:]
+
+
+class MigrationWriter:
+    """
+    Write a migration file part by part instead of joining it in memory.
+
+    Parts are separated by a newline, like '\\n'.join(parts) of the old
+    sql_parts lists, so generated files are unchanged. The file is written
+    to a temporary name and only replaces path once it is complete.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.characters = 0
+        self._temp_path = path + '.tmp'
+        self._file = open(self._temp_path, 'w', encoding='utf-8')
+        self._first = True
+
+    def _write(self, text):
+        self._file.write(text)
+        self.characters += len(text)
+
+    def _start_part(self):
+        if not self._first:
+            self._write('\n')
+        self._first = False
+
+    def line(self, text=''):
+        """Write one part, e.g. a comment, a short statement or '' for a blank line"""
+        self._start_part()
+        self._write(text)
+
+    def lines(self, texts):
+        for text in texts:
+            self.line(text)
+
+    def statements(self, statements, separator='\n\n'):
+        """Write statements (SQL text or sql_chunks.RowStatement) as one part, one at a time"""
+        self._start_part()
+        for number, statement in enumerate(statements):
+            if number:
+                self._write(separator)
+            self._write(str(statement))
+
+    def rows(self, rows, separator=',\n', terminator=';'):
+        """Write VALUES rows as one part, one at a time, followed by terminator"""
+        self._start_part()
+        for number, values in enumerate(rows):
+            if number:
+                self._write(separator)
+            self._write(values)
+        self._write(terminator)
+
+    def close(self, complete=True):
+        if self._file.closed:
+            return
+        self._file.close()
+        if complete:
+            os.replace(self._temp_path, self.path)
+        else:
+            os.remove(self._temp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc_info):
+        # A generator that failed halfway leaves the previous file in place
+        self.close(complete=exc_type is None)
@@ -420,97 +420,58 @@ clientRoutes.get('/search/stats', async (c) => {
   try {
     const serviceCategory = c.req.query('service_category') // Optional service filter
     
-    // TEMPORARY FALLBACK: Since D1 binding is not working, use static data that matches database structure
-    // This ensures users can start using the search functionality immediately
+    // Category counts come from the worker_directory_stats rollup (a few dozen rows). A worker offering
+    // several categories is in several rollup rows, so unfiltered province totals count users instead
+    const categoryFilter = serviceCategory ? 'WHERE service_category = ?' : ''
+    const categoryParams = serviceCategory ? [serviceCategory] : []
     
-    const allWorkerData = {
-      provinces: [
-        { province: 'ON', worker_count: 8 },
-        { province: 'AB', worker_count: 7 },
-        { province: 'BC', worker_count: 4 },
-        { province: 'QC', worker_count: 2 },
-        { province: 'SK', worker_count: 2 },
-        { province: 'NB', worker_count: 1 },
-        { province: 'NS', worker_count: 1 }
-      ],
-      cities: [
-        { province: 'ON', city: 'Toronto', worker_count: 3 },
-        { province: 'ON', city: 'Ottawa', worker_count: 2 },
-        { province: 'ON', city: 'Mississauga', worker_count: 2 },
-        { province: 'ON', city: 'Hamilton', worker_count: 1 },
-        { province: 'AB', city: 'Calgary', worker_count: 4 },
-        { province: 'AB', city: 'Edmonton', worker_count: 2 },
-        { province: 'AB', city: 'Red Deer', worker_count: 1 },
-        { province: 'BC', city: 'Vancouver', worker_count: 2 },
-        { province: 'BC', city: 'Victoria', worker_count: 1 },
-        { province: 'BC', city: 'Burnaby', worker_count: 1 },
-        { province: 'QC', city: 'Montreal', worker_count: 1 },
-        { province: 'QC', city: 'Quebec City', worker_count: 1 },
-        { province: 'SK', city: 'Saskatoon', worker_count: 1 },
-        { province: 'SK', city: 'Regina', worker_count: 1 },
-        { province: 'NB', city: 'Saint John', worker_count: 1 },
-        { province: 'NS', city: 'Halifax', worker_count: 1 }
-      ],
-      services: [
-        { province: 'ON', service_category: 'Plumbing', worker_count: 3 },
-        { province: 'ON', service_category: 'HVAC', worker_count: 3 },
-        { province: 'ON', service_category: 'Electrical', worker_count: 2 },
-        { province: 'AB', service_category: 'HVAC', worker_count: 3 },
-        { province: 'AB', service_category: 'Plumbing', worker_count: 2 },
-        { province: 'AB', service_category: 'Electrical', worker_count: 2 },
-        { province: 'BC', service_category: 'Plumbing', worker_count: 2 },
-        { province: 'BC', service_category: 'HVAC', worker_count: 1 },
-        { province: 'BC', service_category: 'Electrical', worker_count: 1 },
-        { province: 'QC', service_category: 'Plumbing', worker_count: 1 },
-        { province: 'QC', service_category: 'HVAC', worker_count: 1 },
-        { province: 'SK', service_category: 'Plumbing', worker_count: 1 },
-        { province: 'SK', service_category: 'HVAC', worker_count: 1 },
-        { province: 'NB', service_category: 'Electrical', worker_count: 1 },
-        { province: 'NS', service_category: 'Plumbing', worker_count: 1 }
-      ]
-    }
+    const provinces = serviceCategory
+      ? await c.env.DB.prepare(`
+          SELECT province, worker_count, service_count
+          FROM worker_directory_stats
+          WHERE service_category = ?
+          ORDER BY worker_count DESC
+        `).bind(serviceCategory).all()
+      : await c.env.DB.prepare(`
+          SELECT province, COUNT(*) as worker_count
+          FROM users
+          WHERE role = 'worker'
+          GROUP BY province
+          ORDER BY worker_count DESC
+        `).all()
     
-    // Filter data based on service category if provided
-    if (serviceCategory) {
-      // Get provinces that have workers providing this service
-      const serviceProviders = allWorkerData.services.filter(s => s.service_category === serviceCategory)
-      const filteredProvinces = serviceProviders.map(s => ({
-        province: s.province,
-        worker_count: s.worker_count
-      }))
-      
-      // Get cities in provinces that have this service
-      const provincesList = serviceProviders.map(s => s.province)
-      const filteredCities = allWorkerData.cities.filter(c => provincesList.includes(c.province))
-      
-      // Filter services to only show the requested category
-      const filteredServices = allWorkerData.services.filter(s => s.service_category === serviceCategory)
-      
-      return c.json({
-        provinces: filteredProvinces,
-        cities: filteredCities,
-        services: filteredServices,
-        debug: {
-          serviceCategory: serviceCategory,
-          provinceCount: filteredProvinces.length,
-          cityCount: filteredCities.length,
-          serviceCount: filteredServices.length,
-          dataSource: 'static_fallback'
-        }
-      })
-    }
+    const services = await c.env.DB.prepare(`
+      SELECT province, service_category, worker_count, service_count, avg_hourly_rate
+      FROM worker_directory_stats
+      ${categoryFilter}
+      ORDER BY province, worker_count DESC
+    `).bind(...categoryParams).all()
+    
+    // Cities are not rolled up; count workers offering the service (or any) per city
+    const cities = await c.env.DB.prepare(`
+      SELECT u.province, u.city, COUNT(DISTINCT u.id) as worker_count
+      FROM users u
+      JOIN worker_services ws ON ws.user_id = u.id
+      WHERE u.role = 'worker' AND u.city IS NOT NULL AND u.city != ''
+        ${serviceCategory ? 'AND ws.service_category = ?' : ''}
+      GROUP BY u.province, u.city
+      ORDER BY u.province, worker_count DESC
+    `).bind(...categoryParams).all()
+    
+    const provinceRows = provinces.results || []
+    const cityRows = cities.results || []
+    const serviceRows = services.results || []
     
-    // Return all data if no service filter
     return c.json({
-      provinces: allWorkerData.provinces,
-      cities: allWorkerData.cities,
-      services: allWorkerData.services,
+      provinces: provinceRows,
+      cities: cityRows,
+      services: serviceRows,
       debug: {
-        serviceCategory: 'all',
-        provinceCount: allWorkerData.provinces.length,
-        cityCount: allWorkerData.cities.length,
-        serviceCount: allWorkerData.services.length,
-        dataSource: 'static_fallback'
+        serviceCategory: serviceCategory || 'all',
+        provinceCount: provinceRows.length,
+        cityCount: cityRows.length,
+        serviceCount: serviceRows.length,
+        dataSource: 'worker_directory_stats'
       }
     })
     
@@ -1,4 +1,5 @@
 import { Hono } from 'hono'
+import { PasswordUtils } from '../utils/crypto'
 
 type Bindings = {
   DB: D1Database;
@@ -204,6 +205,67 @@ verificationRoutes.get('/verify-email', async (c) => {
   }
 })
 
+// Claim a bulk-imported worker account with its invite token
+verificationRoutes.post('/claim-account', async (c) => {
+  try {
+    const { token, password } = await c.req.json()
+    
+    if (!token || !password) {
+      return c.json({ error: 'Token and password are required' }, 400)
+    }
+    
+    if (password.length < 8) {
+      return c.json({ error: 'Password must be at least 8 characters' }, 400)
+    }
+    
+    const invite = await c.env.DB.prepare(`
+      SELECT wai.id, wai.user_id, wai.expires_at, u.email
+      FROM worker_account_invites wai
+      JOIN users u ON wai.user_id = u.id
+      WHERE wai.token = ? AND wai.claimed_at IS NULL
+    `).bind(token).first()
+    
+    if (!invite) {
+      return c.json({ error: 'Invite is invalid or has already been claimed' }, 404)
+    }
+    
+    if (new Date() > new Date(invite.expires_at as string)) {
+      return c.json({ error: 'Invite has expired' }, 410)
+    }
+    
+    // The password is only hashed now, not during the bulk import
+    const passwordHash = await PasswordUtils.hashPassword(password)
+    
+    // Both updates only apply while the invite is unclaimed, so of two concurrent claims only one sets the password
+    const [, claimed] = await c.env.DB.batch([
+      c.env.DB.prepare(`
+        UPDATE users SET password_hash = ?, email_verified = 1, updated_at = CURRENT_TIMESTAMP
+        WHERE id = ? AND EXISTS (
+          SELECT 1 FROM worker_account_invites WHERE id = ? AND claimed_at IS NULL
+        )
+      `).bind(passwordHash, invite.user_id, invite.id),
+      c.env.DB.prepare(`
+        UPDATE worker_account_invites SET claimed_at = CURRENT_TIMESTAMP
+        WHERE id = ? AND claimed_at IS NULL
+      `).bind(invite.id)
+    ])
+    
+    if (!claimed.meta.changes) {
+      return c.json({ error: 'Invite is invalid or has already been claimed' }, 409)
+    }
+    
+    return c.json({ 
+      success: true,
+      message: 'Account claimed successfully',
+      email: invite.email
+    })
+    
+  } catch (error) {
+    console.error('Claim account error:', error)
+    return c.json({ error: 'Failed to claim account' }, 500)
+  }
+})
+
 // Check verification status
 verificationRoutes.get('/status/:userId', async (c) => {
   try {
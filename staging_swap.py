@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Shadow-table staging for full imports, swapped into place in one transaction.
+
+A full import used to start with DELETE FROM users/user_profiles/
+worker_services and then rebuild the tables chunk by chunk, so for the whole
+import window the directory served by the app was empty or half loaded.
+With staging, the chunks are written to users_staging, user_profiles_staging
+and worker_services_staging instead: copies of the live tables' definitions
+(constraints included, foreign keys pointing at the staging tables, no
+secondary indexes). Once every chunk has landed the staging tables are
+validated, and one statement batch (one transaction, on D1 as locally)
+merges the staged rows into the live tables and drops the staging tables.
+
+The live tables are merged into rather than renamed or emptied: renaming
+users would make SQLite rewrite the foreign keys of every other table that
+references it, and DELETE FROM users would cascade into the dozens of
+tables with ON DELETE CASCADE references to it (defer_foreign_keys defers
+the checks, not the cascades). Rows missing from the staged tables are
+deleted, so only users that left the export take their dependent rows with
+them; the rest are upserted on their key in place. Readers see the old
+complete dataset until the swap commits, and the swap is a set-based copy
+inside the database, which takes milliseconds for directories of this size.
+"""
+
+import re
+
+from sql_chunks import RowStatement
+
+STAGED_TABLES = ('users', 'user_profiles', 'worker_services')
+
+# A staged load smaller than this share of the live users is refused
+MIN_LIVE_RATIO = 0.5
+
+# Child tables first when deleting, parents first when inserting
+_DELETE_ORDER = ('worker_services', 'user_profiles', 'users')
+
+# Column staged rows are matched to live rows by; profiles are one per user, with ids of their own
+SWAP_KEYS = {'users': 'id', 'user_profiles': 'user_id', 'worker_services': 'id'}
+
+
+def staging_table(table):
+    return f"{table}_staging"
+
+
+def _table_pattern(table):
+    return re.compile(r'(?<![\w"`\[])["`\[]?' + re.escape(table) + r'["`\]]?(?![\w"`\]])')
+
+
+def staging_ddl(table, create_sql, tables=STAGED_TABLES):
+    """CREATE TABLE for the staging copy of a table, with references to staged tables retargeted"""
+    create_sql = re.sub(r'^\s*CREATE\s+TABLE\s+(IF\s+NOT\s+EXISTS\s+)?["`\[]?\w+["`\]]?',
+                        f"CREATE TABLE {staging_table(table)}", create_sql, count=1, flags=re.IGNORECASE)
+    for referenced in tables:
+        create_sql = re.sub(r'(REFERENCES\s+)' + _table_pattern(referenced).pattern,
+                            lambda match: match.group(1) + staging_table(referenced), create_sql,
+                            flags=re.IGNORECASE)
+    return create_sql
+
+
+def prepare_staging(executor, tables=STAGED_TABLES):
+    """(Re)create empty staging tables from the live table definitions; returns False if that failed"""
+    print("🏗️ Preparing staging tables...")
+    names = ', '.join(f"'{table}'" for table in tables)
+    definitions = {row['name']: row['sql'] for row in executor.query(
+        f"SELECT name, sql FROM sqlite_master WHERE type = 'table' AND name IN ({names})"
+    )}
+    missing = [table for table in tables if table not in definitions]
+    if missing:
+        print(f"❌ Cannot stage missing tables: {', '.join(missing)}")
+        return False
+
+    statements = [f"DROP TABLE IF EXISTS {staging_table(table)};" for table in _ordered(_DELETE_ORDER, tables)]
+    statements += [staging_ddl(table, definitions[table], tables) + ';' for table in tables]
+    result = executor.execute('\n'.join(statements))
+    if result.returncode != 0:
+        print(f"❌ Failed to prepare staging tables: {result.stderr[:200]}")
+        return False
+    print(f"✅ Staging tables ready: {', '.join(staging_table(table) for table in tables)}")
+    return True
+
+
+def _retarget_sql(sql, table):
+    return re.sub(r'^(\s*INSERT(?:\s+OR\s+\w+)?\s+INTO\s+)' + re.escape(table) + r'\b',
+                  lambda match: match.group(1) + staging_table(table), sql, count=1, flags=re.IGNORECASE)
+
+
+def staged_chunks(chunks, table):
+    """(label, statement) chunks with their INSERT INTO table retargeted at the staging table"""
+    for label, statement in chunks:
+        if isinstance(statement, RowStatement):
+            statement = RowStatement(_retarget_sql(statement.header, table), statement.rows, statement.separator,
+                                     statement.terminator, statement.chunker)
+        else:
+            statement = _retarget_sql(statement, table)
+        yield label, statement
+
+
+def validate_staging(executor, min_live_ratio=MIN_LIVE_RATIO):
+    """
+    Check the staged rows before they replace the live ones; returns True if they may be swapped in.
+
+    Profiles and services of users that were rejected while loading are
+    pruned (and counted) first. The staged users must not be empty, nor
+    fewer than min_live_ratio of the live users, which catches a truncated
+    or wrong export before it replaces the directory.
+    """
+    counts = executor.query(
+        "SELECT "
+        "(SELECT COUNT(*) FROM users_staging) AS users, "
+        "(SELECT COUNT(*) FROM user_profiles_staging) AS user_profiles, "
+        "(SELECT COUNT(*) FROM worker_services_staging) AS worker_services, "
+        "(SELECT COUNT(*) FROM user_profiles_staging WHERE user_id NOT IN (SELECT id FROM users_staging)) AS orphan_profiles, "
+        "(SELECT COUNT(*) FROM worker_services_staging WHERE user_id NOT IN (SELECT id FROM users_staging)) AS orphan_services, "
+        "(SELECT COUNT(*) FROM users) AS live_users"
+    )[0]
+    if counts['orphan_profiles'] or counts['orphan_services']:
+        result = executor.execute(
+            "DELETE FROM user_profiles_staging WHERE user_id NOT IN (SELECT id FROM users_staging);\n"
+            "DELETE FROM worker_services_staging WHERE user_id NOT IN (SELECT id FROM users_staging);"
+        )
+        if result.returncode != 0:
+            print(f"❌ Failed to prune orphan rows: {result.stderr[:200]}")
+            return False
+        print(f"✂️ Pruned {counts['orphan_profiles']} profiles and {counts['orphan_services']} services "
+              f"of users rejected while loading")
+    print(f"🔎 Staged: {counts['users']} users, {counts['user_profiles'] - counts['orphan_profiles']} profiles, "
+          f"{counts['worker_services'] - counts['orphan_services']} services (live: {counts['live_users']} users)")
+
+    problems = []
+    if not counts['users']:
+        problems.append("no users staged")
+    elif counts['users'] < counts['live_users'] * min_live_ratio:
+        problems.append(f"{counts['users']} staged users would replace {counts['live_users']} live ones "
+                        f"(below {min_live_ratio:.0%})")
+    for problem in problems:
+        print(f"❌ Staging validation failed: {problem}")
+    return not problems
+
+
+def _ordered(order, tables):
+    return [table for table in order if table in tables]
+
+
+def _upsert_sql(table, columns, key):
+    # A key other than id leaves the live row's id alone, so it cannot collide with another row's
+    copied = [column for column in columns if key == 'id' or column != 'id']
+    updates = ', '.join(f"{column} = excluded.{column}" for column in copied if column != key)
+    column_list = ', '.join(copied)
+    # WHERE true keeps SQLite from parsing ON CONFLICT as a join constraint of the SELECT
+    return (f"INSERT INTO {table} ({column_list}) SELECT {column_list} FROM {staging_table(table)} WHERE true "
+            f"ON CONFLICT({key}) DO UPDATE SET {updates};")
+
+
+def swap_sql(columns, tables=STAGED_TABLES):
+    """
+    Statements merging the staged rows into the live tables and dropping the staging tables.
+
+    columns is {table: [column names]} of the live tables. Live rows whose
+    key is not staged are deleted first (children first), then the staged
+    rows are upserted on their key (parents first).
+    """
+    statements = ["PRAGMA defer_foreign_keys = ON;"]
+    statements += [f"DELETE FROM {table} WHERE {SWAP_KEYS[table]} NOT IN "
+                   f"(SELECT {SWAP_KEYS[table]} FROM {staging_table(table)});"
+                   for table in _ordered(_DELETE_ORDER, tables)]
+    statements += [_upsert_sql(table, columns[table], SWAP_KEYS[table]) for table in tables]
+    statements += [f"DROP TABLE {staging_table(table)};" for table in _ordered(_DELETE_ORDER, tables)]
+    return '\n'.join(statements)
+
+
+def table_columns(executor, tables=STAGED_TABLES):
+    """{table: [column names]} of the live tables"""
+    columns = {table: [] for table in tables}
+    names = ', '.join(f"'{table}'" for table in tables)
+    for row in executor.query(
+        f"SELECT m.name AS table_name, p.name AS column_name FROM sqlite_master m, pragma_table_info(m.name) p "
+        f"WHERE m.type = 'table' AND m.name IN ({names}) ORDER BY m.name, p.cid"
+    ):
+        columns[row['table_name']].append(row['column_name'])
+    return columns
+
+
+def swap_in_staging(executor, tables=STAGED_TABLES):
+    """Atomically merge the staged rows into the live tables; returns whether it committed"""
+    print("🔁 Swapping staging tables into place...")
+    columns = table_columns(executor, tables)
+    with executor.stage('swap'):
+        result = executor.execute(swap_sql(columns, tables))
+    if result.returncode != 0:
+        print(f"❌ Swap failed, live tables unchanged: {result.stderr[:200]}")
+        return False
+    print("✅ Staged data is live")
+    return True
+
+
+def add_staging_arguments(parser):
+    """Add the --staging flag for full imports that may load into shadow tables"""
+    parser.add_argument('--staging', action='store_true',
+                        help='load into *_staging tables and swap them in atomically once validated, '
+                             'so the live directory is never empty')